@@ -8,7 +8,7 @@ from .core.database import init_db, init_app as init_db_app
 
 # Import blueprints and websocket
 from .api.media import media_api
-from .api.playlist import playlist_api
+from .api.playlist import playlist_api, init_schedule_timer, init_ad_planner
 from .api.ads import ads_api
 from .api.system import system_api
 from .api.websocket import ws_api, sock
@@ -128,6 +128,22 @@ def create_app(test_config=None):
             app_logger.error(f"Error initializing database schema: {str(e)}")
             raise
 
+    # Start firing playlist schedules
+    if get_settings().app.scheduler_enabled:
+        try:
+            init_schedule_timer(app)
+            app_logger.info("Playlist schedule timer started")
+        except Exception as e:
+            app_logger.error(f"Error starting playlist schedule timer: {str(e)}")
+
+    # Keep upcoming ad breaks planned off the request path
+    if get_settings().ads.planner_enabled:
+        try:
+            init_ad_planner(app)
+            app_logger.info("Ad break planner started")
+        except Exception as e:
+            app_logger.error(f"Error starting ad break planner: {str(e)}")
+
     return app
 
 def init_app():
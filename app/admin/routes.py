@@ -5,12 +5,13 @@ import os
 from datetime import datetime
 
 from . import admin
-from ..core.database import Database
+from ..core.database import Database, dict_from_row
 from ..core.config import get_settings
 from ..core.monitoring import get_monitor
 from ..core.optimization import get_optimizer
 from ..ads.campaign import CampaignManager
 from ..ads.analytics import AdAnalytics
+from ..ads.downsample import CHART_POINTS, downsample
 
 # Initialize components
 settings = get_settings()
@@ -261,28 +262,18 @@ def campaign_list():
     params.extend([per_page, (page - 1) * per_page])
     
     # Get campaigns
-    campaigns = db.fetch_all(query, tuple(params))
+    campaigns = [dict_from_row(row) for row in db.fetch_all(query, tuple(params))]
     
-    # Enhance campaign data
+    # Asset counts and metrics for the whole page in one batch
+    summaries = ad_analytics.get_campaign_summaries([campaign['id'] for campaign in campaigns])
     for campaign in campaigns:
-        # Get asset count
-        assets = db.fetch_one(
-            """
-            SELECT COUNT(*) as count 
-            FROM ad_assets 
-            WHERE campaign_id = ?
-            """,
-            (campaign['id'],)
-        )
-        campaign['asset_count'] = assets['count']
-        
-        # Get metrics
-        metrics = ad_analytics.get_campaign_metrics(campaign['id'])
+        summary = summaries.get(campaign['id'], {})
         campaign.update({
-            'impressions': metrics.get('impressions', 0),
-            'completion_rate': metrics.get('completion_rate', 0),
+            'asset_count': summary.get('asset_count', 0),
+            'impressions': summary.get('impressions', 0),
+            'completion_rate': summary.get('completion_rate', 0),
             'progress': min(
-                round(metrics.get('impressions', 0) / campaign['target_percentage'], 2) * 100 
+                round(summary.get('impressions', 0) / campaign['target_percentage'], 2) * 100 
                 if campaign['target_percentage'] else 100,
                 100
             )
@@ -316,26 +307,17 @@ def campaign_details(campaign_id):
         flash('Campaign not found', 'error')
         return redirect(url_for('admin.campaign_list'))
     
-    # Get performance metrics
-    metrics = ad_analytics.get_campaign_metrics(campaign_id)
-    
-    # Get hourly distribution
-    distribution = ad_analytics.get_time_distribution(
-        campaign_id,
-        interval='hour'
-    )
-    
-    # Get asset performance
-    asset_performance = ad_analytics.get_asset_performance(campaign_id)
+    # Get metrics, hourly distribution and asset performance in one pass
+    report = ad_analytics.generate_report(campaign_id)
     
     return render_template(
         'admin/campaigns/details.html',
         campaign=details['campaign'],
         assets=details['assets'],
         schedules=details['schedules'],
-        metrics=metrics,
-        distribution=distribution,
-        asset_performance=asset_performance
+        metrics=report.get('overview', {}),
+        distribution=report.get('hourly_distribution', []),
+        asset_performance=report.get('assets', [])
     )
 
 @admin.route('/campaigns/<int:campaign_id>/edit', methods=['GET'])
@@ -409,6 +391,15 @@ def campaign_analytics(campaign_id):
         end_date
     )
     
+    # Keep the daily chart small however long the range is, spacing days
+    # by date so days without plays show as gaps
+    points = max(request.args.get('points', CHART_POINTS, type=int), 3)
+    days = report.get('daily_distribution')
+    if days:
+        report['daily_distribution'] = downsample(days, points, x=[
+            datetime.strptime(day['period'], '%Y-%m-%d').timestamp() for day in days
+        ])
+    
     return render_template(
         'admin/campaigns/analytics.html',
         campaign=details['campaign'],
@@ -417,6 +408,26 @@ def campaign_analytics(campaign_id):
         end_date=end_date
     )
 
+@admin.route('/campaigns/<int:campaign_id>/distribution')
+def campaign_distribution(campaign_id):
+    """Get a campaign's plays over time for charts, downsampled to ``points``."""
+    interval = request.args.get('interval', 'day')
+    if interval not in ('hour', 'hourly', 'day', 'week', 'month'):
+        return jsonify({'error': f'Invalid interval: {interval}'}), 400
+    
+    try:
+        start_date = request.args.get('start_date')
+        end_date = request.args.get('end_date')
+        start_date = datetime.strptime(start_date, '%Y-%m-%d') if start_date else None
+        end_date = datetime.strptime(end_date, '%Y-%m-%d') if end_date else None
+    except ValueError:
+        return jsonify({'error': 'Dates must be YYYY-MM-DD'}), 400
+    points = request.args.get('points', CHART_POINTS, type=int)
+    
+    return jsonify(ad_analytics.get_time_distribution(
+        campaign_id, interval, start_date, end_date, points=max(points, 3)
+    ))
+
 @admin.route('/quick-stats')
 def quick_stats():
     """Get quick statistics for the admin dashboard."""
@@ -430,28 +441,13 @@ def quick_stats():
             """
         )['count']
         
-        # Get total impressions today
-        today_impressions = db.fetch_one(
-            """
-            SELECT COUNT(*) as count 
-            FROM ad_logs 
-            WHERE DATE(timestamp) = DATE(CURRENT_TIMESTAMP)
-            """
-        )['count']
-        
-        # Get average completion rate
-        completion_rate = db.fetch_one(
-            """
-            SELECT AVG(CASE WHEN completed = 1 THEN 1 ELSE 0 END) * 100 as rate
-            FROM ad_logs
-            WHERE DATE(timestamp) = DATE(CURRENT_TIMESTAMP)
-            """
-        )['rate'] or 0
-        
-        # Get asset count
-        asset_count = db.fetch_one(
-            "SELECT COUNT(*) as count FROM ad_assets"
-        )['count']
+        # Today's (UTC) plays and assets across all campaigns, from rollups
+        today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        summaries = ad_analytics.get_campaign_summaries(start_date=today).values()
+        today_impressions = sum(summary['impressions'] for summary in summaries)
+        completions = sum(summary['completions'] for summary in summaries)
+        completion_rate = completions / today_impressions * 100 if today_impressions else 0
+        asset_count = sum(summary['asset_count'] for summary in summaries)
         
         return jsonify({
             'active_campaigns': active_campaigns,
@@ -487,7 +483,17 @@ def recent_activity():
             """
         )
         
-        return jsonify([dict(log) for log in logs])
+        # Today's (UTC) totals for the campaigns shown, in one batch
+        today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        summaries = ad_analytics.get_campaign_summaries(
+            sorted({log['campaign_id'] for log in logs}), start_date=today
+        )
+        
+        return jsonify([{
+            **dict(log),
+            'campaign_impressions_today': summaries.get(log['campaign_id'], {}).get('impressions', 0),
+            'campaign_completion_rate_today': summaries.get(log['campaign_id'], {}).get('completion_rate', 0)
+        } for log in logs])
         
     except Exception as e:
         current_app.logger.error(f"Error getting recent activity: {str(e)}")
@@ -5,6 +5,131 @@ from collections import defaultdict
 
 from ..core.logging import ad_logger, log_function_call, log_error
 from ..core.database import Database, dict_from_row
+from .hll import HyperLogLog
+from .downsample import downsample
+
+ROLLUP_NAME = 'ad_hourly_rollups'
+STATS_NAME = 'ad_campaign_stats'
+
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+FACT_COLUMNS = """
+    campaign_id,
+    asset_id,
+    playlist_id,
+    hour,
+    impressions,
+    completions,
+    total_duration,
+    timed_impressions,
+    completed_duration,
+    timed_completions
+"""
+
+# Raw logs shaped like rollup rows, one row per play
+RAW_FACTS = """
+    SELECT
+        COALESCE(campaign_id, 0) as campaign_id,
+        COALESCE(asset_id, 0) as asset_id,
+        COALESCE(playlist_id, 0) as playlist_id,
+        strftime('%Y-%m-%d %H:00:00', timestamp) as hour,
+        1 as impressions,
+        CASE WHEN completed = 1 THEN 1 ELSE 0 END as completions,
+        COALESCE(duration, 0) as total_duration,
+        CASE WHEN duration IS NOT NULL THEN 1 ELSE 0 END as timed_impressions,
+        CASE WHEN completed = 1 THEN COALESCE(duration, 0) ELSE 0 END as completed_duration,
+        CASE WHEN completed = 1 AND duration IS NOT NULL THEN 1 ELSE 0 END as timed_completions
+    FROM ad_logs
+"""
+
+WATERMARK = f"""
+    COALESCE((SELECT last_id FROM rollup_watermarks WHERE name = '{ROLLUP_NAME}'), 0)
+"""
+
+# Shared aggregates over a facts subquery
+AVG_VIEW_TIME = "SUM(completed_duration) * 1.0 / NULLIF(SUM(timed_completions), 0)"
+REACH = "COUNT(DISTINCT NULLIF(playlist_id, 0))"
+
+# Reach over ranges up to this long is counted exactly by default
+EXACT_REACH_HOURS = 24
+
+def hour_floor(value: datetime) -> datetime:
+    """Round down to the start of the hour."""
+    return value.replace(minute=0, second=0, microsecond=0)
+
+def hour_ceil(value: datetime) -> datetime:
+    """Round up to the start of the next hour, unless already on one."""
+    floor = hour_floor(value)
+    return floor if floor == value else floor + timedelta(hours=1)
+
+def whole_hours(
+    start_date: Optional[datetime],
+    end_date: Optional[datetime]
+) -> Tuple[Optional[str], Optional[str]]:
+    """Get the rollup hours [lo, hi) lying entirely inside a date range."""
+    lo = hour_ceil(start_date).strftime(TIMESTAMP_FORMAT) if start_date else None
+    hi = (
+        hour_floor(end_date + timedelta(seconds=1)).strftime(TIMESTAMP_FORMAT)
+        if end_date else None
+    )
+    return lo, hi
+
+def empty_summary() -> Dict:
+    """Campaign summary before any plays or assets are counted."""
+    return {
+        'asset_count': 0,
+        'impressions': 0,
+        'completions': 0,
+        'completion_rate': 0,
+        'total_duration': None,
+        'avg_view_time': 0
+    }
+
+class FactTotals:
+    """Running totals over fact rows for one report group."""
+
+    __slots__ = (
+        'rows', 'impressions', 'completions', 'total_duration',
+        'completed_duration', 'timed_completions', 'playlists'
+    )
+
+    def __init__(self):
+        self.rows = 0
+        self.impressions = 0
+        self.completions = 0
+        self.total_duration = 0
+        self.completed_duration = 0
+        self.timed_completions = 0
+        self.playlists = set()
+
+    def add(self, row) -> None:
+        """Add one fact row."""
+        self.rows += 1
+        self.impressions += row['impressions']
+        self.completions += row['completions']
+        self.total_duration += row['total_duration']
+        self.completed_duration += row['completed_duration']
+        self.timed_completions += row['timed_completions']
+        if row['playlist_id']:
+            self.playlists.add(row['playlist_id'])
+
+    @property
+    def avg_view_time(self) -> Optional[float]:
+        """Average length of completed plays with a known duration."""
+        return (
+            self.completed_duration / self.timed_completions
+            if self.timed_completions else None
+        )
+
+    @property
+    def completion_rate(self) -> float:
+        """Completed plays as a percentage of impressions."""
+        return self.completions / self.impressions * 100 if self.impressions > 0 else 0
+
+    @property
+    def reach(self) -> int:
+        """Number of distinct playlists."""
+        return len(self.playlists)
 
 class AdAnalytics:
     """Handles ad performance analytics and reporting."""
@@ -13,6 +138,405 @@ class AdAnalytics:
         self.db = db
         self.logger = ad_logger
 
+    def _facts(
+        self,
+        campaign_ids: Optional[List[int]],
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        rollups: bool = True
+    ) -> Tuple[str, List]:
+        """Build a subquery of hourly facts for campaigns within a date range.
+        
+        Whole hours come from ad_hourly_rollups. Raw ad_logs are only read
+        for logs newer than the rollup watermark and for the partial hours
+        at either end of the range, so the cost does not grow with the log.
+        With ``rollups`` off only those raw parts are returned, and
+        ``campaign_ids`` of None covers every campaign.
+        Returns the SQL and its parameters.
+        """
+        if campaign_ids is None:
+            in_campaigns, campaign_ids = "1", []
+        else:
+            in_campaigns = f"campaign_id IN ({','.join('?' * len(campaign_ids))})"
+        start = start_date.strftime(TIMESTAMP_FORMAT) if start_date else None
+        end = end_date.strftime(TIMESTAMP_FORMAT) if end_date else None
+        lo, hi = whole_hours(start_date, end_date)
+
+        def raw(*conditions):
+            where = [in_campaigns]
+            params = list(campaign_ids)
+            for condition, value in conditions:
+                where.append(condition)
+                if value is not None:
+                    params.append(value)
+            return f"{RAW_FACTS} WHERE {' AND '.join(where)}", params
+
+        in_range = [
+            condition for condition in [
+                ("timestamp >= ?", start) if start else None,
+                ("timestamp <= ?", end) if end else None
+            ] if condition
+        ]
+
+        if lo and hi and lo >= hi:
+            # No whole hour in range; it spans two partial hours at most
+            return raw(*in_range)
+
+        rollup_where = [in_campaigns]
+        rollup_params = list(campaign_ids)
+        if lo:
+            rollup_where.append("hour >= ?")
+            rollup_params.append(lo)
+        if hi:
+            rollup_where.append("hour < ?")
+            rollup_params.append(hi)
+        parts = [(
+            f"SELECT {FACT_COLUMNS} FROM ad_hourly_rollups WHERE {' AND '.join(rollup_where)}",
+            rollup_params
+        )] if rollups else []
+        parts.append(raw((f"id > {WATERMARK}", None), *in_range))
+        if start:
+            parts.append(raw(
+                (f"id <= {WATERMARK}", None), ("timestamp >= ?", start), ("timestamp < ?", lo)
+            ))
+        if end:
+            parts.append(raw(
+                (f"id <= {WATERMARK}", None), ("timestamp >= ?", hi), ("timestamp <= ?", end)
+            ))
+
+        return (
+            ' UNION ALL '.join(sql for sql, _ in parts),
+            [param for _, params in parts for param in params]
+        )
+
+    def _claim_logs(self, name: str) -> Optional[Tuple[int, int]]:
+        """Advance a watermark over the ad_logs written since it was last moved.
+        
+        Returns the (last_id, max_id] range to fold in, or None if there is
+        nothing new. Claiming first means overlapping runs cannot count the
+        same logs twice. The caller commits or rolls back.
+        """
+        conn = self.db.connection
+        conn.execute(
+            "INSERT OR IGNORE INTO rollup_watermarks (name, last_id) VALUES (?, 0)",
+            (name,)
+        )
+        last_id = conn.execute(
+            "SELECT last_id FROM rollup_watermarks WHERE name = ?",
+            (name,)
+        ).fetchone()[0]
+        max_id = conn.execute("SELECT MAX(id) FROM ad_logs").fetchone()[0]
+        if max_id is None or max_id <= last_id:
+            return None
+
+        claimed = conn.execute(
+            "UPDATE rollup_watermarks SET last_id = ? WHERE name = ? AND last_id = ?",
+            (max_id, name, last_id)
+        )
+        if claimed.rowcount == 0:
+            return None
+        return last_id, max_id
+
+    @log_function_call(ad_logger)
+    def update_rollups(self) -> int:
+        """Fold ad_logs written since the last run into the hourly rollups.
+        
+        The hourly reach sketches are updated in the same transaction.
+        Returns the number of logs rolled up.
+        """
+        conn = self.db.connection
+        try:
+            claimed = self._claim_logs(ROLLUP_NAME)
+            if claimed is None:
+                conn.commit()
+                return 0
+            last_id, max_id = claimed
+
+            conn.execute(
+                f"""
+                INSERT INTO ad_hourly_rollups ({FACT_COLUMNS})
+                SELECT
+                    campaign_id,
+                    asset_id,
+                    playlist_id,
+                    hour,
+                    SUM(impressions),
+                    SUM(completions),
+                    SUM(total_duration),
+                    SUM(timed_impressions),
+                    SUM(completed_duration),
+                    SUM(timed_completions)
+                FROM ({RAW_FACTS} WHERE id > ? AND id <= ?)
+                WHERE 1
+                GROUP BY campaign_id, asset_id, playlist_id, hour
+                ON CONFLICT (campaign_id, asset_id, playlist_id, hour) DO UPDATE SET
+                    impressions = impressions + excluded.impressions,
+                    completions = completions + excluded.completions,
+                    total_duration = total_duration + excluded.total_duration,
+                    timed_impressions = timed_impressions + excluded.timed_impressions,
+                    completed_duration = completed_duration + excluded.completed_duration,
+                    timed_completions = timed_completions + excluded.timed_completions
+                """,
+                (last_id, max_id)
+            )
+            self._fold_reach_sketches(last_id, max_id)
+            rolled = conn.execute(
+                "SELECT COUNT(*) FROM ad_logs WHERE id > ? AND id <= ?",
+                (last_id, max_id)
+            ).fetchone()[0]
+            conn.commit()
+            return rolled
+
+        except Exception as e:
+            conn.rollback()
+            self.logger.error(f"Failed to update ad rollups: {str(e)}")
+            raise
+
+    def _fold_reach_sketches(self, last_id: int, max_id: int) -> None:
+        """Add the playlists in ad_logs (last_id, max_id] to the hourly reach sketches."""
+        conn = self.db.connection
+        reached = defaultdict(set)
+        for row in conn.execute(
+            f"""
+            SELECT DISTINCT campaign_id, hour, playlist_id
+            FROM ({RAW_FACTS} WHERE id > ? AND id <= ?)
+            WHERE playlist_id != 0
+            """,
+            (last_id, max_id)
+        ):
+            reached[(row['campaign_id'], row['hour'])].add(row['playlist_id'])
+
+        sketches = []
+        for (campaign_id, hour), playlist_ids in reached.items():
+            stored = conn.execute(
+                "SELECT sketch FROM ad_reach_sketches WHERE campaign_id = ? AND hour = ?",
+                (campaign_id, hour)
+            ).fetchone()
+            sketch = HyperLogLog.from_bytes(stored['sketch']) if stored else HyperLogLog()
+            sketch.update(playlist_ids)
+            sketches.append((campaign_id, hour, sketch.to_bytes()))
+        conn.executemany(
+            "INSERT OR REPLACE INTO ad_reach_sketches (campaign_id, hour, sketch) VALUES (?, ?, ?)",
+            sketches
+        )
+
+    @log_function_call(ad_logger)
+    def update_campaign_stats(self) -> Dict[int, Dict]:
+        """Fold ad_logs written since the last run into the all-time campaign stats.
+        
+        One grouped query covers every campaign, in a single transaction.
+        Returns fresh metrics for the campaigns that had new plays only.
+        """
+        conn = self.db.connection
+        try:
+            claimed = self._claim_logs(STATS_NAME)
+            if claimed is None:
+                conn.commit()
+                return {}
+            last_id, max_id = claimed
+
+            conn.execute(
+                """
+                INSERT INTO ad_campaign_stats (
+                    campaign_id, impressions, completions, total_duration,
+                    completed_duration, timed_completions
+                )
+                SELECT
+                    campaign_id,
+                    COUNT(*),
+                    SUM(CASE WHEN completed = 1 THEN 1 ELSE 0 END),
+                    COALESCE(SUM(duration), 0),
+                    COALESCE(SUM(CASE WHEN completed = 1 THEN duration ELSE 0 END), 0),
+                    SUM(CASE WHEN completed = 1 AND duration IS NOT NULL THEN 1 ELSE 0 END)
+                FROM ad_logs
+                WHERE id > ? AND id <= ?
+                AND campaign_id IS NOT NULL
+                GROUP BY campaign_id
+                ON CONFLICT (campaign_id) DO UPDATE SET
+                    impressions = impressions + excluded.impressions,
+                    completions = completions + excluded.completions,
+                    total_duration = total_duration + excluded.total_duration,
+                    completed_duration = completed_duration + excluded.completed_duration,
+                    timed_completions = timed_completions + excluded.timed_completions,
+                    updated_at = CURRENT_TIMESTAMP
+                """,
+                (last_id, max_id)
+            )
+            conn.execute(
+                """
+                INSERT OR IGNORE INTO ad_campaign_reach (campaign_id, playlist_id)
+                SELECT DISTINCT campaign_id, playlist_id
+                FROM ad_logs
+                WHERE id > ? AND id <= ?
+                AND campaign_id IS NOT NULL
+                AND playlist_id IS NOT NULL
+                """,
+                (last_id, max_id)
+            )
+            stats = conn.execute(
+                """
+                SELECT
+                    s.*,
+                    (SELECT COUNT(*) FROM ad_campaign_reach r
+                     WHERE r.campaign_id = s.campaign_id) as reach
+                FROM ad_campaign_stats s
+                WHERE s.campaign_id IN (
+                    SELECT DISTINCT campaign_id FROM ad_logs WHERE id > ? AND id <= ?
+                )
+                """,
+                (last_id, max_id)
+            ).fetchall()
+            conn.commit()
+
+            return {
+                row['campaign_id']: {
+                    'impressions': row['impressions'],
+                    'completions': row['completions'],
+                    'completion_rate': (
+                        (row['completions'] / row['impressions'] * 100)
+                        if row['impressions'] > 0 else 0
+                    ),
+                    'total_duration': row['total_duration'],
+                    'avg_view_time': (
+                        row['completed_duration'] / row['timed_completions']
+                        if row['timed_completions'] else 0
+                    ),
+                    'reach': row['reach'],
+                    'timestamp': row['updated_at']
+                }
+                for row in stats
+            }
+
+        except Exception as e:
+            conn.rollback()
+            self.logger.error(f"Failed to update campaign stats: {str(e)}")
+            raise
+
+    @log_function_call(ad_logger)
+    def get_reach(
+        self,
+        campaign_ids: List[int],
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        exact: Optional[bool] = None
+    ) -> int:
+        """Count the distinct playlists a group of campaigns reached.
+        
+        Approximate reach merges the hourly sketches of whole hours in range
+        and adds the playlists from raw logs not yet rolled up, so its cost
+        depends on the hours covered rather than the plays (error is about
+        1.6%). ``exact`` forces a distinct count over the facts instead; by
+        default ranges up to EXACT_REACH_HOURS long are counted exactly.
+        """
+        try:
+            if exact is None:
+                exact = bool(
+                    start_date and end_date and
+                    end_date - start_date <= timedelta(hours=EXACT_REACH_HOURS)
+                )
+            if exact:
+                facts, params = self._facts(campaign_ids, start_date, end_date)
+                return self.db.fetch_one(
+                    f"SELECT {REACH} as reach FROM ({facts})",
+                    tuple(params)
+                )['reach']
+
+            sketch = HyperLogLog()
+            lo, hi = whole_hours(start_date, end_date)
+            if not (lo and hi and lo >= hi):
+                where = [f"campaign_id IN ({','.join('?' * len(campaign_ids))})"]
+                params = list(campaign_ids)
+                if lo:
+                    where.append("hour >= ?")
+                    params.append(lo)
+                if hi:
+                    where.append("hour < ?")
+                    params.append(hi)
+                sketch.merge_bytes(
+                    row['sketch'] for row in self.db.execute(
+                        f"SELECT sketch FROM ad_reach_sketches WHERE {' AND '.join(where)}",
+                        tuple(params)
+                    )
+                )
+
+            facts, params = self._facts(campaign_ids, start_date, end_date, rollups=False)
+            sketch.update(
+                row['playlist_id'] for row in self.db.execute(
+                    f"SELECT DISTINCT playlist_id FROM ({facts}) WHERE playlist_id != 0",
+                    tuple(params)
+                )
+            )
+            return sketch.count()
+
+        except Exception as e:
+            self.logger.error(f"Failed to get reach for campaigns {campaign_ids}: {str(e)}")
+            return 0
+
+    @log_function_call(ad_logger)
+    def get_campaign_summaries(
+        self,
+        campaign_ids: Optional[List[int]] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None
+    ) -> Dict[int, Dict]:
+        """Get asset counts and headline metrics for many campaigns at once.
+        
+        One grouped query over the rollup facts and one over ad_assets cover
+        the whole batch, for list pages and dashboards. Reach is left out;
+        use get_reach where it is needed. ``campaign_ids`` of None covers
+        every campaign, with unattributed plays and assets under id 0.
+        """
+        try:
+            if campaign_ids is not None and not campaign_ids:
+                return {}
+            summaries = {campaign_id: empty_summary() for campaign_id in campaign_ids or []}
+            
+            facts, params = self._facts(campaign_ids, start_date, end_date)
+            for row in self.db.fetch_all(
+                f"""
+                SELECT 
+                    campaign_id,
+                    SUM(impressions) as impressions,
+                    SUM(completions) as completions,
+                    SUM(total_duration) as total_duration,
+                    {AVG_VIEW_TIME} as avg_view_time
+                FROM ({facts})
+                GROUP BY campaign_id
+                """,
+                tuple(params)
+            ):
+                summaries.setdefault(row['campaign_id'], empty_summary()).update({
+                    'impressions': row['impressions'],
+                    'completions': row['completions'],
+                    'completion_rate': (
+                        (row['completions'] / row['impressions'] * 100)
+                        if row['impressions'] > 0 else 0
+                    ),
+                    'total_duration': row['total_duration'],
+                    'avg_view_time': row['avg_view_time'] or 0
+                })
+            
+            where, params = "", ()
+            if campaign_ids is not None:
+                where = f"WHERE campaign_id IN ({','.join('?' * len(campaign_ids))})"
+                params = tuple(campaign_ids)
+            for row in self.db.fetch_all(
+                f"""
+                SELECT COALESCE(campaign_id, 0) as campaign_id, COUNT(*) as count
+                FROM ad_assets
+                {where}
+                GROUP BY 1
+                """,
+                params
+            ):
+                summaries.setdefault(row['campaign_id'], empty_summary())['asset_count'] = row['count']
+            
+            return summaries
+
+        except Exception as e:
+            self.logger.error(f"Failed to get campaign summaries: {str(e)}")
+            return {}
+
     @log_function_call(ad_logger)
     def get_campaign_metrics(
         self,
@@ -22,28 +546,18 @@ class AdAnalytics:
     ) -> Dict:
         """Get comprehensive metrics for a campaign."""
         try:
-            # Base query for metrics
-            query = """
+            facts, params = self._facts([campaign_id], start_date, end_date)
+            metrics = self.db.fetch_one(
+                f"""
                 SELECT 
-                    COUNT(*) as impressions,
-                    SUM(CASE WHEN completed = 1 THEN 1 ELSE 0 END) as completions,
-                    SUM(duration) as total_duration,
-                    COUNT(DISTINCT playlist_id) as reach,
-                    AVG(CASE WHEN completed = 1 THEN duration ELSE NULL END) as avg_view_time
-                FROM ad_logs
-                WHERE campaign_id = ?
-            """
-            params = [campaign_id]
-            
-            # Add date filters if provided
-            if start_date:
-                query += " AND timestamp >= ?"
-                params.append(start_date.strftime('%Y-%m-%d %H:%M:%S'))
-            if end_date:
-                query += " AND timestamp <= ?"
-                params.append(end_date.strftime('%Y-%m-%d %H:%M:%S'))
-            
-            metrics = self.db.fetch_one(query, tuple(params))
+                    COALESCE(SUM(impressions), 0) as impressions,
+                    COALESCE(SUM(completions), 0) as completions,
+                    SUM(total_duration) as total_duration,
+                    {AVG_VIEW_TIME} as avg_view_time
+                FROM ({facts})
+                """,
+                tuple(params)
+            )
             
             return {
                 'impressions': metrics['impressions'],
@@ -54,7 +568,7 @@ class AdAnalytics:
                 ),
                 'total_duration': metrics['total_duration'],
                 'avg_view_time': metrics['avg_view_time'] or 0,
-                'reach': metrics['reach']
+                'reach': self.get_reach([campaign_id], start_date, end_date)
             }
 
         except Exception as e:
@@ -72,32 +586,33 @@ class AdAnalytics:
     ) -> List[Dict]:
         """Get performance metrics for each asset in a campaign."""
         try:
-            query = """
+            facts, params = self._facts([campaign_id], start_date, end_date)
+            assets = self.db.fetch_all(
+                f"""
                 SELECT 
                     a.id,
                     a.type,
                     m.title,
-                    COUNT(l.id) as impressions,
-                    SUM(CASE WHEN l.completed = 1 THEN 1 ELSE 0 END) as completions,
-                    AVG(CASE WHEN l.completed = 1 THEN l.duration ELSE NULL END) as avg_view_time,
-                    COUNT(DISTINCT l.playlist_id) as reach
+                    COALESCE(f.impressions, 0) as impressions,
+                    COALESCE(f.completions, 0) as completions,
+                    f.avg_view_time,
+                    COALESCE(f.reach, 0) as reach
                 FROM ad_assets a
                 JOIN media m ON a.media_id = m.id
-                LEFT JOIN ad_logs l ON a.id = l.asset_id
+                LEFT JOIN (
+                    SELECT 
+                        asset_id,
+                        SUM(impressions) as impressions,
+                        SUM(completions) as completions,
+                        {AVG_VIEW_TIME} as avg_view_time,
+                        {REACH} as reach
+                    FROM ({facts})
+                    GROUP BY asset_id
+                ) f ON a.id = f.asset_id
                 WHERE a.campaign_id = ?
-            """
-            params = [campaign_id]
-            
-            if start_date:
-                query += " AND l.timestamp >= ?"
-                params.append(start_date.strftime('%Y-%m-%d %H:%M:%S'))
-            if end_date:
-                query += " AND l.timestamp <= ?"
-                params.append(end_date.strftime('%Y-%m-%d %H:%M:%S'))
-            
-            query += " GROUP BY a.id"
-            
-            assets = self.db.fetch_all(query, tuple(params))
+                """,
+                tuple(params) + (campaign_id,)
+            )
             
             return [{
                 **dict_from_row(asset),
@@ -119,49 +634,62 @@ class AdAnalytics:
         campaign_id: int,
         interval: str = 'hour',
         start_date: Optional[datetime] = None,
-        end_date: Optional[datetime] = None
+        end_date: Optional[datetime] = None,
+        points: Optional[int] = None
     ) -> List[Dict]:
-        """Get time-based distribution of ad plays."""
+        """Get time-based distribution of ad plays.
+        
+        ``hour`` folds plays by hour of day, while ``hourly`` keeps every
+        hour in the range as its own period. With ``points`` the periods
+        are downsampled (LTTB on impressions) to at most that many for
+        charting; the periods kept are unchanged.
+        """
         try:
             # Define time format based on interval
             if interval == 'hour':
                 time_format = '%H'
-                group_by = "strftime('%H', timestamp)"
+                group_by = "strftime('%H', hour)"
+            elif interval == 'hourly':
+                time_format = TIMESTAMP_FORMAT
+                group_by = "hour"
             elif interval == 'day':
                 time_format = '%Y-%m-%d'
-                group_by = "date(timestamp)"
+                group_by = "date(hour)"
             elif interval == 'week':
                 time_format = '%W'
-                group_by = "strftime('%W', timestamp)"
+                group_by = "strftime('%W', hour)"
             elif interval == 'month':
                 time_format = '%Y-%m'
-                group_by = "strftime('%Y-%m', timestamp)"
+                group_by = "strftime('%Y-%m', hour)"
             else:
                 raise ValueError(f"Invalid interval: {interval}")
             
-            query = f"""
+            facts, params = self._facts([campaign_id], start_date, end_date)
+            distribution = self.db.fetch_all(
+                f"""
                 SELECT 
                     {group_by} as period,
-                    COUNT(*) as impressions,
-                    SUM(CASE WHEN completed = 1 THEN 1 ELSE 0 END) as completions,
-                    COUNT(DISTINCT playlist_id) as reach
-                FROM ad_logs
-                WHERE campaign_id = ?
-            """
-            params = [campaign_id]
-            
-            if start_date:
-                query += " AND timestamp >= ?"
-                params.append(start_date.strftime('%Y-%m-%d %H:%M:%S'))
-            if end_date:
-                query += " AND timestamp <= ?"
-                params.append(end_date.strftime('%Y-%m-%d %H:%M:%S'))
-            
-            query += f" GROUP BY {group_by} ORDER BY period"
-            
-            distribution = self.db.fetch_all(query, tuple(params))
+                    SUM(impressions) as impressions,
+                    SUM(completions) as completions,
+                    {REACH} as reach
+                FROM ({facts})
+                GROUP BY {group_by}
+                ORDER BY period
+                """,
+                tuple(params)
+            )
             
-            return [dict_from_row(period) for period in distribution]
+            periods = [dict_from_row(period) for period in distribution]
+            if points and len(periods) > points:
+                # Space points by time where periods are dates, so gaps show
+                x = None
+                if interval in ('hourly', 'day', 'month'):
+                    x = [
+                        datetime.strptime(period['period'], time_format).timestamp()
+                        for period in periods
+                    ]
+                periods = downsample(periods, points, x=x)
+            return periods
 
         except Exception as e:
             self.logger.error(
@@ -178,29 +706,21 @@ class AdAnalytics:
     ) -> List[Dict]:
         """Get performance metrics by playlist."""
         try:
-            query = """
+            facts, params = self._facts([campaign_id], start_date, end_date)
+            playlists = self.db.fetch_all(
+                f"""
                 SELECT 
-                    l.playlist_id,
+                    f.playlist_id,
                     p.name as playlist_name,
-                    COUNT(*) as impressions,
-                    SUM(CASE WHEN l.completed = 1 THEN 1 ELSE 0 END) as completions,
-                    AVG(CASE WHEN l.completed = 1 THEN l.duration ELSE NULL END) as avg_view_time
-                FROM ad_logs l
-                JOIN playlists p ON l.playlist_id = p.id
-                WHERE l.campaign_id = ?
-            """
-            params = [campaign_id]
-            
-            if start_date:
-                query += " AND l.timestamp >= ?"
-                params.append(start_date.strftime('%Y-%m-%d %H:%M:%S'))
-            if end_date:
-                query += " AND l.timestamp <= ?"
-                params.append(end_date.strftime('%Y-%m-%d %H:%M:%S'))
-            
-            query += " GROUP BY l.playlist_id"
-            
-            playlists = self.db.fetch_all(query, tuple(params))
+                    SUM(f.impressions) as impressions,
+                    SUM(f.completions) as completions,
+                    SUM(f.completed_duration) * 1.0 / NULLIF(SUM(f.timed_completions), 0) as avg_view_time
+                FROM ({facts}) f
+                JOIN playlists p ON f.playlist_id = p.id
+                GROUP BY f.playlist_id
+                """,
+                tuple(params)
+            )
             
             return [{
                 **dict_from_row(playlist),
@@ -228,39 +748,36 @@ class AdAnalytics:
         try:
             # Define metric calculation
             metric_calc = {
-                'impressions': "COUNT(*)",
-                'completions': "SUM(CASE WHEN completed = 1 THEN 1 ELSE 0 END)",
-                'completion_rate': """
-                    (SUM(CASE WHEN completed = 1 THEN 1 ELSE 0 END) * 100.0 / COUNT(*))
-                """,
-                'avg_duration': "AVG(duration)",
-                'reach': "COUNT(DISTINCT playlist_id)"
+                'impressions': "SUM(impressions)",
+                'completions': "SUM(completions)",
+                'completion_rate': "SUM(completions) * 100.0 / SUM(impressions)",
+                'avg_duration': "SUM(total_duration) * 1.0 / NULLIF(SUM(timed_impressions), 0)",
+                'reach': "COUNT(*)"
             }.get(metric)
             
             if not metric_calc:
                 raise ValueError(f"Invalid metric: {metric}")
             
-            placeholders = ','.join('?' * len(campaign_ids))
-            query = f"""
+            facts, params = self._facts(campaign_ids, start_date, end_date)
+            results = self.db.fetch_all(
+                f"""
                 SELECT 
                     campaign_id,
                     {metric_calc} as value
-                FROM ad_logs
-                WHERE campaign_id IN ({placeholders})
-            """
-            params = campaign_ids.copy()
-            
-            if start_date:
-                query += " AND timestamp >= ?"
-                params.append(start_date.strftime('%Y-%m-%d %H:%M:%S'))
-            if end_date:
-                query += " AND timestamp <= ?"
-                params.append(end_date.strftime('%Y-%m-%d %H:%M:%S'))
-            
-            query += " GROUP BY campaign_id"
-            
-            results = self.db.fetch_all(query, tuple(params))
+                FROM ({facts})
+                GROUP BY campaign_id
+                """,
+                tuple(params)
+            )
             
+            if metric == 'reach':
+                # Merged sketches instead of a distinct count per campaign
+                return {
+                    row['campaign_id']: self.get_reach(
+                        [row['campaign_id']], start_date, end_date
+                    )
+                    for row in results
+                }
             return {
                 row['campaign_id']: row['value']
                 for row in results
@@ -279,24 +796,81 @@ class AdAnalytics:
         start_date: Optional[datetime] = None,
         end_date: Optional[datetime] = None
     ) -> Dict:
-        """Generate a comprehensive performance report for a campaign."""
+        """Generate a comprehensive performance report for a campaign.
+        
+        Reads the campaign's facts once and builds every section from that
+        single pass; the results match the individual metric methods.
+        """
         try:
+            overview = FactTotals()
+            assets = defaultdict(FactTotals)
+            playlists = defaultdict(FactTotals)
+            hours = defaultdict(FactTotals)
+            days = defaultdict(FactTotals)
+            
+            facts, params = self._facts([campaign_id], start_date, end_date)
+            for row in self.db.execute(f"SELECT {FACT_COLUMNS} FROM ({facts})", tuple(params)):
+                hour = row['hour']  # 'YYYY-MM-DD HH:00:00'
+                overview.add(row)
+                assets[row['asset_id']].add(row)
+                playlists[row['playlist_id']].add(row)
+                hours[hour[11:13]].add(row)
+                days[hour[:10]].add(row)
+            
+            asset_rows = self.db.fetch_all(
+                """
+                SELECT a.id, a.type, m.title
+                FROM ad_assets a
+                JOIN media m ON a.media_id = m.id
+                WHERE a.campaign_id = ?
+                """,
+                (campaign_id,)
+            )
+            playlist_names = {}
+            if playlists:
+                ids = sorted(playlists)
+                playlist_names = {
+                    row['id']: row['name'] for row in self.db.fetch_all(
+                        f"SELECT id, name FROM playlists WHERE id IN ({','.join('?' * len(ids))})",
+                        tuple(ids)
+                    )
+                }
+            
+            def distribution(periods):
+                return [{
+                    'period': period,
+                    'impressions': totals.impressions,
+                    'completions': totals.completions,
+                    'reach': totals.reach
+                } for period, totals in sorted(periods.items())]
+            
             return {
-                'overview': self.get_campaign_metrics(
-                    campaign_id, start_date, end_date
-                ),
-                'assets': self.get_asset_performance(
-                    campaign_id, start_date, end_date
-                ),
-                'hourly_distribution': self.get_time_distribution(
-                    campaign_id, 'hour', start_date, end_date
-                ),
-                'daily_distribution': self.get_time_distribution(
-                    campaign_id, 'day', start_date, end_date
-                ),
-                'playlist_performance': self.get_playlist_performance(
-                    campaign_id, start_date, end_date
-                )
+                'overview': {
+                    'impressions': overview.impressions,
+                    'completions': overview.completions,
+                    'completion_rate': overview.completion_rate,
+                    'total_duration': overview.total_duration if overview.rows else None,
+                    'avg_view_time': overview.avg_view_time or 0,
+                    'reach': self.get_reach([campaign_id], start_date, end_date)
+                },
+                'assets': [{
+                    **dict_from_row(asset),
+                    'impressions': assets[asset['id']].impressions,
+                    'completions': assets[asset['id']].completions,
+                    'avg_view_time': assets[asset['id']].avg_view_time,
+                    'reach': assets[asset['id']].reach,
+                    'completion_rate': assets[asset['id']].completion_rate
+                } for asset in asset_rows],
+                'hourly_distribution': distribution(hours),
+                'daily_distribution': distribution(days),
+                'playlist_performance': [{
+                    'playlist_id': playlist_id,
+                    'playlist_name': playlist_names[playlist_id],
+                    'impressions': playlists[playlist_id].impressions,
+                    'completions': playlists[playlist_id].completions,
+                    'avg_view_time': playlists[playlist_id].avg_view_time,
+                    'completion_rate': playlists[playlist_id].completion_rate
+                } for playlist_id in sorted(playlists) if playlist_id in playlist_names]
             }
 
         except Exception as e:
@@ -5,6 +5,8 @@ import json
 from ..core.logging import ad_logger, log_function_call, log_error
 from ..core.database import Database, dict_from_row
 from ..media.processor import MediaProcessor
+from ..playlist.ad_rules import ad_rule_cache
+from .sampler import asset_sampler
 
 class CampaignManager:
     """Manages ad campaigns and their assets."""
@@ -82,6 +84,9 @@ class CampaignManager:
                     updates,
                     {'id': campaign_id}
                 )
+                # A campaign can be scheduled on any playlist
+                ad_rule_cache.invalidate()
+                asset_sampler.invalidate(campaign_id)
                 return True
             return False
 
@@ -126,7 +131,9 @@ class CampaignManager:
                 'active': True
             }
             
-            return self.db.insert('ad_assets', asset_data)
+            asset_id = self.db.insert('ad_assets', asset_data)
+            asset_sampler.invalidate(campaign_id)
+            return asset_id
 
         except Exception as e:
             self.logger.error(
@@ -155,6 +162,11 @@ class CampaignManager:
                     updates,
                     {'id': asset_id}
                 )
+                asset = self.db.fetch_one(
+                    "SELECT campaign_id FROM ad_assets WHERE id = ?",
+                    (asset_id,)
+                )
+                asset_sampler.invalidate(asset['campaign_id'] if asset else None)
                 return True
             return False
 
@@ -178,6 +190,7 @@ class CampaignManager:
             
             # Delete asset
             self.db.delete('ad_assets', {'id': asset_id})
+            asset_sampler.invalidate(asset['campaign_id'])
             return True
 
         except Exception as e:
@@ -0,0 +1,53 @@
+"""Downsampling of time series for dashboard charts.
+
+Uses Largest-Triangle-Three-Buckets (LTTB): the series is split into
+buckets and from each one the point forming the largest triangle with the
+point kept before it and the average of the next bucket is kept. Peaks
+and dips survive, and every point returned is a real row, so values are
+never averaged away. Totals should still come from the full data.
+"""
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+# Points a chart gets when it does not ask for a count
+CHART_POINTS = 500
+
+def lttb(y: Sequence[float], points: int, x: Optional[Sequence[float]] = None) -> List[int]:
+    """Pick the indices of ``points`` representative points of a series.
+
+    ``x`` defaults to the positions of ``y`` and must be ascending. The
+    first and last points are always kept; series no longer than
+    ``points`` (or a count under 3) are returned whole.
+    """
+    n = len(y)
+    if points >= n or points < 3:
+        return list(range(n))
+
+    y = np.asarray(y, dtype=float)
+    x = np.arange(n, dtype=float) if x is None else np.asarray(x, dtype=float)
+    every = (n - 2) / (points - 2)
+    selected = [0]
+    a = 0
+    for i in range(points - 2):
+        lo = int(i * every) + 1
+        hi = int((i + 1) * every) + 1
+        next_hi = min(int((i + 2) * every) + 1, n)
+        avg_x = x[hi:next_hi].mean()
+        avg_y = y[hi:next_hi].mean()
+        area = np.abs(
+            (x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a])
+        )
+        a = lo + int(area.argmax())
+        selected.append(a)
+    selected.append(n - 1)
+    return selected
+
+def downsample(
+    rows: List[Dict],
+    points: int,
+    key: str = 'impressions',
+    x: Optional[Sequence[float]] = None
+) -> List[Dict]:
+    """Keep ``points`` rows of an ordered series, chosen by LTTB on ``key``."""
+    return [rows[i] for i in lttb([row[key] or 0 for row in rows], points, x)]
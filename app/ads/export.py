@@ -0,0 +1,332 @@
+"""Columnar export of ad_logs for offline analytics.
+
+Each closed UTC day of ad_logs is written to a compressed Parquet
+partition, ``<export_path>/date=YYYY-MM-DD/ad_logs.parquet``. Readers load
+only the days and columns they ask for instead of pulling rows through
+SQLite; days that are not exported yet (today) are read from ad_logs.
+"""
+import os
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, Iterator, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from ..core.logging import ad_logger, log_function_call
+from ..core.database import Database
+
+EXPORT_NAME = 'ad_log_exports'
+
+SCHEMA = pa.schema([
+    ('id', pa.int64()),
+    ('campaign_id', pa.int64()),
+    ('asset_id', pa.int64()),
+    ('playlist_id', pa.int64()),
+    ('timestamp', pa.timestamp('ms')),  # Parquet has no seconds unit
+    ('duration', pa.int64()),
+    ('completed', pa.bool_())
+])
+COLUMNS = SCHEMA.names
+
+# Keep nullable ids and flags as integers/booleans rather than floats
+PANDAS_TYPES = {pa.int64(): pd.Int64Dtype(), pa.bool_(): pd.BooleanDtype()}
+
+# Rows read from SQLite per Parquet row group
+CHUNK_SIZE = 100000
+
+def day_start(day: date) -> str:
+    """Format the start of a day as stored in ad_logs."""
+    return day.strftime('%Y-%m-%d 00:00:00')
+
+def days_between(start_day: date, end_day: date) -> Iterator[date]:
+    """Yield each day from start_day to end_day inclusive."""
+    day = start_day
+    while day <= end_day:
+        yield day
+        day += timedelta(days=1)
+
+def partition_path(root: str, day: date) -> str:
+    """Get the file holding one day of exported logs."""
+    return os.path.join(root, f'date={day.isoformat()}', 'ad_logs.parquet')
+
+def schema_for(columns: Sequence[str]) -> pa.Schema:
+    """Get the export schema for a subset of columns."""
+    return pa.schema([SCHEMA.field(column) for column in columns])
+
+def to_frame(table: pa.Table) -> pd.DataFrame:
+    """Convert an Arrow table using the export column types."""
+    return table.to_pandas(types_mapper=PANDAS_TYPES.get)
+
+def query_ad_logs(
+    db: Database,
+    start_day: date,
+    end_day: date,
+    columns: Sequence[str] = COLUMNS,
+    campaign_ids: Optional[Iterable[int]] = None,
+    chunk_size: int = CHUNK_SIZE
+) -> Iterator[pa.Table]:
+    """Read days [start_day, end_day] straight from ad_logs.
+
+    Yields Arrow tables of up to ``chunk_size`` rows in id order.
+    """
+    where = ["timestamp >= ?", "timestamp < ?"]
+    params = [day_start(start_day), day_start(end_day + timedelta(days=1))]
+    if campaign_ids is not None:
+        campaign_ids = list(campaign_ids)
+        if not campaign_ids:
+            return
+        where.append(f"campaign_id IN ({','.join('?' * len(campaign_ids))})")
+        params.extend(campaign_ids)
+
+    schema = schema_for(columns)
+    for chunk in pd.read_sql_query(
+        f"SELECT {', '.join(columns)} FROM ad_logs WHERE {' AND '.join(where)} ORDER BY id",
+        db.connection,
+        params=params,
+        parse_dates=['timestamp'] if 'timestamp' in columns else None,
+        chunksize=chunk_size
+    ):
+        yield pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+
+def read_partition(
+    path: str,
+    columns: Sequence[str] = COLUMNS,
+    campaign_ids: Optional[Iterable[int]] = None
+) -> pa.Table:
+    """Read chosen columns of one exported day, optionally for some campaigns."""
+    filters = [('campaign_id', 'in', list(campaign_ids))] if campaign_ids is not None else None
+    return pq.read_table(path, columns=list(columns), filters=filters)
+
+def iter_partition(
+    path: str,
+    columns: Sequence[str] = COLUMNS,
+    campaign_ids: Optional[Iterable[int]] = None,
+    chunk_size: int = CHUNK_SIZE
+) -> Iterator[pa.Table]:
+    """Yield one exported day in Arrow tables of up to ``chunk_size`` rows."""
+    columns = list(columns)
+    wanted = columns
+    if campaign_ids is not None:
+        campaign_ids = pa.array(list(campaign_ids), pa.int64())
+        if 'campaign_id' not in columns:
+            wanted = columns + ['campaign_id']
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size, columns=wanted):
+        table = pa.Table.from_batches([batch])
+        if campaign_ids is not None:
+            table = table.filter(pc.is_in(table['campaign_id'], value_set=campaign_ids))
+        yield table.select(columns)
+
+def read_ad_logs(
+    root: str,
+    start_day: date,
+    end_day: date,
+    columns: Sequence[str] = COLUMNS,
+    campaign_ids: Optional[Iterable[int]] = None
+) -> pd.DataFrame:
+    """Load exported days [start_day, end_day] without touching the database.
+
+    Days that were never exported are skipped; use ``load_ad_logs`` to fill
+    them in from ad_logs.
+    """
+    tables = [
+        read_partition(partition_path(root, day), columns, campaign_ids)
+        for day in days_between(start_day, end_day)
+        if os.path.exists(partition_path(root, day))
+    ]
+    return to_frame(pa.concat_tables(tables) if tables else schema_for(columns).empty_table())
+
+def iter_ad_logs(
+    db: Database,
+    root: str,
+    start_day: date,
+    end_day: date,
+    columns: Sequence[str] = COLUMNS,
+    campaign_ids: Optional[Iterable[int]] = None,
+    chunk_size: int = CHUNK_SIZE
+) -> Iterator[pa.Table]:
+    """Yield ad logs for days [start_day, end_day] in Arrow tables of up to ``chunk_size`` rows.
+
+    Exported days are streamed from their Parquet partitions, reading only
+    ``columns``; the rest (usually just today) are queried from ad_logs.
+    Memory use depends on the chunk size, not on the length of the range.
+    """
+    if campaign_ids is not None:
+        campaign_ids = list(campaign_ids)
+    exported = {
+        row['day'] for row in db.fetch_all(
+            "SELECT day FROM ad_log_exports WHERE day >= ? AND day <= ?",
+            (start_day.isoformat(), end_day.isoformat())
+        )
+    }
+
+    for day in days_between(start_day, end_day):
+        path = partition_path(root, day)
+        if day.isoformat() in exported and os.path.exists(path):
+            yield from iter_partition(path, columns, campaign_ids, chunk_size)
+        else:
+            yield from query_ad_logs(db, day, day, columns, campaign_ids, chunk_size)
+
+def load_ad_logs(
+    db: Database,
+    root: str,
+    start_day: date,
+    end_day: date,
+    columns: Sequence[str] = COLUMNS,
+    campaign_ids: Optional[Iterable[int]] = None
+) -> pd.DataFrame:
+    """Load ad logs for days [start_day, end_day] as one typed DataFrame."""
+    tables = list(iter_ad_logs(db, root, start_day, end_day, columns, campaign_ids))
+    return to_frame(pa.concat_tables(tables) if tables else schema_for(columns).empty_table())
+
+def totals_by(
+    db: Database,
+    root: str,
+    key: Optional[str],
+    start_day: date,
+    end_day: date,
+    known: Optional[Dict[str, Iterable[int]]] = None,
+    chunk_size: int = CHUNK_SIZE
+) -> pd.DataFrame:
+    """Count plays and completions per ``key`` for days [start_day, end_day].
+
+    ``key`` is an id column, ``'date'`` for the UTC day, or None for one
+    overall total. ``known`` keeps only rows whose ids are in the given
+    sets, e.g. ``{'asset_id': asset_ids}``, as a join would. Each chunk is
+    grouped on its own and folded into the running totals, so only one
+    chunk of logs is held at a time. Returns a frame indexed by key with
+    ``plays`` and ``completions``.
+    """
+    known = {
+        column: pa.array(list(ids), pa.int64())
+        for column, ids in (known or {}).items()
+    }
+    columns = {'completed', *known}
+    if key == 'date':
+        columns.add('timestamp')
+    elif key:
+        columns.add(key)
+
+    totals = pd.DataFrame(
+        {'plays': pd.Series(dtype='int64'), 'completions': pd.Series(dtype='int64')}
+    )
+    for table in iter_ad_logs(db, root, start_day, end_day, sorted(columns), chunk_size=chunk_size):
+        for column, ids in known.items():
+            table = table.filter(pc.is_in(table[column], value_set=ids))
+        if key == 'date':
+            keys = pc.strftime(table['timestamp'], format='%Y-%m-%d').to_numpy(zero_copy_only=False)
+        elif key:
+            table = table.filter(pc.is_valid(table[key]))
+            keys = table[key].to_numpy()
+        else:
+            keys = np.zeros(table.num_rows, dtype=np.int64)
+        completed = pc.fill_null(table['completed'], False).to_numpy(zero_copy_only=False)
+        part = pd.DataFrame({'plays': 1, 'completions': completed.astype('int64')}, index=keys)
+        totals = totals.add(part.groupby(level=0).sum(), fill_value=0)
+    totals.index.name = key
+    return totals.astype('int64')
+
+def hourly_counts(
+    db: Database,
+    root: str,
+    start_day: date,
+    end_day: date,
+    chunk_size: int = CHUNK_SIZE
+) -> np.ndarray:
+    """Count plays per hour of the day (UTC) as an array of 24 totals."""
+    counts = np.zeros(24, dtype=np.int64)
+    for table in iter_ad_logs(db, root, start_day, end_day, ['timestamp'], chunk_size=chunk_size):
+        hours = pc.hour(table['timestamp']).drop_null().to_numpy()
+        counts += np.bincount(hours, minlength=24)
+    return counts
+
+class AdLogExporter:
+    """Writes closed days of ad_logs to Parquet partitions."""
+
+    def __init__(self, db: Database, root: str, compression: str = 'zstd'):
+        self.db = db
+        self.root = root
+        self.compression = compression
+        self.logger = ad_logger
+
+    def export_day(self, day: date) -> int:
+        """Write one day of ad_logs, replacing any earlier export of it.
+
+        Rows are streamed from SQLite in chunks, so memory stays flat however
+        busy the day was. Returns the number of rows written.
+        """
+        path = partition_path(self.root, day)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.tmp'
+        rows = 0
+        with pq.ParquetWriter(tmp_path, SCHEMA, compression=self.compression) as writer:
+            for table in query_ad_logs(self.db, day, day):
+                writer.write_table(table)
+                rows += table.num_rows
+        os.replace(tmp_path, path)
+
+        self.db.execute(
+            """
+            INSERT OR REPLACE INTO ad_log_exports (day, path, rows, exported_at)
+            VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+            """,
+            (day.isoformat(), path, rows)
+        )
+        return rows
+
+    @log_function_call(ad_logger)
+    def export_closed(self, today: Optional[date] = None) -> Dict[str, int]:
+        """Export every closed day with logs written since the last run.
+
+        A day is closed once it has ended (UTC). The watermark stops short of
+        the first log from an open day, so late logs for a day that was
+        already exported are picked up by a later run and the day is
+        written again. Returns rows written per day.
+        """
+        today = today or datetime.utcnow().date()
+        conn = self.db.connection
+        try:
+            conn.execute(
+                "INSERT OR IGNORE INTO rollup_watermarks (name, last_id) VALUES (?, 0)",
+                (EXPORT_NAME,)
+            )
+            last_id = conn.execute(
+                "SELECT last_id FROM rollup_watermarks WHERE name = ?",
+                (EXPORT_NAME,)
+            ).fetchone()[0]
+            first_open = conn.execute(
+                "SELECT MIN(id) FROM ad_logs WHERE id > ? AND timestamp >= ?",
+                (last_id, day_start(today))
+            ).fetchone()[0]
+            upto = (
+                first_open - 1 if first_open is not None
+                else conn.execute("SELECT MAX(id) FROM ad_logs").fetchone()[0]
+            )
+            if upto is None or upto <= last_id:
+                conn.commit()
+                return {}
+
+            days = [
+                date.fromisoformat(row[0]) for row in conn.execute(
+                    """
+                    SELECT DISTINCT date(timestamp) FROM ad_logs
+                    WHERE id > ? AND id <= ?
+                    ORDER BY 1
+                    """,
+                    (last_id, upto)
+                )
+            ]
+            exported = {day.isoformat(): self.export_day(day) for day in days}
+            conn.execute(
+                "UPDATE rollup_watermarks SET last_id = ? WHERE name = ?",
+                (upto, EXPORT_NAME)
+            )
+            conn.commit()
+            return exported
+
+        except Exception as e:
+            conn.rollback()
+            self.logger.error(f"Failed to export ad logs: {str(e)}")
+            raise
@@ -0,0 +1,345 @@
+import atexit
+import glob
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from ..core.config import get_settings
+from ..core.logging import ad_logger
+
+# SQLite's default limit on bound parameters per statement is 999
+_ID_CHUNK = 500
+
+def make_impression(
+    playlist_id: int,
+    campaign_id: int,
+    asset_id: int,
+    duration: Optional[int],
+    completed: bool = True,
+    position: Optional[int] = None
+) -> Dict:
+    """Build an impression event, stamped now (UTC, like CURRENT_TIMESTAMP).
+
+    ``position`` is the playlist position the ad aired at.
+    """
+    return {
+        'event_id': uuid.uuid4().hex,
+        'playlist_id': playlist_id,
+        'campaign_id': campaign_id,
+        'asset_id': asset_id,
+        'duration': duration,
+        'completed': bool(completed),
+        'position': position,
+        'timestamp': datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+    }
+
+def write_impressions(conn, events: List[Dict]) -> int:
+    """Write a batch of impressions. Does not commit.
+
+    Inserts the ad_logs rows, bumps ad_play_counters and moves
+    last_ad_position for every playlist involved, so the caller can commit
+    them as one transaction. last_ad_position only moves forward, to the
+    latest position the events aired at; events without one (spooled by
+    older versions) fall back to the playlist's current position. Events already stored (matched on event_id,
+    e.g. replayed from the spool after a crash) are skipped. Returns the
+    number of new rows.
+    """
+    ids = [event['event_id'] for event in events]
+    existing = set()
+    for start in range(0, len(ids), _ID_CHUNK):
+        chunk = ids[start:start + _ID_CHUNK]
+        rows = conn.execute(
+            f"SELECT event_id FROM ad_logs WHERE event_id IN ({','.join('?' * len(chunk))})",
+            chunk
+        ).fetchall()
+        existing.update(row[0] for row in rows)
+    events = [event for event in events if event['event_id'] not in existing]
+    if not events:
+        return 0
+
+    conn.executemany(
+        """
+        INSERT INTO ad_logs
+        (event_id, campaign_id, asset_id, playlist_id, timestamp, duration, completed)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        """,
+        [
+            (e['event_id'], e['campaign_id'], e['asset_id'], e['playlist_id'],
+             e['timestamp'], e['duration'], e['completed'])
+            for e in events
+        ]
+    )
+
+    plays = Counter((e['playlist_id'], e['campaign_id']) for e in events)
+    conn.executemany(
+        """
+        INSERT INTO ad_play_counters (playlist_id, campaign_id, plays)
+        VALUES (?, ?, ?)
+        ON CONFLICT (playlist_id, campaign_id)
+        DO UPDATE SET plays = plays + excluded.plays
+        """,
+        [(playlist_id, campaign_id, count) for (playlist_id, campaign_id), count in plays.items()]
+    )
+
+    positions: Dict[int, Optional[int]] = {}
+    for e in events:
+        latest = positions.get(e['playlist_id'])
+        if e.get('position') is not None and (latest is None or e['position'] > latest):
+            positions[e['playlist_id']] = e['position']
+        else:
+            positions.setdefault(e['playlist_id'], None)
+    conn.executemany(
+        """
+        UPDATE playlist_state
+        SET last_ad_position = MAX(last_ad_position, COALESCE(?, current_position))
+        WHERE playlist_id = ?
+        """,
+        [(position, playlist_id) for playlist_id, position in positions.items()]
+    )
+    return len(events)
+
+def _pid_alive(pid: int) -> bool:
+    """Check whether a process is still running."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # Running, as another user
+    return True
+
+class ImpressionQueue:
+    """Buffers ad impressions in memory and writes them in batches.
+
+    Each event is appended to a local spool file before ``record`` returns,
+    so a crash loses nothing: ``recover`` replays the spool on the next
+    start. A background thread flushes once ``batch_size`` events are
+    waiting or every ``flush_interval`` seconds, whichever comes first.
+
+    Every process spools to ``<spool_path>.<pid>`` and its rotated segments
+    to ``<spool_path>.<pid>.<id>``, so processes sharing a spool path never
+    touch each other's files; recovery only claims those of exited ones.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        spool_path: str,
+        batch_size: int = 100,
+        flush_interval: float = 5.0
+    ):
+        self.db_path = db_path
+        self.spool_path = spool_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.logger = ad_logger
+        self._pending: List[Dict] = []
+        self._segments: List[str] = []  # Rotated spool files not yet committed
+        self._spool = None
+        self._lock = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = False
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """Get the writer's own database connection."""
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.db_path, check_same_thread=False)
+        return self._connection
+
+    @property
+    def active_path(self) -> str:
+        """Get this process's spool file."""
+        return f"{self.spool_path}.{os.getpid()}"
+
+    def _segment_path(self) -> str:
+        """Get a new, unique name for a spool segment of this process."""
+        return f"{self.active_path}.{uuid.uuid4().hex}"
+
+    def _is_orphaned(self, path: str) -> bool:
+        """Check a spool file was left by a process that has exited.
+
+        Files of this process's pid that the queue does not hold are from an
+        earlier process that had the same pid. The unsuffixed spool_path is
+        the single spool older versions shared, which no process owns now.
+        """
+        owner = path[len(self.spool_path):].lstrip('.').split('.')[0]
+        if not owner.isdigit() or int(owner) == os.getpid():
+            return True
+        return not _pid_alive(int(owner))
+
+    def _append_to_spool(self, events: Iterable[Dict]) -> None:
+        """Persist events to the active spool file. Caller holds the lock."""
+        if self._spool is None:
+            os.makedirs(os.path.dirname(self.spool_path) or '.', exist_ok=True)
+            self._spool = open(self.active_path, 'a', encoding='utf-8')
+        for event in events:
+            self._spool.write(json.dumps(event) + '\n')
+        self._spool.flush()
+
+    def _rotate_spool(self) -> None:
+        """Move the active spool aside so it can be deleted once committed."""
+        if self._spool is not None:
+            self._spool.close()
+            self._spool = None
+        if os.path.exists(self.active_path):
+            segment = self._segment_path()
+            os.replace(self.active_path, segment)
+            self._segments.append(segment)
+
+    def record(
+        self,
+        playlist_id: int,
+        campaign_id: int,
+        asset_id: int,
+        duration: Optional[int],
+        completed: bool = True,
+        position: Optional[int] = None
+    ) -> Dict:
+        """Queue an impression. Returns the event."""
+        event = make_impression(playlist_id, campaign_id, asset_id, duration, completed, position)
+        with self._lock:
+            self._append_to_spool([event])
+            self._pending.append(event)
+            if len(self._pending) >= self.batch_size:
+                self._lock.notify()
+        return event
+
+    def recover(self) -> int:
+        """Queue events left in spool files by processes that have exited.
+
+        Spools of running processes are left alone. Each orphan is renamed
+        to a segment of this queue before it is read, so when two processes
+        recover at once only one of them replays it.
+        """
+        with self._lock:
+            held = set(self._segments)
+            if self._spool is not None:
+                held.add(self.active_path)
+
+        paths = sorted(glob.glob(f"{glob.escape(self.spool_path)}.*"))
+        if os.path.exists(self.spool_path):
+            paths.append(self.spool_path)
+
+        claimed = []
+        for path in paths:
+            if path in held or not self._is_orphaned(path):
+                continue
+            segment = self._segment_path()
+            try:
+                os.replace(path, segment)
+            except FileNotFoundError:
+                continue  # Claimed by another process first
+            claimed.append(segment)
+
+        events = []
+        for path in claimed:
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        events.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        # A torn final line from the crash
+                        continue
+
+        with self._lock:
+            self._segments = claimed + self._segments
+            self._pending = events + self._pending
+        if events:
+            self.logger.info(f"Recovered {len(events)} spooled ad impressions")
+        return len(events)
+
+    def flush(self) -> int:
+        """Write all pending events in one transaction. Returns rows written."""
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                events, self._pending = self._pending, []
+                self._rotate_spool()
+                segments, self._segments = self._segments, []
+
+            conn = self.connection
+            try:
+                written = write_impressions(conn, events)
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                with self._lock:
+                    # Keep them for the next attempt; they are still spooled
+                    self._pending = events + self._pending
+                    self._segments = segments + self._segments
+                self.logger.error(f"Error writing ad impressions: {str(e)}")
+                raise
+
+            for segment in segments:
+                try:
+                    os.remove(segment)
+                except OSError:
+                    pass
+            return written
+
+    def _run(self) -> None:
+        """Worker loop: flush on batch size or interval."""
+        while True:
+            with self._lock:
+                if not self._stopped and len(self._pending) < self.batch_size:
+                    self._lock.wait(self.flush_interval)
+                stopped = self._stopped
+            try:
+                self.flush()
+            except Exception:
+                pass  # Logged by flush; retried next round
+            if stopped:
+                return
+
+    def start(self) -> None:
+        """Replay the spool and start the flush thread."""
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stopped = False
+        self.recover()
+        self._thread = threading.Thread(
+            target=self._run, name='ad-impression-writer', daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Flush what is left and stop the flush thread."""
+        with self._lock:
+            self._stopped = True
+            self._lock.notify()
+        if self._thread:
+            self._thread.join(timeout=10)
+            self._thread = None
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+_impression_queue = None
+
+def get_impression_queue() -> ImpressionQueue:
+    """Get the process-wide impression queue, starting it on first use."""
+    global _impression_queue
+    if _impression_queue is None:
+        settings = get_settings()
+        _impression_queue = ImpressionQueue(
+            settings.database.path,
+            settings.ads.impression_spool_path,
+            batch_size=settings.ads.impression_batch_size,
+            flush_interval=settings.ads.impression_flush_interval
+        )
+        _impression_queue.start()
+        atexit.register(_impression_queue.stop)
+    return _impression_queue
@@ -0,0 +1,275 @@
+import threading
+import time
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from ..core.config import get_settings
+from ..core.database import Database
+from ..core.logging import ad_logger
+from ..playlist.ad_rules import ad_rule_cache
+from ..playlist.scheduler import AdScheduler
+from .sampler import asset_sampler
+
+# Planned breaks are dropped after this many seconds even without an edit,
+# matching how long the rule and sampler caches trust themselves
+PLAN_MAX_AGE = 300
+
+# How often the planner tops up its stations without being asked
+REFILL_INTERVAL = 30
+
+# Length assumed for an ad whose media has no duration
+AD_DEFAULT_DURATION = 30
+
+# A planned pod: (cache generation, monotonic time planned, ads)
+Plan = Tuple[Tuple[int, int], float, List[Dict]]
+
+def ad_duration(ad: Dict) -> float:
+    """Get an ad's length in seconds."""
+    try:
+        duration = float(ad.get('duration') or 0)
+    except (TypeError, ValueError):
+        duration = 0
+    return duration if duration > 0 else AD_DEFAULT_DURATION
+
+def build_pod(
+    draw: Callable[[], Optional[Dict]],
+    max_ads: int,
+    max_duration: float
+) -> List[Dict]:
+    """Fill one ad break from ``draw`` within the count and length limits.
+
+    The first ad is always taken so a break is never empty just because a
+    single spot runs long. The same asset is not repeated within a break.
+    """
+    pod = []
+    seen = set()
+    total = 0.0
+    for _ in range(max_ads * 3):
+        if len(pod) >= max_ads:
+            break
+        ad = draw()
+        if ad is None:
+            break
+        asset_id = ad.get('asset_id', ad.get('id'))
+        if asset_id in seen:
+            continue
+        length = ad_duration(ad)
+        if pod and total + length > max_duration:
+            continue
+        pod.append(ad)
+        seen.add(asset_id)
+        total += length
+    return pod
+
+def plan_pod(
+    db: Database,
+    playlist_id: int,
+    max_ads: int,
+    max_duration: float,
+    planned: Optional[Counter] = None
+) -> List[Dict]:
+    """Plan one ad break for a playlist.
+
+    Playlists with ad schedules pick campaigns by their rules; others draw
+    from every running campaign, as the playback engine always has.
+    ``planned`` counts ads per campaign that are planned but not played
+    yet. Target shares count them as played, and every draw is added, so
+    successive breaks do not all go to the campaign furthest behind.
+    """
+    scheduler = AdScheduler(db)
+    if scheduler.get_rules(playlist_id):
+        planned = Counter() if planned is None else planned
+
+        def draw() -> Optional[Dict]:
+            ad = scheduler.get_next_ad(playlist_id, planned=planned)
+            if ad:
+                planned[ad['campaign_id']] += 1
+            return ad
+
+        return build_pod(draw, max_ads, max_duration)
+    return build_pod(lambda: asset_sampler.draw(db), max_ads, max_duration)
+
+def cache_generation() -> Tuple[int, int]:
+    """Get a token that changes whenever ad schedules, campaigns or assets do."""
+    return ad_rule_cache.generation, asset_sampler.generation
+
+class AdBreakPlanner:
+    """Keeps the next few ad breaks planned for each active playlist.
+
+    A worker thread fills every watched playlist up to ``breaks`` pods, so
+    the playback engine only has to pop one. Pods are stamped with the
+    rule and sampler cache generations and thrown away once an edit bumps
+    either, which is the only time anything is re-planned.
+    """
+
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        breaks: int = 3,
+        max_ads: int = 2,
+        max_duration: float = 90,
+        max_age: float = PLAN_MAX_AGE
+    ):
+        self.db_path = db_path
+        self.breaks = breaks
+        self.max_ads = max_ads
+        self.max_duration = max_duration
+        self.max_age = max_age
+        self.logger = ad_logger
+        self._plans: Dict[int, List[Plan]] = {}
+        self._stations: Set[int] = set()
+        self._db: Optional[Database] = None
+        self._db_lock = threading.Lock()
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = False
+
+    @property
+    def db(self) -> Database:
+        """Get the planner's own database, shared by the worker and callers."""
+        if self._db is None:
+            self._db = Database(
+                self.db_path or get_settings().database.path,
+                check_same_thread=False
+            )
+        return self._db
+
+    def _plan(self, playlist_id: int, pending: Iterable[Dict] = ()) -> List[Dict]:
+        """Plan one break now, after the pods held and the ``pending`` ads."""
+        with self._condition:
+            ads = [
+                ad for plan in self._plans.get(playlist_id, []) if self.is_fresh(plan)
+                for ad in plan[2]
+            ]
+        planned = Counter(ad.get('campaign_id') for ad in list(pending) + ads)
+        with self._db_lock:
+            return plan_pod(self.db, playlist_id, self.max_ads, self.max_duration, planned)
+
+    def is_fresh(self, plan: Plan) -> bool:
+        """Check a planned pod was made under the current generation, recently."""
+        return plan[0] == cache_generation() and time.monotonic() - plan[1] <= self.max_age
+
+    def planned(self, playlist_id: int) -> int:
+        """Count the pods ready for a playlist."""
+        with self._condition:
+            return sum(1 for plan in self._plans.get(playlist_id, []) if self.is_fresh(plan))
+
+    def watch(self, playlist_id: int) -> None:
+        """Start keeping breaks planned for a playlist."""
+        with self._condition:
+            self._stations.add(playlist_id)
+            self._condition.notify()
+
+    def unwatch(self, playlist_id: int) -> None:
+        """Stop planning for a playlist and drop its pods."""
+        with self._condition:
+            self._stations.discard(playlist_id)
+            self._plans.pop(playlist_id, None)
+
+    def ready(self, playlist_id: int) -> bool:
+        """Check a break is available, planning one ahead if none is held.
+
+        The pod planned here is kept for the next ``take``.
+        """
+        if self.planned(playlist_id):
+            return True
+        generation = cache_generation()
+        pod = self._plan(playlist_id)
+        if not pod:
+            return False
+        with self._condition:
+            self._plans.setdefault(playlist_id, []).append((generation, time.monotonic(), pod))
+        return True
+
+    def take_plan(self, playlist_id: int, pending: Iterable[Dict] = ()) -> Optional[Plan]:
+        """Get the next planned break with its stamp, planning one now on a miss.
+
+        Callers that hold the pod before it airs check it with ``is_fresh``.
+        ``pending`` lists ads the caller holds but has not played, which a
+        break planned on a miss accounts for. Returns None when no ad can be
+        scheduled.
+        """
+        with self._condition:
+            plans = self._plans.get(playlist_id, [])
+            while plans:
+                plan = plans.pop(0)
+                if self.is_fresh(plan):
+                    self._condition.notify()
+                    return plan
+            self._condition.notify()
+        generation = cache_generation()
+        pod = self._plan(playlist_id, pending)
+        return (generation, time.monotonic(), pod) if pod else None
+
+    def take(self, playlist_id: int, pending: Iterable[Dict] = ()) -> List[Dict]:
+        """Get the next planned break, planning one now on a miss.
+
+        Returns an empty list when no ad can be scheduled.
+        """
+        plan = self.take_plan(playlist_id, pending)
+        return plan[2] if plan else []
+
+    def refill(self) -> int:
+        """Drop stale pods and plan watched playlists up to ``breaks``.
+
+        Returns the number of pods planned.
+        """
+        with self._condition:
+            stations = list(self._stations)
+            for playlist_id in list(self._plans):
+                self._plans[playlist_id] = [
+                    plan for plan in self._plans[playlist_id] if self.is_fresh(plan)
+                ]
+
+        planned = 0
+        for playlist_id in stations:
+            while self.planned(playlist_id) < self.breaks:
+                generation = cache_generation()
+                pod = self._plan(playlist_id)
+                if not pod:
+                    break  # Nothing to schedule right now
+                with self._condition:
+                    if playlist_id not in self._stations:
+                        break
+                    self._plans.setdefault(playlist_id, []).append(
+                        (generation, time.monotonic(), pod)
+                    )
+                planned += 1
+        return planned
+
+    def _run(self) -> None:
+        """Worker loop: top up planned breaks when woken or every interval."""
+        while True:
+            with self._condition:
+                if self._stopped:
+                    return
+                self._condition.wait(REFILL_INTERVAL)
+                if self._stopped:
+                    return
+            try:
+                self.refill()
+            except Exception as e:
+                self.logger.error(f"Error planning ad breaks: {str(e)}")
+
+    def start(self) -> None:
+        """Start the planning thread."""
+        with self._condition:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stopped = False
+            self._thread = threading.Thread(
+                target=self._run, name='ad-break-planner', daemon=True
+            )
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the planning thread."""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+# Used by the playback engine
+ad_planner = AdBreakPlanner()
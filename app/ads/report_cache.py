@@ -0,0 +1,159 @@
+"""Cache of report aggregates and rendered report files.
+
+Entries are keyed by a hash of the report name, its query spec, the
+period and a fingerprint of the exported ad_logs days it covers. Once a
+period has ended and all of its logs are exported, the data cannot
+change under the same key, so the entry is kept indefinitely; a late
+log re-exports its day, which changes the fingerprint and the key.
+Periods that include today, or have logs not exported yet, are kept
+only for a short timeout.
+"""
+import hashlib
+import json
+import os
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import pandas as pd
+
+from ..core.cache import CacheError, cache_get, cache_set
+from ..core.database import Database
+from ..core.logging import ad_logger
+from .export import EXPORT_NAME, day_start
+
+REPORT_CACHE_PREFIX = 'report'
+
+# Bump when report logic changes so old entries are not reused
+REPORT_CACHE_VERSION = 1
+
+class ReportCache:
+    """Content-addressed cache for report data and files."""
+
+    def __init__(self, db: Database, root: str, open_timeout: int = 300):
+        self.db = db
+        self.root = root
+        self.open_timeout = open_timeout
+        self.logger = ad_logger
+
+    def period_state(
+        self,
+        start_day: date,
+        end_day: date,
+        today: Optional[date] = None
+    ) -> Tuple[bool, list]:
+        """Check whether a period is closed and fingerprint its exported days.
+
+        A period is closed when it ended before today (UTC) and every log
+        in it has been exported. Returns (closed, fingerprint).
+        """
+        today = today or datetime.utcnow().date()
+        fingerprint = [
+            list(row) for row in self.db.fetch_all(
+                """
+                SELECT day, rows, exported_at FROM ad_log_exports
+                WHERE day >= ? AND day <= ?
+                ORDER BY day
+                """,
+                (start_day.isoformat(), end_day.isoformat())
+            )
+        ]
+        if end_day >= today:
+            return False, fingerprint
+
+        unexported = self.db.fetch_one(
+            """
+            SELECT 1 FROM ad_logs
+            WHERE id > COALESCE((SELECT last_id FROM rollup_watermarks WHERE name = ?), 0)
+            AND timestamp >= ? AND timestamp < ?
+            LIMIT 1
+            """,
+            (EXPORT_NAME, day_start(start_day), day_start(end_day + timedelta(days=1)))
+        )
+        return unexported is None, fingerprint
+
+    def key(
+        self,
+        name: str,
+        spec: Dict[str, Any],
+        start_day: date,
+        end_day: date,
+        today: Optional[date] = None
+    ) -> Tuple[str, bool]:
+        """Get the content key for a report over a period, and whether it is closed."""
+        closed, fingerprint = self.period_state(start_day, end_day, today)
+        content = json.dumps({
+            'version': REPORT_CACHE_VERSION,
+            'name': name,
+            'spec': spec,
+            'period': [start_day.isoformat(), end_day.isoformat()],
+            'data': fingerprint
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(content.encode('utf-8')).hexdigest(), closed
+
+    def aggregate(
+        self,
+        name: str,
+        spec: Dict[str, Any],
+        start_day: date,
+        end_day: date,
+        build: Callable[[], pd.DataFrame],
+        today: Optional[date] = None
+    ) -> pd.DataFrame:
+        """Get a report's aggregated data from the cache, building it on a miss."""
+        digest, closed = self.key(name, spec, start_day, end_day, today)
+        cache_key = f"{REPORT_CACHE_PREFIX}:{name}:{digest}"
+        try:
+            cached = cache_get(cache_key)
+            if cached is not None:
+                df = pd.DataFrame.from_records(cached['records'], columns=cached['columns'])
+                if cached['index']:
+                    df = df.set_index(cached['index'])
+                return df
+        except CacheError as e:
+            self.logger.warning(f"Report cache read failed for {name}: {str(e)}")
+
+        df = build()
+        index = list(df.index.names) if any(df.index.names) else None
+        flat = df.reset_index() if index else df
+        try:
+            cache_set(
+                cache_key,
+                {
+                    'index': index,
+                    'columns': list(flat.columns),
+                    'records': flat.to_dict('records')
+                },
+                None if closed else self.open_timeout
+            )
+        except CacheError as e:
+            self.logger.warning(f"Report cache write failed for {name}: {str(e)}")
+        return df
+
+    def file(
+        self,
+        name: str,
+        spec: Dict[str, Any],
+        start_day: date,
+        end_day: date,
+        render: Callable[[str], None],
+        suffix: str = '.pdf',
+        today: Optional[date] = None
+    ) -> str:
+        """Get the path of a rendered report, calling ``render(path)`` on a miss.
+
+        Files for closed periods are reused for good; others are
+        rendered again once older than the open timeout.
+        """
+        digest, closed = self.key(name, spec, start_day, end_day, today)
+        path = os.path.join(self.root, name, f'{digest}{suffix}')
+        if os.path.exists(path) and (
+            closed or time.time() - os.path.getmtime(path) < self.open_timeout
+        ):
+            return path
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.{os.getpid()}.tmp{suffix}'
+        render(tmp_path)
+        os.replace(tmp_path, path)
+        return path
@@ -0,0 +1,139 @@
+import random
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from ..core.logging import ad_logger
+
+# Alias tables are rebuilt after this many seconds even without an edit,
+# so asset changes made by another process are picked up
+SAMPLER_MAX_AGE = 300
+
+ASSET_COLUMNS = """
+    a.id as asset_id,
+    a.campaign_id,
+    a.type,
+    a.duration,
+    a.weight,
+    m.*
+"""
+
+class AliasTable:
+    """Vose's alias method: O(n) to build, O(1) per weighted draw."""
+
+    def __init__(self, weights: Sequence[float]):
+        count = len(weights)
+        total = float(sum(weights))
+        if count == 0 or total <= 0:
+            raise ValueError("Alias table needs at least one positive weight")
+
+        scaled = [weight * count / total for weight in weights]
+        self.prob = [0.0] * count
+        self.alias = [0] * count
+
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            less = small.pop()
+            more = large.pop()
+            self.prob[less] = scaled[less]
+            self.alias[less] = more
+            scaled[more] = scaled[more] + scaled[less] - 1.0
+            (small if scaled[more] < 1.0 else large).append(more)
+
+        # Whatever is left is 1.0 up to rounding error
+        for i in large + small:
+            self.prob[i] = 1.0
+
+    def __len__(self) -> int:
+        return len(self.prob)
+
+    def draw(self, rng: random.Random = random) -> int:
+        """Pick an index with probability proportional to its weight."""
+        column = int(rng.random() * len(self.prob))
+        return column if rng.random() < self.prob[column] else self.alias[column]
+
+class AssetSampler:
+    """Cached per-campaign alias tables over active ad assets.
+
+    Each table holds the asset rows already joined with their media, so a
+    draw needs no query at all. ``campaign_id`` of None samples across
+    every running campaign, which is what the legacy weighted ad picker
+    did over the old ``ads`` table.
+    """
+
+    def __init__(self, max_age: float = SAMPLER_MAX_AGE):
+        self.max_age = max_age
+        self.logger = ad_logger
+        self._tables: Dict[Optional[int], Tuple[float, Optional[AliasTable], List[Dict]]] = {}
+        self._lock = threading.Lock()
+        self.generation = 0  # Bumped on every invalidation
+
+    def _load(self, conn, campaign_id: Optional[int]) -> List[Dict]:
+        """Fetch active, positively weighted assets with their media."""
+        if campaign_id is None:
+            rows = conn.execute(
+                f"""
+                SELECT {ASSET_COLUMNS}
+                FROM ad_assets a
+                JOIN media m ON a.media_id = m.id
+                JOIN ad_campaigns c ON a.campaign_id = c.id
+                WHERE a.active = 1
+                AND a.weight > 0
+                AND c.status = 'active'
+                AND (c.start_date IS NULL OR c.start_date <= datetime('now'))
+                AND (c.end_date IS NULL OR c.end_date >= datetime('now'))
+                ORDER BY a.id
+                """
+            ).fetchall()
+        else:
+            rows = conn.execute(
+                f"""
+                SELECT {ASSET_COLUMNS}
+                FROM ad_assets a
+                JOIN media m ON a.media_id = m.id
+                WHERE a.campaign_id = ?
+                AND a.active = 1
+                AND a.weight > 0
+                ORDER BY a.id
+                """,
+                (campaign_id,)
+            ).fetchall()
+        return [dict(zip(row.keys(), row)) for row in rows]
+
+    def table(self, conn, campaign_id: Optional[int] = None) -> Tuple[Optional[AliasTable], List[Dict]]:
+        """Get the alias table and asset rows for a campaign, building on a miss."""
+        entry = self._tables.get(campaign_id)
+        if entry is not None and time.monotonic() - entry[0] <= self.max_age:
+            return entry[1], entry[2]
+
+        assets = self._load(conn, campaign_id)
+        alias = AliasTable([asset['weight'] for asset in assets]) if assets else None
+        with self._lock:
+            self._tables[campaign_id] = (time.monotonic(), alias, assets)
+        return alias, assets
+
+    def draw(
+        self,
+        conn,
+        campaign_id: Optional[int] = None,
+        rng: random.Random = random
+    ) -> Optional[Dict]:
+        """Draw one asset (with its media fields) by weight, or None."""
+        alias, assets = self.table(conn, campaign_id)
+        if alias is None:
+            return None
+        return dict(assets[alias.draw(rng)])
+
+    def invalidate(self, campaign_id: Optional[int] = None) -> None:
+        """Drop a campaign's table (and the all-campaigns pool), or all tables."""
+        with self._lock:
+            self.generation += 1
+            if campaign_id is None:
+                self._tables.clear()
+            else:
+                self._tables.pop(campaign_id, None)
+                self._tables.pop(None, None)
+
+# Shared by the playback engine and the ad scheduler
+asset_sampler = AssetSampler()
@@ -0,0 +1,220 @@
+"""Replay a playback timeline through the ad scheduler.
+
+Checks pacing (delivered share per campaign against its target) and
+decision speed before a scheduling change is deployed::
+
+    python -m app.ads.simulator instance/database.db --playlist 1 --days 7
+    python -m app.ads.simulator fixture.db --playlist 1 --timeline plays.txt --json
+
+The fixture is copied into memory first, so it is never modified.
+"""
+import argparse
+import json
+import random
+import sqlite3
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from ..core.database import Database
+from ..playlist.ad_rules import ad_rule_cache
+from ..playlist.scheduler import AdScheduler
+from .impressions import make_impression, write_impressions
+from .sampler import asset_sampler
+
+# Typical song length used for synthetic timelines
+DEFAULT_TRACK_LENGTH = 210
+
+def open_fixture(path: str) -> Database:
+    """Copy a SQLite database into memory for a simulation run."""
+    db = Database(':memory:')
+    source = sqlite3.connect(path)
+    try:
+        source.backup(db.connection)
+    finally:
+        source.close()
+    return db
+
+def synthetic_timeline(
+    start: datetime,
+    days: float = 7,
+    track_length: float = DEFAULT_TRACK_LENGTH,
+    jitter: float = 0.25,
+    rng: random.Random = random
+) -> Iterator[datetime]:
+    """Yield track start times for ``days`` of continuous playback.
+
+    Track lengths vary by up to ``jitter`` (a fraction) around
+    ``track_length`` seconds.
+    """
+    end = start + timedelta(days=days)
+    now = start
+    while now < end:
+        yield now
+        length = track_length * (1 + rng.uniform(-jitter, jitter))
+        now += timedelta(seconds=max(length, 1))
+
+def read_timeline(path: str) -> Iterator[datetime]:
+    """Yield recorded track start times, one ISO timestamp per line."""
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.split(',')[0].strip()
+            if line and not line.startswith('#'):
+                yield datetime.fromisoformat(line)
+
+def percentile(values: List[float], pct: float) -> float:
+    """Get the ``pct`` percentile of already sorted values."""
+    if not values:
+        return 0.0
+    index = min(int(round(pct / 100 * (len(values) - 1))), len(values) - 1)
+    return values[index]
+
+def simulate(
+    db: Database,
+    playlist_id: int,
+    timeline: Iterable[datetime],
+    reset_counters: bool = True
+) -> Dict:
+    """Run every track change in ``timeline`` through the scheduler.
+
+    Each track change asks ``should_play_ad`` and, when it says yes,
+    ``get_next_ad``; the chosen ad is logged so target shares evolve as
+    they would live. Only those two calls are timed. Returns delivered
+    plays and share per campaign plus decision throughput and latency.
+    """
+    scheduler = AdScheduler(db)
+    ad_rule_cache.invalidate(playlist_id)
+    asset_sampler.invalidate()
+    if reset_counters:
+        db.execute('DELETE FROM ad_play_counters WHERE playlist_id = ?', (playlist_id,))
+        db.commit()
+
+    position = 0
+    last_ad_position = 0
+    plays = Counter()
+    latencies = []
+    first = last = None
+
+    for now in timeline:
+        first = first or now
+        last = now
+        position += 1
+
+        started = time.perf_counter()
+        ad = None
+        if scheduler.should_play_ad(playlist_id, position, last_ad_position, now=now):
+            ad = scheduler.get_next_ad(playlist_id, now=now)
+        latencies.append(time.perf_counter() - started)
+
+        if ad is None:
+            continue
+        event = make_impression(
+            playlist_id, ad['campaign_id'], ad['asset_id'], ad.get('duration'),
+            position=position
+        )
+        write_impressions(db.connection, [event])
+        db.commit()
+        plays[ad['campaign_id']] += 1
+        last_ad_position = position
+
+    total_ads = sum(plays.values())
+    campaigns = []
+    for row in db.fetch_all(
+        """
+        SELECT DISTINCT c.id, c.name, c.target_percentage
+        FROM ad_schedules s
+        JOIN ad_campaigns c ON s.campaign_id = c.id
+        WHERE s.playlist_id = ?
+        ORDER BY c.id
+        """,
+        (playlist_id,)
+    ):
+        share = plays[row['id']] / total_ads * 100 if total_ads else 0.0
+        target = row['target_percentage']
+        campaigns.append({
+            'campaign_id': row['id'],
+            'name': row['name'],
+            'plays': plays[row['id']],
+            'share': round(share, 2),
+            'target': target,
+            'deviation': round(share - target, 2) if target else None
+        })
+
+    latencies.sort()
+    busy = sum(latencies)
+    hours = (last - first).total_seconds() / 3600 if first and last else 0
+    return {
+        'playlist_id': playlist_id,
+        'tracks': position,
+        'ads': total_ads,
+        'ads_per_hour': round(total_ads / hours, 2) if hours else 0.0,
+        'campaigns': campaigns,
+        'decisions': {
+            'count': len(latencies),
+            'per_second': round(len(latencies) / busy, 1) if busy else 0.0,
+            'p50_ms': round(percentile(latencies, 50) * 1000, 4),
+            'p95_ms': round(percentile(latencies, 95) * 1000, 4),
+            'p99_ms': round(percentile(latencies, 99) * 1000, 4),
+            'max_ms': round(latencies[-1] * 1000, 4) if latencies else 0.0
+        }
+    }
+
+def format_report(report: Dict) -> str:
+    """Render a simulation report as a plain text table."""
+    lines = [
+        f"Playlist {report['playlist_id']}: {report['tracks']} tracks, "
+        f"{report['ads']} ads ({report['ads_per_hour']}/hour)",
+        '',
+        f"{'Campaign':<30} {'Plays':>7} {'Share':>8} {'Target':>8} {'Delta':>8}"
+    ]
+    for campaign in report['campaigns']:
+        target = f"{campaign['target']:.1f}%" if campaign['target'] else '-'
+        delta = f"{campaign['deviation']:+.1f}" if campaign['deviation'] is not None else '-'
+        lines.append(
+            f"{campaign['name'][:30]:<30} {campaign['plays']:>7} "
+            f"{campaign['share']:>7.1f}% {target:>8} {delta:>8}"
+        )
+    decisions = report['decisions']
+    lines += [
+        '',
+        f"Decisions: {decisions['count']} at {decisions['per_second']}/s",
+        f"Latency ms: p50 {decisions['p50_ms']}  p95 {decisions['p95_ms']}  "
+        f"p99 {decisions['p99_ms']}  max {decisions['max_ms']}"
+    ]
+    return '\n'.join(lines)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('database', help='SQLite fixture to simulate against')
+    parser.add_argument('--playlist', type=int, required=True, help='Playlist (station) id')
+    parser.add_argument('--timeline', help='File of recorded track start times')
+    parser.add_argument('--days', type=float, default=7, help='Length of a synthetic run')
+    parser.add_argument('--start', help='Start of a synthetic run (ISO time, default now)')
+    parser.add_argument('--track-length', type=float, default=DEFAULT_TRACK_LENGTH)
+    parser.add_argument('--seed', type=int, help='Seed for repeatable runs')
+    parser.add_argument('--keep-counters', action='store_true',
+                        help="Start from the fixture's play counters instead of zero")
+    parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+    args = parser.parse_args(argv)
+
+    if args.seed is not None:
+        random.seed(args.seed)
+    if args.timeline:
+        timeline = read_timeline(args.timeline)
+    else:
+        start = datetime.fromisoformat(args.start) if args.start else datetime.now()
+        timeline = synthetic_timeline(start, args.days, args.track_length)
+
+    db = open_fixture(args.database)
+    try:
+        report = simulate(db, args.playlist, timeline, not args.keep_counters)
+    finally:
+        db.close()
+
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
+    return 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
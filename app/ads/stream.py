@@ -0,0 +1,124 @@
+"""Streaming export of raw ad_logs for bulk (BI) pulls.
+
+Rows are read in id order with ``fetchmany`` and written out a batch at a
+time as NDJSON or CSV, so memory stays constant however many rows are
+pulled. A page is fixed before streaming starts (rows up to a known id),
+and its end is handed back as a cursor token the next pull resumes from.
+"""
+import base64
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+
+COLUMNS = (
+    'id', 'event_id', 'campaign_id', 'asset_id', 'playlist_id',
+    'timestamp', 'duration', 'completed'
+)
+
+# Rows per fetchmany call, and per chunk written to the response
+FETCH_SIZE = 1000
+
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+def encode_cursor(after_id: int) -> str:
+    """Build an opaque cursor token for resuming after a log id."""
+    raw = json.dumps({'after': after_id}).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(token: str) -> int:
+    """Get the log id a cursor token resumes after.
+
+    Raises ValueError for tokens this module did not produce.
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        after_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))['after']
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {token}") from e
+    if not isinstance(after_id, int) or after_id < 0:
+        raise ValueError(f"Invalid cursor: {token}")
+    return after_id
+
+def log_filter(
+    after_id: int = 0,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    campaign_ids: Optional[Sequence[int]] = None
+) -> Tuple[str, List]:
+    """Build the WHERE clause for an export. ``end`` is exclusive."""
+    where = ["id > ?"]
+    params: List = [after_id]
+    if start:
+        where.append("timestamp >= ?")
+        params.append(start.strftime(TIMESTAMP_FORMAT))
+    if end:
+        where.append("timestamp < ?")
+        params.append(end.strftime(TIMESTAMP_FORMAT))
+    if campaign_ids:
+        where.append(f"campaign_id IN ({','.join('?' * len(campaign_ids))})")
+        params.extend(campaign_ids)
+    return ' AND '.join(where), params
+
+def plan_page(conn, where: str, params: List, limit: Optional[int] = None) -> Tuple[Optional[int], bool]:
+    """Fix the last log id a page covers before streaming it.
+
+    With a ``limit`` the page ends at the limit-th matching row. Otherwise,
+    or when fewer rows match, it ends at the newest log so rows written
+    during the stream are left for the next pull. Returns (upto, more),
+    where ``more`` says rows past the page may already match.
+    """
+    if limit:
+        row = conn.execute(
+            f"SELECT id FROM ad_logs WHERE {where} ORDER BY id LIMIT 1 OFFSET ?",
+            params + [limit - 1]
+        ).fetchone()
+        if row:
+            return row[0], True
+    return conn.execute("SELECT MAX(id) FROM ad_logs").fetchone()[0], False
+
+def iter_batches(
+    conn,
+    where: str,
+    params: List,
+    upto: Optional[int],
+    fetch_size: int = FETCH_SIZE
+) -> Iterator[List[tuple]]:
+    """Yield matching rows up to log id ``upto`` in batches, in id order."""
+    if upto is None:
+        return
+    cursor = conn.execute(
+        f"SELECT {', '.join(COLUMNS)} FROM ad_logs WHERE {where} AND id <= ? ORDER BY id",
+        params + [upto]
+    )
+    try:
+        while True:
+            rows = cursor.fetchmany(fetch_size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        cursor.close()
+
+def ndjson_chunks(batches: Iterable[List[tuple]]) -> Iterator[str]:
+    """Format batches of rows as newline-delimited JSON."""
+    for rows in batches:
+        yield ''.join(json.dumps(dict(zip(COLUMNS, row))) + '\n' for row in rows)
+
+def csv_chunks(batches: Iterable[List[tuple]]) -> Iterator[str]:
+    """Format batches of rows as CSV, starting with a header row."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow(COLUMNS)
+    yield buffer.getvalue()
+    for rows in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(rows)
+        yield buffer.getvalue()
+
+FORMATS = {
+    'ndjson': (ndjson_chunks, 'application/x-ndjson'),
+    'csv': (csv_chunks, 'text/csv')
+}
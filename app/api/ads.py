@@ -1,27 +1,17 @@
-from flask import Blueprint, jsonify, request
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from flask import Blueprint, Response, jsonify, request
+from app.core.config import get_settings
 from app.core.database import get_db
-import random
+from app.ads.sampler import asset_sampler
+from app.ads.stream import FORMATS, decode_cursor, encode_cursor, log_filter, plan_page, iter_batches
 
 ads_api = Blueprint('ads_api', __name__)
 
 def pick_weighted_ad():
-    """Pick an ad based on weights."""
-    db = get_db()
-    ads = db.execute('SELECT * FROM ads WHERE active = 1').fetchall()
-    if not ads:
-        return None
-    
-    total_weight = sum(ad['weight'] for ad in ads)
-    r = random.uniform(0, total_weight)
-    current_weight = 0
-    
-    for ad in ads:
-        current_weight += ad['weight']
-        if r <= current_weight:
-            media = db.execute('SELECT * FROM media WHERE id = ?', [ad['media_id']]).fetchone()
-            return dict(media)
-    
-    return None
+    """Pick an ad asset from the running campaigns based on weights."""
+    return asset_sampler.draw(get_db())
 
 @ads_api.route('/ads', methods=['GET', 'POST'])
 def handle_ads():
@@ -115,3 +105,50 @@ def get_next_ad():
     if not ad:
         return jsonify({'error': 'No ads available'}), 404
     return jsonify(ad)
+
+@ads_api.route('/logs/export')
+def export_logs():
+    """Stream raw ad logs as NDJSON or CSV with constant memory.
+    
+    Rows come in id order from a dedicated read-only connection. The
+    X-Next-Cursor header holds the token to pass as ``cursor`` for the
+    next page (or tomorrow's pull); X-Export-Complete is false when
+    ``limit`` cut the page short.
+    """
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in FORMATS:
+        return jsonify({'error': f"Format must be one of: {', '.join(FORMATS)}"}), 400
+    
+    try:
+        cursor = request.args.get('cursor')
+        after_id = decode_cursor(cursor) if cursor else 0
+        start = datetime.fromisoformat(request.args['start']) if request.args.get('start') else None
+        end = datetime.fromisoformat(request.args['end']) if request.args.get('end') else None
+        campaign_ids = [
+            int(campaign_id)
+            for value in request.args.getlist('campaign_id')
+            for campaign_id in value.split(',') if campaign_id
+        ]
+        limit = int(request.args.get('limit', 0))
+        if limit < 0:
+            raise ValueError("limit must not be negative")
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    database = Path(get_settings().DATABASE_PATH).resolve()
+    conn = sqlite3.connect(f"{database.as_uri()}?mode=ro", uri=True, check_same_thread=False)
+    where, params = log_filter(after_id, start, end, campaign_ids)
+    upto, more = plan_page(conn, where, params, limit)
+    format_chunks, mimetype = FORMATS[fmt]
+    
+    def generate():
+        try:
+            yield from format_chunks(iter_batches(conn, where, params, upto))
+        finally:
+            conn.close()
+    
+    return Response(generate(), mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename=ad_logs.{fmt}',
+        'X-Next-Cursor': encode_cursor(max(upto or 0, after_id)),
+        'X-Export-Complete': 'false' if more else 'true'
+    })
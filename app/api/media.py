@@ -1,6 +1,6 @@
 from flask import Blueprint, jsonify, request, send_file
 from app.core.database import get_db
-from app.media.scanner import scan_media
+from app.media.scanner import scan_media, get_scan_files
 from app.core.files import move_media_file
 import os
 
@@ -209,9 +209,28 @@ def scan_media_endpoint():
             return jsonify({'error': result['error']}), 500
         return jsonify({
             'success': True,
+            'scan_id': result['scan_id'],
             'new_files': result['files_found'],
-            'files': result['files'],
+            'duplicates': result['duplicates'],
             'errors': result['errors']
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+
+@media_api.route('/scans/<int:scan_id>/files')
+def get_scan_files_endpoint(scan_id):
+    """Get the files a media scan added, with pagination."""
+    page, per_page, offset = get_pagination_params()
+    result = get_scan_files(scan_id, per_page, offset)
+    if result is None:
+        return jsonify({'error': 'Scan not found'}), 404
+    
+    total = result['total']
+    return jsonify({
+        'scan': result['scan'],
+        'items': result['files'],
+        'total': total,
+        'page': page,
+        'per_page': per_page,
+        'pages': (total + per_page - 1) // per_page
+    })
@@ -1,5 +1,17 @@
 from flask import Blueprint, jsonify, request
-from app.core.database import get_db, get_playlist_state, save_playlist_state
+from app.core.database import Database, get_db, get_playlist_state, save_playlist_state
+from app.playlist.queue import (
+    AD_INTERVAL, MAX_LOOKAHEAD, project_positions, describe_media, queue_version
+)
+from app.playlist.ordering import insert_items, move_item
+from app.playlist.timer import schedule_timer, parse_days, next_fire_time
+from app.playlist.timeline import Timeline, MAX_HORIZON, MAX_TIMELINE_ITEMS, item_duration
+from app.api.websocket import notify_track_changed, notify_ad_break, notify_playback_state
+from app.ads.planner import ad_planner, ad_duration
+from app.ads.impressions import get_impression_queue
+from app.playlist.scheduler import AdScheduler
+from app.core.config import get_settings
+from datetime import datetime, timedelta
 import random
 
 playlist_api = Blueprint('playlist_api', __name__)
@@ -11,25 +23,86 @@ last_ad_position = 0
 is_repeat = True
 is_shuffle = False
 shuffle_queue = []
+pending_ads = []  # Planner plans (stamp, ads) pinned by /lookahead, played in order
+current_pod = []  # Ads still to play in the break on air
+track_started_at = None  # When the item now playing started
+current_ad = None  # Ad now playing, if an ad break is on air
+_timeline_cache = {}  # Latest projected timeline, keyed by queue version
+_ad_scheduler = None  # Logs ad plays through the impression queue
 
-def pick_weighted_ad():
-    """Pick an ad based on weights."""
-    db = get_db()
-    ads = db.execute('SELECT * FROM ads WHERE active = 1').fetchall()
-    if not ads:
+# Seconds an ad may be cut short and still count as completed
+AD_COMPLETE_SLACK = 2
+
+def event_state():
+    """Get the engine state sent along with playback events."""
+    return {
+        'playlist_id': current_playlist,
+        'position': current_position,
+        'repeat': is_repeat,
+        'shuffle': is_shuffle,
+        'started_at': track_started_at.isoformat() if track_started_at else None
+    }
+
+def pinned_pods():
+    """Get the ads of each pinned break, in play order."""
+    return [plan[2] for plan in pending_ads]
+
+def resolve_pod():
+    """Get the plan for an upcoming break from the planner, or None."""
+    try:
+        held = current_pod + [ad for pod in pinned_pods() for ad in pod]
+        return ad_planner.take_plan(current_playlist, held)
+    except Exception as e:
+        print(f"Error planning ad break: {str(e)}")
         return None
-    
-    total_weight = sum(ad['weight'] for ad in ads)
-    r = random.uniform(0, total_weight)
-    current_weight = 0
-    
-    for ad in ads:
-        current_weight += ad['weight']
-        if r <= current_weight:
-            media = db.execute('SELECT * FROM media WHERE id = ?', [ad['media_id']]).fetchone()
-            return dict(media)
-    
-    return None
+
+def log_ad_play():
+    """Queue an impression for the ad going off air and clear it."""
+    global current_ad, _ad_scheduler
+    ad, current_ad = current_ad, None
+    if not ad or not current_playlist:
+        return
+    played = (datetime.now() - track_started_at).total_seconds() if track_started_at else 0
+    length = ad_duration(ad)
+    try:
+        if _ad_scheduler is None:
+            _ad_scheduler = AdScheduler(
+                Database(get_settings().database.path),
+                impressions=get_impression_queue()
+            )
+        _ad_scheduler.log_ad_play(
+            current_playlist,
+            ad['campaign_id'],
+            ad['asset_id'],
+            int(min(played, length)),
+            completed=played >= length - AD_COMPLETE_SLACK,
+            position=last_ad_position  # Where the break started
+        )
+    except Exception as e:
+        print(f"Error logging ad play: {str(e)}")
+
+def drop_stale_ads():
+    """Forget pinned breaks the planner would no longer serve.
+
+    That is breaks planned before an ad schedule, campaign or asset edit,
+    or longer ago than the planner keeps its own.
+    """
+    pending_ads[:] = [plan for plan in pending_ads if ad_planner.is_fresh(plan)]
+
+def engine_version(playlist_items):
+    """Get the queue version for the engine's current state."""
+    return queue_version(
+        current_playlist,
+        {
+            'current_position': current_position,
+            'last_ad_position': last_ad_position,
+            'is_repeat': is_repeat,
+            'is_shuffle': is_shuffle,
+            'shuffle_queue': shuffle_queue
+        },
+        [item['id'] for item in playlist_items],
+        [ad['id'] for pod in [current_pod] + pinned_pods() for ad in pod]
+    )
 
 @playlist_api.route('/playlists')
 def get_playlists():
@@ -91,18 +164,13 @@ def now_playing():
         print(f"Error in now_playing: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
-@playlist_api.route('/play', methods=['POST'])
-def play_playlist():
-    """Start playing a playlist."""
-    global current_playlist, current_position, last_ad_position, is_repeat, is_shuffle, shuffle_queue
-    
-    data = request.get_json()
-    playlist_id = data.get('playlist_id')
+def activate_playlist(playlist_id):
+    """Switch playback to a playlist, starting from its first track.
     
-    print(f"Received request to play playlist {playlist_id}")
-    
-    if not playlist_id:
-        return jsonify({'error': 'Playlist ID required'}), 400
+    Raises LookupError if the playlist is missing or empty. Used by both
+    /play and the schedule timer.
+    """
+    global current_playlist, current_position, last_ad_position, is_repeat, is_shuffle, shuffle_queue, track_started_at, current_ad
     
     db = get_db()
     try:
@@ -111,7 +179,7 @@ def play_playlist():
         
         playlist = db.execute('SELECT * FROM playlists WHERE id = ?', [playlist_id]).fetchone()
         if not playlist:
-            return jsonify({'error': 'Playlist not found'}), 404
+            raise LookupError('Playlist not found')
             
         # Get playlist items to verify it's not empty
         items = db.execute('''
@@ -123,7 +191,14 @@ def play_playlist():
         ''', [playlist_id]).fetchall()
         
         if not items:
-            return jsonify({'error': 'Playlist is empty'}), 404
+            raise LookupError('Playlist is empty')
+        
+        # An ad cut off by the switch still played, in part
+        log_ad_play()
+        
+        # Stop planning breaks for the playlist being replaced
+        if current_playlist and current_playlist != int(playlist_id):
+            ad_planner.unwatch(current_playlist)
         
         # Start fresh when playing a playlist
         current_playlist = int(playlist_id)
@@ -132,6 +207,11 @@ def play_playlist():
         is_repeat = True  # Always enable repeat by default
         is_shuffle = False  # Start with shuffle off
         shuffle_queue = []
+        pending_ads.clear()
+        current_pod.clear()
+        track_started_at = datetime.now()
+        current_ad = None
+        ad_planner.watch(current_playlist)
         
         # Save state to database
         save_playlist_state({
@@ -150,11 +230,29 @@ def play_playlist():
         
         # Return the first track
         current_track = dict(items[0])
-        return jsonify(current_track)
+        notify_track_changed(current_track, event_state())
+        return current_track
         
+    except Exception:
+        db.rollback()
+        raise
+
+@playlist_api.route('/play', methods=['POST'])
+def play_playlist():
+    """Start playing a playlist."""
+    data = request.get_json()
+    playlist_id = data.get('playlist_id')
+    
+    print(f"Received request to play playlist {playlist_id}")
+    
+    if not playlist_id:
+        return jsonify({'error': 'Playlist ID required'}), 400
+    
+    try:
+        return jsonify(activate_playlist(playlist_id))
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
     except Exception as e:
-        if db:
-            db.rollback()
         print(f"Error starting playlist: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
@@ -192,25 +290,11 @@ def add_playlist_item(playlist_id):
         return jsonify({'error': 'Media ID is required'}), 400
     
     db = get_db()
-    # Get the highest order position
-    max_order = db.execute(
-        'SELECT MAX(order_position) as max_order FROM playlist_items WHERE playlist_id = ?',
-        [playlist_id]
-    ).fetchone()
-    next_order = (max_order['max_order'] or -1) + 1
-    
-    cursor = db.execute(
-        'INSERT INTO playlist_items (playlist_id, media_id, order_position) VALUES (?, ?, ?)',
-        [playlist_id, media_id, next_order]
-    )
+    # Append with a gap after the current last item
+    result = insert_items(db, playlist_id, [media_id], append=True)
     db.commit()
     
-    return jsonify({
-        'id': cursor.lastrowid,
-        'playlist_id': playlist_id,
-        'media_id': media_id,
-        'order_position': next_order
-    })
+    return jsonify(result['items'][0])
 
 @playlist_api.route('/playlist/<int:playlist_id>', methods=['DELETE'])
 def delete_playlist(playlist_id):
@@ -238,19 +322,73 @@ def update_playlist_order(playlist_id):
         return jsonify({'error': 'Items array is required'}), 400
     
     db = get_db()
-    for item in items:
-        db.execute(
-            'UPDATE playlist_items SET order_position = ? WHERE id = ? AND playlist_id = ?',
-            [item['order_position'], item['id'], playlist_id]
-        )
+    db.executemany(
+        'UPDATE playlist_items SET order_position = ? WHERE id = ? AND playlist_id = ?',
+        [(item['order_position'], item['id'], playlist_id) for item in items]
+    )
     db.commit()
     
     return jsonify({'message': 'Playlist order updated'})
 
+@playlist_api.route('/playlist/<int:playlist_id>/items/move', methods=['POST'])
+def move_playlist_items(playlist_id):
+    """Move items relative to their new neighbours.
+    
+    Accepts a single move ``{"item_id": 5, "after_id": 3}`` or a batch
+    ``{"moves": [...]}``. ``after_id`` of null moves an item to the top.
+    Each move normally rewrites only the moved row.
+    """
+    data = request.get_json() or {}
+    moves = data.get('moves')
+    if moves is None:
+        moves = [data] if 'item_id' in data else []
+    
+    if not moves:
+        return jsonify({'error': 'At least one move is required'}), 400
+    
+    db = get_db()
+    try:
+        moved = [
+            move_item(db, playlist_id, move['item_id'], move.get('after_id'))
+            for move in moves
+        ]
+        db.commit()
+        return jsonify({'moved': moved})
+    except ValueError as e:
+        db.rollback()
+        return jsonify({'error': str(e)}), 404
+    except Exception as e:
+        db.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@playlist_api.route('/playlist/<int:playlist_id>/items/bulk', methods=['POST'])
+def insert_playlist_items(playlist_id):
+    """Insert several media items after ``after_id`` (null inserts at the top)."""
+    data = request.get_json() or {}
+    media_ids = data.get('media_ids', [])
+    
+    if not media_ids:
+        return jsonify({'error': 'media_ids array is required'}), 400
+    
+    db = get_db()
+    try:
+        if 'after_id' in data:
+            result = insert_items(db, playlist_id, media_ids, data['after_id'])
+        else:
+            result = insert_items(db, playlist_id, media_ids, append=True)
+        db.commit()
+        return jsonify(result)
+    except ValueError as e:
+        db.rollback()
+        return jsonify({'error': str(e)}), 404
+    except Exception as e:
+        db.rollback()
+        return jsonify({'error': str(e)}), 500
+
 @playlist_api.route('/next', methods=['POST'])
 def next_track():
     """Move to next track in playlist."""
-    global current_position, last_ad_position, shuffle_queue
+    global current_position, last_ad_position, shuffle_queue, track_started_at, current_ad
     
     if not current_playlist:
         return jsonify({'error': 'No playlist active'}), 404
@@ -267,12 +405,22 @@ def next_track():
     if not playlist_items:
         return jsonify({'error': 'Playlist is empty'}), 404
     
-    # Check if we should play an ad
-    if current_position - last_ad_position >= 3:  # Play ad every 3 tracks
-        ad = pick_weighted_ad()
-        if ad:
+    log_ad_play()
+    
+    # Finish the ad break on air, or start one if it is due
+    drop_stale_ads()
+    if not current_pod and current_position - last_ad_position >= AD_INTERVAL:
+        # Serve the break clients were told to preload, if any
+        plan = pending_ads.pop(0) if pending_ads else resolve_pod()
+        if plan:
             last_ad_position = current_position
-            return jsonify({'type': 'ad', **ad})
+            current_pod.extend(plan[2])
+    if current_pod:
+        ad = current_pod.pop(0)
+        track_started_at = datetime.now()
+        current_ad = ad
+        notify_ad_break(ad, event_state())
+        return jsonify({'type': 'ad', **ad})
     
     total_tracks = len(playlist_items)
     
@@ -302,6 +450,8 @@ def next_track():
     # Return the current track information
     if 0 <= current_position < len(playlist_items):
         current_track = dict(playlist_items[current_position])
+        track_started_at = datetime.now()
+        current_ad = None
         # Save state after track change
         save_playlist_state({
             'current_playlist': current_playlist,
@@ -311,6 +461,7 @@ def next_track():
             'is_shuffle': is_shuffle,
             'shuffle_queue': shuffle_queue
         })
+        notify_track_changed(current_track, event_state())
         return jsonify(current_track)
     return jsonify({'error': 'No media playing'}), 404
 
@@ -342,6 +493,7 @@ def toggle_repeat():
         'is_shuffle': is_shuffle,
         'shuffle_queue': shuffle_queue
     })
+    notify_playback_state(event_state())
     return jsonify({'repeat': is_repeat})
 
 @playlist_api.route('/toggle-shuffle', methods=['POST'])
@@ -359,6 +511,7 @@ def toggle_shuffle():
         'is_shuffle': is_shuffle,
         'shuffle_queue': shuffle_queue
     })
+    notify_playback_state(event_state())
     return jsonify({'shuffle': is_shuffle})
 
 @playlist_api.route('/next-track')
@@ -400,3 +553,409 @@ def get_next_track():
         return jsonify(next_track)
     
     return jsonify({'error': 'No next track available'}), 404
+
+def estimated_break():
+    """Get a placeholder for an ad break that is not planned yet."""
+    return {'slot': 'ad', 'estimated': True, 'duration': get_settings().ads.pod_max_duration}
+
+def project_queue(playlist_items, count, stop_after=None, pin=True):
+    """Resolve the next ``count`` slots into media, pinning ad breaks.
+    
+    Every projected break is pinned in ``pending_ads`` so next_track serves
+    the same ads. Without ``pin`` breaks already pinned are shown and the
+    rest are estimated placeholders (see estimated_break), so projecting
+    far ahead plans nothing. ``stop_after`` (seconds) ends the projection
+    once that much playout is covered. Returns the items and the queue
+    version.
+    """
+    # Resolve the first break up front so the projection knows whether
+    # next_track will actually insert ad breaks
+    drop_stale_ads()
+    if pending_ads:
+        ads_available = True
+    elif pin:
+        plan = resolve_pod()
+        if plan:
+            pending_ads.append(plan)
+        ads_available = bool(plan)
+    else:
+        ads_available = ad_planner.ready(current_playlist)
+    
+    slots = project_positions(
+        current_position,
+        last_ad_position,
+        len(playlist_items),
+        is_repeat,
+        is_shuffle,
+        shuffle_queue,
+        count,
+        ads_available=ads_available
+    )
+    
+    def upcoming():
+        """Yield items lazily so breaks are only resolved when reached."""
+        # The rest of the break on air plays first
+        for ad in current_pod:
+            yield {'slot': 'ad', **describe_media(ad)}
+        pod_index = 0
+        for slot in slots:
+            if slot['slot'] == 'ad':
+                if pod_index >= len(pending_ads):
+                    if not pin:
+                        yield estimated_break()
+                        continue
+                    plan = resolve_pod()
+                    if not plan:
+                        return
+                    pending_ads.append(plan)
+                for ad in pending_ads[pod_index][2]:
+                    yield {'slot': 'ad', **describe_media(ad)}
+                pod_index += 1
+            else:
+                media = dict(playlist_items[slot['position']])
+                yield {
+                    'slot': 'track',
+                    'position': slot['position'],
+                    **describe_media(media)
+                }
+    
+    items = []
+    covered = 0.0
+    projection = upcoming()
+    while len(items) < count and (stop_after is None or covered < stop_after):
+        item = next(projection, None)
+        if item is None:
+            break
+        items.append(item)
+        covered += item_duration(item)[0]
+    
+    return items, engine_version(playlist_items)
+
+@playlist_api.route('/lookahead')
+def get_lookahead():
+    """Get the next N resolved items, including ad breaks, for preloading."""
+    if not current_playlist:
+        return jsonify({'error': 'No playlist active'}), 404
+    
+    count = min(max(request.args.get('count', 5, type=int), 1), MAX_LOOKAHEAD)
+    
+    db = get_db()
+    try:
+        playlist_items = db.execute('''
+            SELECT m.* 
+            FROM playlist_items pi 
+            JOIN media m ON pi.media_id = m.id 
+            WHERE pi.playlist_id = ? 
+            ORDER BY pi.order_position
+        ''', [current_playlist]).fetchall()
+        
+        if not playlist_items:
+            return jsonify({'error': 'Playlist is empty'}), 404
+        
+        items, version = project_queue(playlist_items, count)
+        
+        response = jsonify({
+            'version': version,
+            'playlist_id': current_playlist,
+            'current_position': current_position,
+            'items': items
+        })
+        response.set_etag(version)
+        return response.make_conditional(request)
+    except Exception as e:
+        print(f"Error in lookahead: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+def get_timeline(horizon):
+    """Get the projected timeline covering at least ``horizon`` seconds from now.
+    
+    The timeline starts with the item now playing and is rebuilt only when
+    the queue version or the current item's start time changes.
+    """
+    db = get_db()
+    playlist_items = db.execute('''
+        SELECT m.* 
+        FROM playlist_items pi 
+        JOIN media m ON pi.media_id = m.id 
+        WHERE pi.playlist_id = ? 
+        ORDER BY pi.order_position
+    ''', [current_playlist]).fetchall()
+    
+    if not playlist_items:
+        return None
+    
+    now = datetime.now()
+    started_at = track_started_at or now
+    # The timeline starts when the current item did, so cover the time
+    # already played as well as the horizon ahead
+    length = horizon + max((now - started_at).total_seconds(), 0)
+    drop_stale_ads()  # Otherwise a stale cached timeline still matches the version
+    cached = _timeline_cache.get('timeline')
+    if (
+        cached
+        and _timeline_cache.get('started_at') == started_at
+        and (cached.length >= length or _timeline_cache.get('complete'))
+    ):
+        # Pinned ads are part of the version, so check it only on a hit
+        version = engine_version(playlist_items)
+        if version == _timeline_cache.get('version'):
+            return cached, version
+    
+    # The item now playing comes first
+    if current_ad:
+        current = {'slot': 'ad', **describe_media(current_ad)}
+    else:
+        current = {
+            'slot': 'track',
+            'position': current_position,
+            **describe_media(dict(playlist_items[current_position % len(playlist_items)]))
+        }
+    upcoming, version = project_queue(
+        playlist_items,
+        MAX_TIMELINE_ITEMS,
+        stop_after=max(length - item_duration(current)[0], 0),
+        pin=False
+    )
+    timeline = Timeline([current] + upcoming, started_at)
+    _timeline_cache.clear()
+    _timeline_cache.update({
+        'version': version,
+        'started_at': started_at,
+        'timeline': timeline,
+        # Projection ended before the horizon (end of playlist or shuffle queue)
+        'complete': timeline.length < length
+    })
+    return timeline, version
+
+def parse_time_arg(value):
+    """Parse an ISO time (local) or an epoch timestamp query argument."""
+    try:
+        return datetime.fromtimestamp(float(value))
+    except ValueError:
+        return datetime.fromisoformat(value)
+
+@playlist_api.route('/timeline')
+def timeline():
+    """Get projected playout times for the current playlist, ads included."""
+    if not current_playlist:
+        return jsonify({'error': 'No playlist active'}), 404
+    
+    horizon = min(max(request.args.get('horizon', 3600, type=int), 1), MAX_HORIZON)
+    try:
+        result = get_timeline(horizon)
+        if not result:
+            return jsonify({'error': 'Playlist is empty'}), 404
+        projected, version = result
+        
+        now = datetime.now()
+        response = jsonify({
+            'version': version,
+            'playlist_id': current_playlist,
+            'started_at': projected.started_at.isoformat(),
+            'ends_at': projected.ends_at.isoformat(),
+            'items': projected.window(now, now + timedelta(seconds=horizon))
+        })
+        response.set_etag(version)
+        return response
+    except Exception as e:
+        print(f"Error in timeline: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@playlist_api.route('/timeline/at')
+def timeline_at():
+    """Get the item that will be playing at a given time, and the offset into it."""
+    if not current_playlist:
+        return jsonify({'error': 'No playlist active'}), 404
+    
+    try:
+        at = parse_time_arg(request.args.get('time', ''))
+    except ValueError:
+        return jsonify({'error': 'time must be an ISO datetime or epoch seconds'}), 400
+    
+    horizon = (at - datetime.now()).total_seconds()
+    if horizon > MAX_HORIZON:
+        return jsonify({'error': 'time is beyond the timeline horizon'}), 400
+    
+    try:
+        result = get_timeline(max(horizon, 1))
+        if not result:
+            return jsonify({'error': 'Playlist is empty'}), 404
+        projected, version = result
+        
+        item = projected.locate(at)
+        if not item:
+            return jsonify({'error': 'Nothing scheduled at that time'}), 404
+        return jsonify({'version': version, 'time': at.isoformat(), 'item': item})
+    except Exception as e:
+        print(f"Error in timeline lookup: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+def schedule_from_request(playlist_id, data):
+    """Validate a schedule payload and convert it to a table row."""
+    schedule_type = data.get('type')
+    if schedule_type not in ('once', 'daily', 'weekly'):
+        raise ValueError('Schedule type must be once, daily or weekly')
+    
+    days = sorted(parse_days(data.get('days')))
+    if any(day < 0 or day > 6 for day in days):
+        raise ValueError('Days must be 0-6 (Sunday-Saturday)')
+    
+    row = {
+        'playlist_id': playlist_id,
+        'type': schedule_type,
+        'datetime': data.get('datetime') if schedule_type == 'once' else None,
+        'time': data.get('time') if schedule_type != 'once' else None,
+        'days': ','.join(str(day) for day in days) if schedule_type == 'weekly' else None
+    }
+    if schedule_type == 'once' and not row['datetime']:
+        raise ValueError('datetime is required for once schedules')
+    if schedule_type != 'once' and not row['time']:
+        raise ValueError('time is required for daily and weekly schedules')
+    if schedule_type == 'weekly' and not days:
+        raise ValueError('At least one day is required for weekly schedules')
+    
+    # Parse once so bad dates and times are rejected up front
+    next_fire_time(row, datetime.now())
+    return row
+
+def describe_schedule(schedule):
+    """Add the next fire time to a schedule row."""
+    fire_at = next_fire_time(schedule, datetime.now())
+    return {**schedule, 'next_run': fire_at.isoformat() if fire_at else None}
+
+@playlist_api.route('/<int:playlist_id>/schedule')
+def get_playlist_schedules(playlist_id):
+    """Get the schedules for a playlist."""
+    db = get_db()
+    schedules = db.execute(
+        'SELECT * FROM playlist_schedules WHERE playlist_id = ? ORDER BY id',
+        [playlist_id]
+    ).fetchall()
+    return jsonify([describe_schedule(dict(row)) for row in schedules])
+
+@playlist_api.route('/<int:playlist_id>/schedule', methods=['POST'])
+def create_playlist_schedule(playlist_id):
+    """Schedule a playlist to start automatically."""
+    db = get_db()
+    try:
+        if not db.execute('SELECT id FROM playlists WHERE id = ?', [playlist_id]).fetchone():
+            return jsonify({'error': 'Playlist not found'}), 404
+        
+        row = schedule_from_request(playlist_id, request.get_json() or {})
+        cursor = db.execute(
+            'INSERT INTO playlist_schedules (playlist_id, type, datetime, time, days) VALUES (?, ?, ?, ?, ?)',
+            [row['playlist_id'], row['type'], row['datetime'], row['time'], row['days']]
+        )
+        db.commit()
+        
+        schedule = {'id': cursor.lastrowid, **row}
+        schedule_timer.upsert(schedule)
+        return jsonify(describe_schedule(schedule)), 201
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@playlist_api.route('/<int:playlist_id>/schedule/<int:schedule_id>', methods=['PUT'])
+def update_playlist_schedule(playlist_id, schedule_id):
+    """Change a playlist schedule."""
+    db = get_db()
+    try:
+        row = schedule_from_request(playlist_id, request.get_json() or {})
+        cursor = db.execute(
+            'UPDATE playlist_schedules SET type = ?, datetime = ?, time = ?, days = ? WHERE id = ? AND playlist_id = ?',
+            [row['type'], row['datetime'], row['time'], row['days'], schedule_id, playlist_id]
+        )
+        if cursor.rowcount == 0:
+            return jsonify({'error': 'Schedule not found'}), 404
+        db.commit()
+        
+        schedule = {'id': schedule_id, **row}
+        schedule_timer.upsert(schedule)
+        return jsonify(describe_schedule(schedule))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@playlist_api.route('/<int:playlist_id>/schedule/<int:schedule_id>', methods=['DELETE'])
+def delete_playlist_schedule(playlist_id, schedule_id):
+    """Remove a playlist schedule."""
+    db = get_db()
+    cursor = db.execute(
+        'DELETE FROM playlist_schedules WHERE id = ? AND playlist_id = ?',
+        [schedule_id, playlist_id]
+    )
+    db.commit()
+    if cursor.rowcount == 0:
+        return jsonify({'error': 'Schedule not found'}), 404
+    schedule_timer.remove(schedule_id)
+    return '', 204
+
+def load_schedule_changes(db, watermark):
+    """Get the schedule edits recorded after ``watermark``.
+    
+    Returns the new watermark and (schedule id, changed at, row or None if
+    deleted) for each schedule edited since, as ScheduleTimer.apply_changes
+    takes them.
+    """
+    changes = db.execute(
+        'SELECT seq, schedule_id, changed_at FROM playlist_schedule_changes WHERE seq > ? ORDER BY seq',
+        [watermark]
+    ).fetchall()
+    if not changes:
+        return watermark, []
+    
+    ids = [change['schedule_id'] for change in changes]
+    rows = db.execute(
+        f"SELECT * FROM playlist_schedules WHERE id IN ({','.join('?' * len(ids))})",
+        ids
+    ).fetchall()
+    schedules = {row['id']: dict(row) for row in rows}
+    return changes[-1]['seq'], [
+        (
+            change['schedule_id'],
+            datetime.fromisoformat(change['changed_at']),
+            schedules.get(change['schedule_id'])
+        )
+        for change in changes
+    ]
+
+def init_schedule_timer(app):
+    """Load playlist schedules and start firing them.
+    
+    The timer then checks for edits past its watermark periodically, so
+    schedules edited through another process's API are picked up too.
+    """
+    def on_fire(schedule):
+        with app.app_context():
+            activate_playlist(schedule['playlist_id'])
+    
+    def load_changes(watermark):
+        with app.app_context():
+            return load_schedule_changes(get_db(), watermark)
+    
+    with app.app_context():
+        db = get_db()
+        # Read the watermark first so edits made during the load are not lost
+        watermark = db.execute(
+            'SELECT COALESCE(MAX(seq), 0) FROM playlist_schedule_changes'
+        ).fetchone()[0]
+        schedules = [dict(row) for row in db.execute('SELECT * FROM playlist_schedules')]
+    
+    schedule_timer.on_fire = on_fire
+    schedule_timer.loader = load_changes
+    schedule_timer.watermark = watermark
+    schedule_timer.load(schedules)
+    schedule_timer.start()
+
+def init_ad_planner(app):
+    """Start planning ad breaks in the background."""
+    settings = get_settings()
+    ad_planner.db_path = settings.database.path
+    ad_planner.breaks = settings.ads.planned_breaks
+    ad_planner.max_ads = settings.ads.pod_max_ads
+    ad_planner.max_duration = settings.ads.pod_max_duration
+    ad_planner.start()
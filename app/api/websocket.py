@@ -1,7 +1,8 @@
-from flask import Blueprint
+from flask import Blueprint, Response
 from flask_sock import Sock
 import json
-from typing import Dict, Set
+import queue
+from typing import Dict, Optional, Set
 import threading
 from datetime import datetime
 
@@ -16,13 +17,43 @@ active_connections: Dict[str, Set] = {
 }
 connection_lock = threading.Lock()
 
-def broadcast_event(channel: str, event_type: str, data: dict):
-    """Broadcast event to all connected media clients."""
+# Server-sent event subscribers, for clients that cannot hold a WebSocket
+sse_subscribers: Dict[str, Set[queue.Queue]] = {
+    'playlist': set()
+}
+
+# Latest message per key, replayed to clients as soon as they subscribe
+retained_events: Dict[str, Dict[str, str]] = {
+    'playlist': {}
+}
+
+# Pending messages an SSE client may fall behind by before it is dropped
+SSE_QUEUE_SIZE = 100
+
+# Seconds between SSE keepalive comments
+SSE_KEEPALIVE = 15
+
+def broadcast_event(channel: str, event_type: str, data: dict, retain: Optional[str] = None):
+    """Broadcast event to all clients subscribed to a channel.
+    
+    With ``retain`` set, the message is also kept under that key and sent
+    to clients when they first connect.
+    """
     message = json.dumps({
         'type': event_type,
         **data
     })
     with connection_lock:
+        if retain:
+            retained_events[channel][retain] = message
+        
+        for subscriber in list(sse_subscribers.get(channel, ())):
+            try:
+                subscriber.put_nowait(message)
+            except queue.Full:
+                # Too slow to keep up; it will reconnect and get a fresh snapshot
+                sse_subscribers[channel].discard(subscriber)
+        
         dead_connections = set()
         for ws in active_connections[channel]:
             try:
@@ -42,6 +73,10 @@ def broadcast_monitoring_event(event_type: str, data: dict):
     """Broadcast event to all connected monitoring clients."""
     broadcast_event('monitoring', event_type, data)
 
+def broadcast_playlist_event(event_type: str, data: dict, retain: Optional[str] = None):
+    """Broadcast event to all connected playback clients."""
+    broadcast_event('playlist', event_type, data, retain)
+
 @sock.route('/ws/media')
 def media_socket(ws):
     """Handle media WebSocket connections."""
@@ -92,6 +127,56 @@ def monitoring_socket(ws):
         with connection_lock:
             active_connections['monitoring'].discard(ws)
 
+@sock.route('/ws/playlist')
+def playlist_socket(ws):
+    """Handle playback WebSocket connections."""
+    try:
+        with connection_lock:
+            # Send the current snapshot before any live events
+            for message in retained_events['playlist'].values():
+                ws.send(message)
+            active_connections['playlist'].add(ws)
+        
+        while True:
+            message = ws.receive()
+            if message is None:
+                break
+    
+    except Exception as e:
+        print(f"WebSocket error: {str(e)}")
+    
+    finally:
+        with connection_lock:
+            active_connections['playlist'].discard(ws)
+
+@ws_api.route('/events/playlist')
+def playlist_events():
+    """Stream playback events as server-sent events (for OBS browser sources)."""
+    subscriber = queue.Queue(maxsize=SSE_QUEUE_SIZE)
+    with connection_lock:
+        snapshot = list(retained_events['playlist'].values())
+        sse_subscribers['playlist'].add(subscriber)
+    
+    def stream():
+        try:
+            for message in snapshot:
+                yield f"data: {message}\n\n"
+            while subscriber in sse_subscribers['playlist']:
+                try:
+                    message = subscriber.get(timeout=SSE_KEEPALIVE)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"data: {message}\n\n"
+        finally:
+            with connection_lock:
+                sse_subscribers['playlist'].discard(subscriber)
+    
+    return Response(stream(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
 def notify_upload_progress(upload_id: str, progress: int):
     """Notify clients about upload progress."""
     broadcast_media_event('upload_progress', {
@@ -124,6 +209,29 @@ def notify_media_deleted(media_id: int):
         'media_id': media_id
     })
 
+def notify_track_changed(media: dict, state: dict):
+    """Notify playback clients that a new track is on air."""
+    broadcast_playlist_event('track_changed', {
+        'media': media,
+        'state': state,
+        'timestamp': datetime.now().isoformat()
+    }, retain='now_playing')
+
+def notify_ad_break(ad: dict, state: dict):
+    """Notify playback clients that an ad break started."""
+    broadcast_playlist_event('ad_break', {
+        'media': ad,
+        'state': state,
+        'timestamp': datetime.now().isoformat()
+    }, retain='now_playing')
+
+def notify_playback_state(state: dict):
+    """Notify playback clients that repeat or shuffle changed."""
+    broadcast_playlist_event('state_changed', {
+        'state': state,
+        'timestamp': datetime.now().isoformat()
+    }, retain='state')
+
 def notify_system_metrics(metrics: dict):
     """Notify monitoring clients about system metrics."""
     broadcast_monitoring_event('system_metrics', {
@@ -14,6 +14,7 @@ class MediaConfig:
     allowed_extensions: set[str]
     max_file_size: int  # in bytes
     chunk_size: int = 1024 * 1024  # 1MB default chunk size
+    hash_workers: int = 4  # Files hashed at once; 1-2 for spinning disks
 
 @dataclass
 class AdConfig:
@@ -21,6 +22,15 @@ class AdConfig:
     max_frequency: int
     default_weight: int
     asset_path: str
+    impression_batch_size: int = 100  # Impressions written per transaction
+    impression_flush_interval: float = 5.0  # Max seconds an impression waits
+    impression_spool_path: str = 'instance/impressions.spool'  # Each process adds .<pid>
+    planned_breaks: int = 3  # Ad breaks kept ready per playlist
+    pod_max_ads: int = 2  # Ads per break
+    pod_max_duration: int = 90  # Seconds per break
+    planner_enabled: bool = False  # Plan breaks ahead in this process (the web server)
+    export_path: str = 'instance/exports/ad_logs'  # Columnar ad_logs partitions
+    report_path: str = 'reports'  # Generated report files; use an absolute path
 
 @dataclass
 class CacheConfig:
@@ -28,6 +38,8 @@ class CacheConfig:
     redis_port: int
     redis_db: int
     default_timeout: int  # in seconds
+    report_path: str = 'reports/cache'  # Rendered report files, by content key
+    report_open_timeout: int = 300  # Seconds to keep reports that include today
 
 @dataclass
 class AppConfig:
@@ -35,6 +47,9 @@ class AppConfig:
     host: str
     port: int
     secret_key: str
+    scheduler_enabled: bool = False  # Fire playlist schedules in this process (the web server)
+    celery_broker_url: str = 'redis://localhost:6379/0'
+    celery_result_backend: str = 'redis://localhost:6379/0'
 
 class Config:
     """Configuration management for the application."""
@@ -57,28 +72,47 @@ class Config:
         self.media = MediaConfig(
             upload_path=os.getenv('MEDIA_UPLOAD_PATH', os.path.join(base_dir, 'media')),
             allowed_extensions={'mp3', 'wav', 'ogg', 'm4a', 'mp4', 'webm', 'mkv'},
-            max_file_size=int(os.getenv('MAX_FILE_SIZE', 100 * 1024 * 1024))  # 100MB default
+            max_file_size=int(os.getenv('MAX_FILE_SIZE', 100 * 1024 * 1024)),  # 100MB default
+            hash_workers=int(os.getenv('MEDIA_HASH_WORKERS', 4))
         )
 
         self.ads = AdConfig(
             min_frequency=int(os.getenv('AD_MIN_FREQUENCY', 3)),
             max_frequency=int(os.getenv('AD_MAX_FREQUENCY', 10)),
             default_weight=int(os.getenv('AD_DEFAULT_WEIGHT', 1)),
-            asset_path=os.getenv('AD_ASSET_PATH', 'media/ads/')
+            asset_path=os.getenv('AD_ASSET_PATH', 'media/ads/'),
+            impression_batch_size=int(os.getenv('AD_IMPRESSION_BATCH_SIZE', 100)),
+            impression_flush_interval=float(os.getenv('AD_IMPRESSION_FLUSH_INTERVAL', 5.0)),
+            impression_spool_path=os.getenv(
+                'AD_IMPRESSION_SPOOL', os.path.join(base_dir, 'instance', 'impressions.spool')
+            ),
+            planned_breaks=int(os.getenv('AD_PLANNED_BREAKS', 3)),
+            pod_max_ads=int(os.getenv('AD_POD_MAX_ADS', 2)),
+            pod_max_duration=int(os.getenv('AD_POD_MAX_DURATION', 90)),
+            planner_enabled=os.getenv('AD_PLANNER_ENABLED', 'false').lower() == 'true',
+            export_path=os.getenv(
+                'AD_EXPORT_PATH', os.path.join(base_dir, 'instance', 'exports', 'ad_logs')
+            ),
+            report_path=os.path.abspath(os.getenv('AD_REPORT_PATH', os.path.join(base_dir, 'reports')))
         )
 
         self.cache = CacheConfig(
             redis_host=os.getenv('CACHE_REDIS_HOST', 'localhost'),
             redis_port=int(os.getenv('CACHE_REDIS_PORT', 6379)),
             redis_db=int(os.getenv('CACHE_REDIS_DB', 0)),
-            default_timeout=int(os.getenv('CACHE_DEFAULT_TIMEOUT', 300))  # 5 minutes default
+            default_timeout=int(os.getenv('CACHE_DEFAULT_TIMEOUT', 300)),  # 5 minutes default
+            report_path=os.getenv('CACHE_REPORT_PATH', os.path.join(base_dir, 'reports', 'cache')),
+            report_open_timeout=int(os.getenv('CACHE_REPORT_OPEN_TIMEOUT', 300))
         )
 
         self.app = AppConfig(
             debug=os.getenv('DEBUG', 'false').lower() == 'true',
             host=os.getenv('HOST', '0.0.0.0'),
             port=int(os.getenv('PORT', 5000)),
-            secret_key=os.getenv('SECRET_KEY', 'dev')
+            secret_key=os.getenv('SECRET_KEY', 'dev'),
+            scheduler_enabled=os.getenv('PLAYLIST_SCHEDULER_ENABLED', 'false').lower() == 'true',
+            celery_broker_url=os.getenv('CELERY_BROKER_URL', 'redis://localhost:6379/0'),
+            celery_result_backend=os.getenv('CELERY_RESULT_BACKEND', 'redis://localhost:6379/0')
         )
 
         # Override with config file if provided
@@ -116,25 +150,40 @@ class Config:
             'media': {
                 'upload_path': self.media.upload_path,
                 'allowed_extensions': list(self.media.allowed_extensions),
-                'max_file_size': self.media.max_file_size
+                'max_file_size': self.media.max_file_size,
+                'hash_workers': self.media.hash_workers
             },
             'ads': {
                 'min_frequency': self.ads.min_frequency,
                 'max_frequency': self.ads.max_frequency,
                 'default_weight': self.ads.default_weight,
-                'asset_path': self.ads.asset_path
+                'asset_path': self.ads.asset_path,
+                'impression_batch_size': self.ads.impression_batch_size,
+                'impression_flush_interval': self.ads.impression_flush_interval,
+                'impression_spool_path': self.ads.impression_spool_path,
+                'planned_breaks': self.ads.planned_breaks,
+                'pod_max_ads': self.ads.pod_max_ads,
+                'pod_max_duration': self.ads.pod_max_duration,
+                'planner_enabled': self.ads.planner_enabled,
+                'export_path': self.ads.export_path,
+                'report_path': self.ads.report_path
             },
             'cache': {
                 'redis_host': self.cache.redis_host,
                 'redis_port': self.cache.redis_port,
                 'redis_db': self.cache.redis_db,
-                'default_timeout': self.cache.default_timeout
+                'default_timeout': self.cache.default_timeout,
+                'report_path': self.cache.report_path,
+                'report_open_timeout': self.cache.report_open_timeout
             },
             'app': {
                 'debug': self.app.debug,
                 'host': self.app.host,
                 'port': self.app.port,
-                'secret_key': self.app.secret_key
+                'secret_key': self.app.secret_key,
+                'scheduler_enabled': self.app.scheduler_enabled,
+                'celery_broker_url': self.app.celery_broker_url,
+                'celery_result_backend': self.app.celery_result_backend
             }
         }
 
@@ -14,16 +14,19 @@ def dict_from_row(row):
 class Database:
     """Database wrapper class for SQLite operations."""
     
-    def __init__(self, db_path):
+    def __init__(self, db_path, check_same_thread=True):
         """Initialize database connection."""
         self.db_path = db_path
+        self.check_same_thread = check_same_thread
         self._connection = None
 
     @property
     def connection(self):
         """Get database connection, creating it if needed."""
         if self._connection is None:
-            self._connection = sqlite3.connect(self.db_path)
+            self._connection = sqlite3.connect(
+                self.db_path, check_same_thread=self.check_same_thread
+            )
             self._connection.row_factory = sqlite3.Row
         return self._connection
 
@@ -122,15 +125,37 @@ def init_db():
     """Initialize the database with required tables."""
     db = get_db()
     schema_path = os.path.join(current_app.root_path, '..', 'schema.sql')
+    counters_exist = db.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'ad_play_counters'"
+    ).fetchone()
     with open(schema_path, mode='r') as f:
         db.cursor().executescript(f.read())
     
+    # Seed ad play counters once, for logs recorded before they existed
+    if not counters_exist:
+        db.execute('''
+            INSERT OR IGNORE INTO ad_play_counters (playlist_id, campaign_id, plays)
+            SELECT playlist_id, campaign_id, COUNT(*)
+            FROM ad_logs
+            WHERE playlist_id IS NOT NULL AND campaign_id IS NOT NULL
+            GROUP BY playlist_id, campaign_id
+        ''')
+        print("Seeded ad play counters from ad_logs")
+    
     # Add checksum column if it doesn't exist
     try:
         db.execute('ALTER TABLE media ADD COLUMN checksum TEXT')
         print("Added checksum column to media table")
     except sqlite3.OperationalError:
         print("Checksum column already exists")
+
+    # Add impression event ids to ad logs if they don't exist
+    try:
+        db.execute('ALTER TABLE ad_logs ADD COLUMN event_id TEXT')
+        print("Added event_id column to ad_logs table")
+    except sqlite3.OperationalError:
+        print("Event id column already exists")
+    db.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_ad_logs_event_id ON ad_logs (event_id)')
     
     db.commit()
 
@@ -1,16 +1,87 @@
 import os
 import re
 import hashlib
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
-def calculate_file_checksum(file_path):
+# Bytes read per call when hashing; large reads keep the disk streaming
+HASH_CHUNK_SIZE = 1024 * 1024
+
+def calculate_file_checksum(file_path, chunk_size=HASH_CHUNK_SIZE):
     """Calculate SHA-256 checksum of a file."""
     sha256_hash = hashlib.sha256()
-    with open(file_path, "rb") as f:
-        # Read the file in chunks to handle large files
-        for byte_block in iter(lambda: f.read(4096), b""):
-            sha256_hash.update(byte_block)
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    with open(file_path, "rb", buffering=0) as f:
+        # Read the file in chunks into one reused buffer to handle large files
+        for size in iter(lambda: f.readinto(buffer), 0):
+            sha256_hash.update(view[:size])
     return sha256_hash.hexdigest()
 
+def hash_files(items, workers=4):
+    """Hash files on a thread pool while ``items`` is still being produced.
+    
+    Items are dicts with a 'path'; ones that already have a 'checksum' pass
+    straight through. The items iterable is consumed on its own thread (so
+    a directory walk overlaps hashing), at most ``workers`` files are read
+    at once, and hashlib releases the GIL while hashing. Yields
+    ``(item, error)`` in completion order with item['checksum'] set unless
+    hashing failed; errors raised by ``items`` itself are re-raised.
+    Use few workers for spinning disks and more for SSDs. ``items`` must
+    not touch a thread-bound resource such as a sqlite3 connection.
+    """
+    results = queue.Queue(maxsize=workers * 4)
+    stop = threading.Event()
+    done = object()
+    
+    def put(result):
+        while not stop.is_set():
+            try:
+                results.put(result, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+    
+    def hash_one(item):
+        try:
+            item['checksum'] = calculate_file_checksum(item['path'])
+            put((item, None))
+        except OSError as e:
+            put((item, e))
+    
+    def produce():
+        try:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='hash') as pool:
+                # Bound the files queued for hashing so walking stays just ahead
+                slots = threading.BoundedSemaphore(workers * 2)
+                for item in items:
+                    if stop.is_set():
+                        break
+                    if item.get('checksum') is not None:
+                        put((item, None))
+                        continue
+                    slots.acquire()
+                    pool.submit(hash_one, item).add_done_callback(lambda _: slots.release())
+        except Exception as e:
+            put((done, e))
+        else:
+            put((done, None))
+    
+    producer = threading.Thread(target=produce, name='hash-producer', daemon=True)
+    producer.start()
+    try:
+        while True:
+            item, error = results.get()
+            if item is done:
+                if error:
+                    raise error
+                return
+            yield item, error
+    finally:
+        stop.set()
+        producer.join()
+
 def clean_filename(filename):
     """Clean filename to remove weird characters while preserving spaces."""
     # Remove file extension
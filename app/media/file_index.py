@@ -0,0 +1,68 @@
+"""Index of media file stats, so rescans skip unchanged files.
+
+Each file's (size, mtime_ns, inode) is stored with its checksum when it is
+hashed. On the next scan a file whose stat still matches reuses the stored
+checksum without being read; anything new or changed is hashed again.
+"""
+import os
+from typing import Dict, Iterable, List, Optional, Tuple
+
+class FileIndex:
+    """File-state index for one scan, loaded once and written in batches."""
+
+    def __init__(self, db):
+        self.db = db
+        self.entries: Dict[str, Tuple[int, int, int, str]] = {
+            row[0]: (row[1], row[2], row[3], row[4])
+            for row in db.execute(
+                "SELECT path, size, mtime_ns, inode, checksum FROM media_file_state"
+            )
+        }
+        self.changed: List[tuple] = []
+        self.seen = set()
+
+    @staticmethod
+    def key(st: os.stat_result) -> Tuple[int, int, int]:
+        """Get the parts of a stat that show a file changed."""
+        return st.st_size, st.st_mtime_ns, st.st_ino
+
+    def lookup(self, path: str, st: os.stat_result) -> Optional[str]:
+        """Get the stored checksum of a file, or None if it is new or changed."""
+        self.seen.add(path)
+        entry = self.entries.get(path)
+        if entry and entry[:3] == self.key(st):
+            return entry[3]
+        return None
+
+    def record(self, path: str, st: os.stat_result, checksum: str) -> None:
+        """Remember a freshly hashed file."""
+        self.seen.add(path)
+        self.entries[path] = self.key(st) + (checksum,)
+        self.changed.append((path,) + self.key(st) + (checksum,))
+
+    def flush(self, roots: Iterable[str] = ()) -> int:
+        """Write recorded files and drop entries for files gone from ``roots``.
+
+        Runs in the caller's transaction. Returns the number of entries
+        removed.
+        """
+        if self.changed:
+            self.db.executemany(
+                """
+                INSERT OR REPLACE INTO media_file_state (path, size, mtime_ns, inode, checksum)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                self.changed
+            )
+            self.changed = []
+
+        prefixes = tuple(os.path.join(os.path.abspath(root), '') for root in roots)
+        gone = [
+            (path,) for path in self.entries
+            if path not in self.seen and path.startswith(prefixes)
+        ] if prefixes else []
+        if gone:
+            self.db.executemany("DELETE FROM media_file_state WHERE path = ?", gone)
+            for (path,) in gone:
+                del self.entries[path]
+        return len(gone)
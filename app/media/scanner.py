@@ -1,99 +1,181 @@
 import os
+import stat
 from app.core.database import get_db, file_exists_by_checksum
-from app.core.files import clean_filename, clean_filepath, calculate_file_checksum
+from app.core.files import clean_filename, clean_filepath, calculate_file_checksum, hash_files
 from app.core.config import get_settings
+from app.media.file_index import FileIndex
 
-def scan_directory(media_dir, db, found_files, errors):
-    """Recursively scan a directory for media files."""
+# New media written per transaction during a scan
+SCAN_BATCH_SIZE = 500
+
+def walk_media(media_dir, errors, index=None):
+    """Yield the media files under a directory, for hashing.
+    
+    With a FileIndex, files whose size, mtime and inode are unchanged since
+    they were last hashed come with the stored checksum, so they are not
+    read again.
+    """
     settings = get_settings()
-    try:
-        # Walk through directory recursively
-        for root, dirs, files in os.walk(media_dir):
-            print(f"Scanning directory: {root}")
-            print(f"Found {len(files)} files")
-            
-            for file in files:
-                try:
-                    print(f"Processing file: {file}")
-                    # Skip macOS metadata files
-                    if file.startswith('._'):
-                        print(f"Skipping macOS metadata file: {file}")
-                        continue
-                        
-                    # Check file extension
-                    ext = file.split('.')[-1].lower() if '.' in file else ''
-                    print(f"File extension: {ext}")
-                    
-                    if ext not in settings.AUDIO_EXTENSIONS and ext not in settings.VIDEO_EXTENSIONS:
-                        print(f"Skipping file with unsupported extension: {ext}")
-                        continue
-                    
-                    media_type = 'audio' if ext in settings.AUDIO_EXTENSIONS else 'video'
-                    full_path = os.path.abspath(os.path.join(root, file))
-                    
-                    if not os.path.isfile(full_path):
-                        print(f"Not a file: {full_path}")
-                        continue
-                    
-                    # Clean the filepath and get clean filename
-                    clean_path = clean_filepath(full_path)
-                    clean_name = clean_filename(file)
-                    
-                    # Calculate checksum
-                    checksum = calculate_file_checksum(full_path)
-                    
-                    # Check if file already exists by checksum or cleaned path
-                    if file_exists_by_checksum(checksum, clean_path):
-                        print(f"Skipping duplicate file: {file}")
-                        continue
-                    
-                    print(f"Processing media file: {full_path}")
-                    
-                    # Use clean filename as title
-                    title = os.path.splitext(clean_name)[0]
-                    artist = 'TapForNerd'  # Always set artist as TapForNerd
-                    
-                    print(f"Adding to database: {title} by {artist}")
-                        
-                    # Add to database with checksum and clean path
-                    cursor = db.execute('''
-                        INSERT OR REPLACE INTO media (file_path, type, title, artist, checksum)
-                        VALUES (?, ?, ?, ?, ?)
-                    ''', (clean_path, media_type, title, artist, checksum))
-                    
-                    # Verify the insert was successful
-                    if cursor.rowcount > 0:
-                        found_files.append({
-                            'path': full_path,
-                            'type': media_type,
-                            'title': title,
-                            'artist': artist
-                        })
-                    else:
-                        error_msg = f"Failed to insert {file} into database"
-                        print(error_msg)
-                        errors.append(error_msg)
-                    
-                except Exception as e:
-                    error_msg = f"Error processing {file}: {str(e)}"
-                    print(error_msg)
-                    errors.append(error_msg)
+    # Walk through directory recursively
+    for root, dirs, files in os.walk(media_dir):
+        print(f"Scanning directory: {root}")
+        print(f"Found {len(files)} files")
+        
+        for file in files:
+            try:
+                # Skip macOS metadata files
+                if file.startswith('._'):
+                    print(f"Skipping macOS metadata file: {file}")
+                    continue
                     
+                # Check file extension
+                ext = file.split('.')[-1].lower() if '.' in file else ''
+                if ext not in settings.AUDIO_EXTENSIONS and ext not in settings.VIDEO_EXTENSIONS:
+                    print(f"Skipping file with unsupported extension: {ext}")
+                    continue
+                
+                full_path = os.path.abspath(os.path.join(root, file))
+                st = os.stat(full_path)
+                if not stat.S_ISREG(st.st_mode):
+                    print(f"Not a file: {full_path}")
+                    continue
+                
+                checksum = index.lookup(full_path, st) if index else None
+                yield {
+                    'path': full_path,
+                    'name': file,
+                    'type': 'audio' if ext in settings.AUDIO_EXTENSIONS else 'video',
+                    'stat': st,
+                    'checksum': checksum,
+                    'cached': checksum is not None
+                }
+                
+            except Exception as e:
+                error_msg = f"Error processing {file}: {str(e)}"
+                print(error_msg)
+                errors.append(error_msg)
+
+class ScanCatalog:
+    """Catalog writes for one scan: in-memory dedupe and batched inserts.
+    
+    The checksums and paths already in the media table are loaded once, so
+    duplicates are found without a query per file. New media are inserted
+    with executemany, one transaction per batch, along with the scan's file
+    list and any file-index updates.
+    """
+    
+    def __init__(self, db, scan_id, errors, index=None, batch_size=SCAN_BATCH_SIZE):
+        self.db = db
+        self.scan_id = scan_id
+        self.errors = errors
+        self.index = index
+        self.batch_size = batch_size
+        self.checksums = set()
+        self.paths = set()
+        for checksum, file_path in db.execute("SELECT checksum, file_path FROM media"):
+            if checksum:
+                self.checksums.add(checksum)
+            self.paths.add(file_path)
+        self.pending = []
+        self.files_found = 0
+        self.duplicates = 0
+    
+    def exists(self, checksum, clean_path):
+        """Check if a file with the same checksum or cleaned path is cataloged."""
+        return checksum in self.checksums or clean_path in self.paths
+    
+    def add(self, clean_path, media_type, title, artist, checksum):
+        """Queue a new media file, writing the batch once it is full."""
+        self.checksums.add(checksum)
+        self.paths.add(clean_path)
+        self.pending.append((clean_path, media_type, title, artist, checksum))
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+    
+    def flush(self):
+        """Write queued media and file-index updates in one transaction."""
+        rows, self.pending = self.pending, []
+        try:
+            if rows:
+                self.db.executemany('''
+                    INSERT OR REPLACE INTO media (file_path, type, title, artist, checksum)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', rows)
+                self.db.executemany('''
+                    INSERT OR IGNORE INTO media_scan_files (scan_id, media_id)
+                    SELECT ?, id FROM media WHERE file_path = ?
+                ''', [(self.scan_id, row[0]) for row in rows])
+            if self.index:
+                self.index.flush()
+            self.db.commit()
+            self.files_found += len(rows)
+        except Exception as e:
+            self.db.rollback()
+            error_msg = f"Failed to insert {len(rows)} files into database: {str(e)}"
+            print(error_msg)
+            self.errors.append(error_msg)
+
+def scan_directory(media_dir, catalog, errors, workers=None):
+    """Recursively scan a directory for media files.
+    
+    Walking and hashing run on background threads (``workers`` files hashed
+    at once, MEDIA_HASH_WORKERS by default); database writes stay on the
+    calling thread.
+    """
+    workers = workers or get_settings().media.hash_workers
+    index = catalog.index
+    try:
+        for item, error in hash_files(walk_media(media_dir, errors, index), workers):
+            file = item['name']
+            full_path = item['path']
+            try:
+                if error:
+                    raise error
+                checksum = item['checksum']
+                if index and not item['cached']:
+                    index.record(full_path, item['stat'], checksum)
+                
+                # Clean the filepath and get clean filename
+                clean_path = clean_filepath(full_path)
+                clean_name = clean_filename(file)
+                
+                # Check if file already exists by checksum or cleaned path
+                if catalog.exists(checksum, clean_path):
+                    catalog.duplicates += 1
+                    continue
+                
+                # Use clean filename as title
+                title = os.path.splitext(clean_name)[0]
+                artist = 'TapForNerd'  # Always set artist as TapForNerd
+                
+                print(f"Adding to database: {title} by {artist}")
+                catalog.add(clean_path, item['type'], title, artist, checksum)
+                
+            except Exception as e:
+                error_msg = f"Error processing {file}: {str(e)}"
+                print(error_msg)
+                errors.append(error_msg)
+                
     except Exception as e:
         error_msg = f"Error scanning directory {media_dir}: {str(e)}"
         print(error_msg)
         errors.append(error_msg)
 
 def scan_media():
-    """Scan all configured media directories."""
+    """Scan all configured media directories.
+    
+    The result has counts only; the files added are listed page by page
+    via ``get_scan_files(scan_id)``.
+    """
     settings = get_settings()
-    found_files = []
     errors = []
     db = get_db()
+    catalog = None
     
     try:
-        # Start transaction
-        db.execute('BEGIN')
+        scan_id = db.execute("INSERT INTO media_scans DEFAULT VALUES").lastrowid
+        db.commit()
+        catalog = ScanCatalog(db, scan_id, errors, FileIndex(db))
         
         # First, verify the media directories exist
         for media_dir in settings.MEDIA_DIRS:
@@ -103,16 +185,24 @@ def scan_media():
                 continue
             
             # Recursively scan the directory
-            scan_directory(media_dir, db, found_files, errors)
+            scan_directory(media_dir, catalog, errors)
         
-        # If we got here without errors, commit the transaction
+        # Write the last batch, then forget files that are gone
+        catalog.flush()
+        catalog.index.flush(settings.MEDIA_DIRS)
+        db.execute('''
+            UPDATE media_scans
+            SET finished_at = CURRENT_TIMESTAMP, files_found = ?, duplicates = ?, errors = ?
+            WHERE id = ?
+        ''', (catalog.files_found, catalog.duplicates, len(errors), scan_id))
         db.commit()
-        print("Successfully committed all changes to database")
+        print(f"Scan {scan_id} complete: {catalog.files_found} added, {catalog.duplicates} already cataloged")
         
         return {
             'message': 'Media scan completed',
-            'files_found': len(found_files),
-            'files': found_files,
+            'scan_id': scan_id,
+            'files_found': catalog.files_found,
+            'duplicates': catalog.duplicates,
             'errors': errors if errors else None
         }
         
@@ -124,11 +214,33 @@ def scan_media():
         print(error_msg)
         return {
             'error': error_msg,
-            'files_found': len(found_files),
-            'files': found_files,
+            'files_found': catalog.files_found if catalog else 0,
             'errors': errors
         }
 
+def get_scan_files(scan_id, limit=50, offset=0):
+    """Get a page of the media files a scan added, or None for an unknown scan."""
+    db = get_db()
+    scan = db.execute("SELECT * FROM media_scans WHERE id = ?", (scan_id,)).fetchone()
+    if not scan:
+        return None
+    files = db.execute('''
+        SELECT m.id, m.file_path as path, m.type, m.title, m.artist
+        FROM media_scan_files f
+        JOIN media m ON f.media_id = m.id
+        WHERE f.scan_id = ?
+        ORDER BY m.id
+        LIMIT ? OFFSET ?
+    ''', (scan_id, limit, offset)).fetchall()
+    total = db.execute(
+        "SELECT COUNT(*) FROM media_scan_files WHERE scan_id = ?", (scan_id,)
+    ).fetchone()[0]
+    return {
+        'scan': dict(scan),
+        'files': [dict(row) for row in files],
+        'total': total
+    }
+
 def process_upload(file, path):
     """Process an uploaded file."""
     settings = get_settings()
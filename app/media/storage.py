@@ -3,11 +3,11 @@ import shutil
 from datetime import datetime
 from pathlib import Path
 from typing import Optional, List, Tuple
-import hashlib
 
 from ..core.config import get_settings
 from ..core.logging import media_logger, log_function_call, log_error
 from ..core.database import Database
+from ..core.files import calculate_file_checksum
 
 class MediaStorage:
     """Handles media file storage operations."""
@@ -231,11 +231,7 @@ class MediaStorage:
                 return False
 
             # Calculate current checksum
-            sha256_hash = hashlib.sha256()
-            with open(os.path.join(self.base_path, file_path), "rb") as f:
-                for byte_block in iter(lambda: f.read(8192), b""):
-                    sha256_hash.update(byte_block)
-            current_checksum = sha256_hash.hexdigest()
+            current_checksum = calculate_file_checksum(os.path.join(self.base_path, file_path))
 
             return current_checksum == media_record['checksum']
 
@@ -0,0 +1,132 @@
+import threading
+import time as clock
+from dataclasses import dataclass
+from datetime import datetime, time
+from typing import Dict, Iterable, Optional, Tuple
+
+# Compiled rules are rebuilt after this many seconds even without an edit,
+# so changes made by another process (e.g. a Celery worker) are picked up
+RULES_MAX_AGE = 300
+
+def minute_of_day(value) -> Optional[int]:
+    """Convert an 'HH:MM[:SS]' string or time to minutes since midnight."""
+    if value is None or value == '':
+        return None
+    if not isinstance(value, time):
+        value = time.fromisoformat(str(value))
+    return value.hour * 60 + value.minute
+
+def day_mask(days_of_week: Optional[str]) -> int:
+    """Convert '1,2,3' (1 = Monday ... 7 = Sunday) to a bitmask; 0 means any day."""
+    mask = 0
+    for day in (days_of_week or '').split(','):
+        if day.strip():
+            mask |= 1 << int(day)
+    return mask
+
+def parse_timestamp(value) -> Optional[datetime]:
+    """Parse a stored campaign date."""
+    if not value:
+        return None
+    return datetime.fromisoformat(str(value))
+
+@dataclass(frozen=True)
+class AdRule:
+    """An ad schedule with its time window and campaign limits pre-parsed."""
+    schedule_id: int
+    campaign_id: int
+    priority: int
+    frequency: int
+    start_minute: Optional[int]
+    end_minute: Optional[int]
+    days: int
+    target_percentage: Optional[float]
+    campaign_start: Optional[datetime]
+    campaign_end: Optional[datetime]
+
+    @classmethod
+    def from_row(cls, row: Dict) -> 'AdRule':
+        """Compile an ad_schedules row joined with its campaign."""
+        return cls(
+            schedule_id=row['id'],
+            campaign_id=row['campaign_id'],
+            priority=row['priority'] or 0,
+            frequency=row['frequency'] or 0,
+            start_minute=minute_of_day(row['start_time']),
+            end_minute=minute_of_day(row['end_time']),
+            days=day_mask(row['days_of_week']),
+            target_percentage=row['target_percentage'],
+            campaign_start=parse_timestamp(row['start_date']),
+            campaign_end=parse_timestamp(row['end_date'])
+        )
+
+    def is_running(self, utc_now: datetime) -> bool:
+        """Check the campaign's date range (stored in UTC, like datetime('now'))."""
+        if self.campaign_start and self.campaign_start > utc_now:
+            return False
+        if self.campaign_end and self.campaign_end < utc_now:
+            return False
+        return True
+
+    def in_window(self, minute: int, weekday: int) -> bool:
+        """Check the time-of-day and day-of-week restrictions."""
+        if self.days and not self.days & (1 << weekday):
+            return False
+        if self.start_minute is None or self.end_minute is None:
+            return True
+        if self.start_minute <= self.end_minute:
+            return self.start_minute <= minute <= self.end_minute
+        # Overnight range
+        return minute >= self.start_minute or minute <= self.end_minute
+
+    def matches(
+        self,
+        positions_since_last: int,
+        now: datetime,
+        utc_now: datetime
+    ) -> bool:
+        """Check everything except the campaign's target share."""
+        return (
+            positions_since_last >= self.frequency
+            and self.in_window(now.hour * 60 + now.minute, now.isoweekday())
+            and self.is_running(utc_now)
+        )
+
+def compile_rules(rows: Iterable[Dict]) -> Tuple[AdRule, ...]:
+    """Compile schedule rows into rules, highest priority first."""
+    rules = [AdRule.from_row(row) for row in rows]
+    rules.sort(key=lambda rule: -rule.priority)
+    return tuple(rules)
+
+class AdRuleCache:
+    """Compiled ad rules per playlist, rebuilt only after edits."""
+
+    def __init__(self, max_age: float = RULES_MAX_AGE):
+        self.max_age = max_age
+        self._rules: Dict[int, Tuple[float, Tuple[AdRule, ...]]] = {}
+        self._lock = threading.Lock()
+        self.generation = 0  # Bumped on every invalidation
+
+    def get(self, playlist_id: int) -> Optional[Tuple[AdRule, ...]]:
+        """Get the compiled rules for a playlist, or None if stale."""
+        entry = self._rules.get(playlist_id)
+        if entry is None or clock.monotonic() - entry[0] > self.max_age:
+            return None
+        return entry[1]
+
+    def put(self, playlist_id: int, rules: Tuple[AdRule, ...]) -> None:
+        """Store freshly compiled rules."""
+        with self._lock:
+            self._rules[playlist_id] = (clock.monotonic(), rules)
+
+    def invalidate(self, playlist_id: Optional[int] = None) -> None:
+        """Drop one playlist's rules, or all of them."""
+        with self._lock:
+            self.generation += 1
+            if playlist_id is None:
+                self._rules.clear()
+            else:
+                self._rules.pop(playlist_id, None)
+
+# Shared by every AdScheduler in this process
+ad_rule_cache = AdRuleCache()
@@ -6,6 +6,7 @@ import random
 from ..core.logging import media_logger, log_function_call, log_error
 from ..core.database import Database, dict_from_row
 from ..core.cache import cached, invalidate_cache, cache_get, cache_set, cache_delete
+from .ordering import ORDER_GAP
 
 class PlaylistManager:
     """Manages playlist operations and state."""
@@ -113,21 +114,23 @@ class PlaylistManager:
                 if not state:
                     raise ValueError("Playlist state not found")
                 
-                # Get current max position with lock
+                # Get current max key and item count with lock
                 result = self.db.fetch_one(
                     """
-                    SELECT COALESCE(MAX(order_position), -1) as max_pos 
+                    SELECT MAX(order_position) as max_pos, COUNT(*) as item_count
                     FROM playlist_items 
                     WHERE playlist_id = ?
                     FOR UPDATE
                     """,
                     (playlist_id,)
                 )
-                current_max = result['max_pos'] + 1 if result else 0
+                max_pos = result['max_pos'] if result else None
+                current_max = result['item_count'] if result else 0
+                first_key = max_pos + ORDER_GAP if max_pos is not None else 0
                 
-                # Prepare items for batch insertion
+                # Prepare items for batch insertion, leaving gaps between keys
                 items = [
-                    (playlist_id, media_id, current_max + i)
+                    (playlist_id, media_id, first_key + i * ORDER_GAP)
                     for i, media_id in enumerate(media_ids)
                 ]
                 
@@ -295,8 +298,9 @@ class PlaylistManager:
                 LEFT JOIN media_tags mt ON m.id = mt.media_id
                 LEFT JOIN tags t ON mt.tag_id = t.id
                 WHERE pi.playlist_id = ? 
-                AND pi.order_position = ?
                 GROUP BY pi.id
+                ORDER BY pi.order_position
+                LIMIT 1 OFFSET ?
                 """,
                 (playlist_id, current_pos)
             )
@@ -0,0 +1,205 @@
+import sqlite3
+from typing import Dict, List, Optional, Tuple
+
+# Spacing between order_position keys after a rebalance. Inserting between
+# two neighbours takes the midpoint, so roughly log2(ORDER_GAP) inserts can
+# land in the same spot before that region has to be renumbered.
+ORDER_GAP = 1024
+
+# Playlists whose tightest gap falls below this are renumbered by the
+# background maintenance task before inserts run out of room.
+MIN_GAP = 16
+
+def key_between(before: Optional[int], after: Optional[int]) -> Optional[int]:
+    """Return an ordering key strictly between two neighbours.
+
+    ``None`` for a neighbour means the start or end of the playlist.
+    Returns ``None`` when there is no free key left between them.
+    """
+    if before is None and after is None:
+        return 0
+    if before is None:
+        return after - ORDER_GAP
+    if after is None:
+        return before + ORDER_GAP
+    if after - before < 2:
+        return None
+    return (before + after) // 2
+
+def keys_between(
+    before: Optional[int],
+    after: Optional[int],
+    count: int
+) -> Optional[List[int]]:
+    """Return ``count`` evenly spaced keys between two neighbours, or None."""
+    if count <= 0:
+        return []
+    if before is None and after is None:
+        return [i * ORDER_GAP for i in range(count)]
+    if before is None:
+        return [after - (count - i) * ORDER_GAP for i in range(count)]
+    if after is None:
+        return [before + (i + 1) * ORDER_GAP for i in range(count)]
+
+    step = (after - before) // (count + 1)
+    if step < 1:
+        return None
+    return [before + (i + 1) * step for i in range(count)]
+
+def _item_key(conn: sqlite3.Connection, playlist_id: int, item_id: int) -> int:
+    """Get the ordering key of a playlist item."""
+    row = conn.execute(
+        'SELECT order_position FROM playlist_items WHERE id = ? AND playlist_id = ?',
+        [item_id, playlist_id]
+    ).fetchone()
+    if row is None:
+        raise ValueError(f"Item {item_id} not found in playlist {playlist_id}")
+    return row[0]
+
+def neighbour_keys(
+    conn: sqlite3.Connection,
+    playlist_id: int,
+    after_id: Optional[int],
+    exclude_id: Optional[int] = None
+) -> Tuple[Optional[int], Optional[int]]:
+    """Get the keys surrounding the slot right after ``after_id``.
+
+    ``after_id`` of None means the start of the playlist. ``exclude_id``
+    skips the item being moved so it is not treated as its own neighbour.
+    """
+    exclude = exclude_id if exclude_id is not None else -1
+    if after_id is None:
+        before = None
+        row = conn.execute(
+            '''
+            SELECT MIN(order_position) FROM playlist_items
+            WHERE playlist_id = ? AND id != ?
+            ''',
+            [playlist_id, exclude]
+        ).fetchone()
+    else:
+        before = _item_key(conn, playlist_id, after_id)
+        row = conn.execute(
+            '''
+            SELECT MIN(order_position) FROM playlist_items
+            WHERE playlist_id = ? AND id != ? AND order_position > ?
+            ''',
+            [playlist_id, exclude, before]
+        ).fetchone()
+    return before, row[0] if row else None
+
+def rebalance_playlist(conn: sqlite3.Connection, playlist_id: int) -> int:
+    """Renumber a playlist's items with even gaps, keeping their order.
+
+    Returns the number of rows rewritten. Ties from legacy dense keys are
+    broken by item id. Does not commit.
+    """
+    rows = conn.execute(
+        '''
+        SELECT id FROM playlist_items
+        WHERE playlist_id = ?
+        ORDER BY order_position, id
+        ''',
+        [playlist_id]
+    ).fetchall()
+    conn.executemany(
+        'UPDATE playlist_items SET order_position = ? WHERE id = ?',
+        [(index * ORDER_GAP, row[0]) for index, row in enumerate(rows)]
+    )
+    return len(rows)
+
+def min_gap(conn: sqlite3.Connection, playlist_id: int) -> Optional[int]:
+    """Get the smallest gap between consecutive keys in a playlist."""
+    row = conn.execute(
+        '''
+        SELECT MIN(gap) FROM (
+            SELECT order_position - LAG(order_position) OVER (
+                ORDER BY order_position, id
+            ) AS gap
+            FROM playlist_items
+            WHERE playlist_id = ?
+        )
+        ''',
+        [playlist_id]
+    ).fetchone()
+    return row[0] if row else None
+
+def move_item(
+    conn: sqlite3.Connection,
+    playlist_id: int,
+    item_id: int,
+    after_id: Optional[int]
+) -> Dict:
+    """Move one item to the slot after ``after_id``.
+
+    Normally rewrites a single row; falls back to renumbering the playlist
+    only when the target gap is exhausted. Does not commit.
+    """
+    # Validate the moved item belongs to the playlist
+    _item_key(conn, playlist_id, item_id)
+    if after_id == item_id:
+        raise ValueError("Cannot move an item relative to itself")
+
+    rebalanced = False
+    before, after = neighbour_keys(conn, playlist_id, after_id, exclude_id=item_id)
+    key = key_between(before, after)
+    if key is None:
+        rebalance_playlist(conn, playlist_id)
+        rebalanced = True
+        before, after = neighbour_keys(conn, playlist_id, after_id, exclude_id=item_id)
+        key = key_between(before, after)
+
+    conn.execute(
+        'UPDATE playlist_items SET order_position = ? WHERE id = ?',
+        [key, item_id]
+    )
+    return {'id': item_id, 'order_position': key, 'rebalanced': rebalanced}
+
+def insert_items(
+    conn: sqlite3.Connection,
+    playlist_id: int,
+    media_ids: List[int],
+    after_id: Optional[int] = None,
+    append: bool = False
+) -> Dict:
+    """Insert media into a playlist after ``after_id`` (or at the end).
+
+    Only the new rows are written unless the target gap is too small to
+    hold them all, in which case the items after the slot are shifted
+    along to make room. Does not commit.
+    """
+    if append:
+        row = conn.execute(
+            'SELECT MAX(order_position) FROM playlist_items WHERE playlist_id = ?',
+            [playlist_id]
+        ).fetchone()
+        before, after = row[0], None
+    else:
+        before, after = neighbour_keys(conn, playlist_id, after_id)
+
+    shifted = 0
+    keys = keys_between(before, after, len(media_ids))
+    if keys is None:
+        shift = (len(media_ids) + 1) * ORDER_GAP
+        shifted = conn.execute(
+            '''
+            UPDATE playlist_items SET order_position = order_position + ?
+            WHERE playlist_id = ? AND order_position >= ?
+            ''',
+            [shift, playlist_id, after]
+        ).rowcount
+        keys = keys_between(before, after + shift, len(media_ids))
+
+    items = []
+    for media_id, key in zip(media_ids, keys):
+        cursor = conn.execute(
+            'INSERT INTO playlist_items (playlist_id, media_id, order_position) VALUES (?, ?, ?)',
+            [playlist_id, media_id, key]
+        )
+        items.append({
+            'id': cursor.lastrowid,
+            'playlist_id': playlist_id,
+            'media_id': media_id,
+            'order_position': key
+        })
+    return {'items': items, 'shifted': shifted}
@@ -0,0 +1,103 @@
+import os
+import json
+import hashlib
+from typing import Dict, List, Optional
+from urllib.parse import quote
+
+# Play an ad every N tracks
+AD_INTERVAL = 3
+
+# Upper bound for lookahead requests
+MAX_LOOKAHEAD = 50
+
+def project_positions(
+    current_position: int,
+    last_ad_position: int,
+    total_tracks: int,
+    is_repeat: bool,
+    is_shuffle: bool,
+    shuffle_queue: List[int],
+    count: int,
+    ads_available: bool = True,
+    ad_interval: int = AD_INTERVAL
+) -> List[Dict]:
+    """Project the next playback slots without touching engine state.
+
+    Mirrors the transitions made by ``next_track``. Each slot is either
+    ``{'slot': 'ad'}`` or ``{'slot': 'track', 'position': n}``. Projection
+    stops at the end of a non-repeating playlist, and once the shuffle
+    queue runs out since the next shuffle order is not known yet.
+    """
+    slots = []
+    if total_tracks <= 0:
+        return slots
+
+    position = current_position
+    last_ad = last_ad_position
+    queue = list(shuffle_queue or [])
+
+    while len(slots) < count:
+        if ads_available and position - last_ad >= ad_interval:
+            last_ad = position
+            slots.append({'slot': 'ad'})
+            continue
+
+        if is_shuffle:
+            if not queue:
+                break
+            position = queue.pop(0)
+        else:
+            position = (position + 1) % total_tracks if is_repeat else position + 1
+            if position >= total_tracks:
+                break
+
+        slots.append({'slot': 'track', 'position': position})
+
+    return slots
+
+def media_url(file_path: str) -> str:
+    """Build the URL the display client plays a media file from.
+
+    Mirrors getMediaSource in static/js/media/utils.js: the path after the
+    first ``media`` directory (or just the filename) is escaped as a single
+    segment, the way encodeURIComponent does. The bundled clients build
+    their own URLs and prefetch those, so this is a hint for other clients.
+    """
+    parts = [part for part in file_path.strip().split('/') if part.strip()]
+    if 'media' in parts and parts.index('media') < len(parts) - 1:
+        relative_path = '/'.join(parts[parts.index('media') + 1:])
+    else:
+        relative_path = parts[-1] if parts else ''
+    return '/media/' + quote(relative_path, safe="!'()*~")
+
+def describe_media(media: Dict) -> Dict:
+    """Add preload hints (url, size, duration) to a media row."""
+    file_path = media.get('file_path') or ''
+    size = None
+    if file_path and os.path.isfile(file_path):
+        size = os.path.getsize(file_path)
+    return {
+        **media,
+        'url': media_url(file_path) if file_path else None,
+        'size': size,
+        'duration': media.get('duration')
+    }
+
+def queue_version(
+    playlist_id: Optional[int],
+    state: Dict,
+    item_ids: List[int],
+    pending_ad_ids: List[int]
+) -> str:
+    """Build a token that changes whenever the projected queue changes."""
+    payload = json.dumps([
+        playlist_id,
+        state.get('current_position'),
+        state.get('last_ad_position'),
+        bool(state.get('is_repeat')),
+        bool(state.get('is_shuffle')),
+        state.get('shuffle_queue') or [],
+        item_ids,
+        pending_ad_ids
+    ])
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
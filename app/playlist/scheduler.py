@@ -1,90 +1,94 @@
 import random
 from typing import Optional, Dict, List, Tuple
-from datetime import datetime, time
+from datetime import datetime, timezone
 import json
 
 from ..core.logging import media_logger, log_function_call, log_error
 from ..core.database import Database, dict_from_row
+from .ad_rules import AdRule, compile_rules, ad_rule_cache
+from ..ads.sampler import asset_sampler
+from ..ads.impressions import ImpressionQueue, make_impression, write_impressions
+
+def to_utc(now: datetime) -> datetime:
+    """Convert a naive local time to naive UTC, as campaign dates are stored."""
+    return now.astimezone(timezone.utc).replace(tzinfo=None)
 
 class AdScheduler:
     """Manages ad scheduling and insertion into playlists."""
     
-    def __init__(self, db: Database):
+    def __init__(self, db: Database, impressions: Optional[ImpressionQueue] = None):
         self.db = db
+        self.impressions = impressions  # Buffer ad plays instead of writing inline
         self.logger = media_logger
 
-    @log_function_call(media_logger)
-    def should_play_ad(self, playlist_id: int) -> bool:
-        """Determine if an ad should be played based on scheduling rules."""
-        try:
-            # Get playlist state
-            state = self.db.fetch_one(
-                """
-                SELECT current_position, last_ad_position 
-                FROM playlist_state 
-                WHERE playlist_id = ?
-                """,
-                (playlist_id,)
-            )
-            
-            if not state:
-                return False
-            
-            # Get active ad schedules for this playlist
+    def get_rules(self, playlist_id: int) -> Tuple[AdRule, ...]:
+        """Get the compiled ad rules for a playlist, compiling on a miss."""
+        rules = ad_rule_cache.get(playlist_id)
+        if rules is None:
             schedules = self.db.fetch_all(
                 """
-                SELECT s.*, c.target_percentage
+                SELECT s.*, c.target_percentage, c.start_date, c.end_date
                 FROM ad_schedules s
                 JOIN ad_campaigns c ON s.campaign_id = c.id
                 WHERE s.playlist_id = ?
                 AND c.status = 'active'
-                AND (c.start_date IS NULL OR c.start_date <= datetime('now'))
-                AND (c.end_date IS NULL OR c.end_date >= datetime('now'))
-                ORDER BY s.priority DESC
                 """,
                 (playlist_id,)
             )
+            rules = compile_rules(dict_from_row(row) for row in schedules)
+            ad_rule_cache.put(playlist_id, rules)
+        return rules
+
+    @log_function_call(media_logger)
+    def should_play_ad(
+        self,
+        playlist_id: int,
+        current_position: Optional[int] = None,
+        last_ad_position: Optional[int] = None,
+        now: Optional[datetime] = None
+    ) -> bool:
+        """Determine if an ad should be played based on scheduling rules.
+        
+        Pass the engine's positions to skip the playlist_state lookup, and
+        ``now`` (local time) to decide for another moment, e.g. when
+        simulating.
+        """
+        try:
+            if current_position is None or last_ad_position is None:
+                # Get playlist state
+                state = self.db.fetch_one(
+                    """
+                    SELECT current_position, last_ad_position 
+                    FROM playlist_state 
+                    WHERE playlist_id = ?
+                    """,
+                    (playlist_id,)
+                )
+                
+                if not state:
+                    return False
+                current_position = state['current_position']
+                last_ad_position = state['last_ad_position']
             
-            if not schedules:
+            rules = self.get_rules(playlist_id)
+            if not rules:
                 return False
             
-            current_time = datetime.now().time()
-            current_day = datetime.now().weekday() + 1  # 1-7 for Monday-Sunday
+            now = now or datetime.now()
+            utc_now = to_utc(now)
+            positions_since_last = current_position - last_ad_position
             
-            for schedule in schedules:
-                # Check frequency
-                positions_since_last = (
-                    state['current_position'] - state['last_ad_position']
-                )
-                if positions_since_last < schedule['frequency']:
+            for rule in rules:
+                if not rule.matches(positions_since_last, now, utc_now):
                     continue
                 
-                # Check time restrictions
-                if schedule['start_time'] and schedule['end_time']:
-                    start = datetime.strptime(
-                        schedule['start_time'], '%H:%M:%S'
-                    ).time()
-                    end = datetime.strptime(
-                        schedule['end_time'], '%H:%M:%S'
-                    ).time()
-                    if not self._is_time_in_range(current_time, start, end):
-                        continue
-                
-                # Check day restrictions
-                if schedule['days_of_week']:
-                    allowed_days = [
-                        int(d) for d in schedule['days_of_week'].split(',')
-                    ]
-                    if current_day not in allowed_days:
-                        continue
-                
                 # Check if campaign has met its target percentage
-                if schedule['target_percentage']:
+                if rule.target_percentage:
                     actual_percentage = self._get_campaign_percentage(
-                        schedule['campaign_id'],
+                        rule.campaign_id,
                         playlist_id
                     )
-                    if actual_percentage >= schedule['target_percentage']:
+                    if actual_percentage >= rule.target_percentage:
                         continue
                 
                 return True
@@ -95,47 +99,35 @@ class AdScheduler:
             self.logger.error(f"Error checking ad schedule: {str(e)}")
             return False
 
-    def _is_time_in_range(
-        self,
-        current: time,
-        start: time,
-        end: time
-    ) -> bool:
-        """Check if current time is within range."""
-        if start <= end:
-            return start <= current <= end
-        else:  # Handle overnight ranges
-            return current >= start or current <= end
-
     def _get_campaign_percentage(
         self,
         campaign_id: int,
-        playlist_id: int
+        playlist_id: int,
+        planned: Optional[Dict[int, int]] = None
     ) -> float:
-        """Calculate actual percentage of ads played for a campaign."""
+        """Calculate actual percentage of ads played for a campaign.
+        
+        ``planned`` counts ads per campaign that are chosen but not yet
+        played; they are counted as if they had played.
+        """
         try:
-            # Get total ads played in playlist
-            total = self.db.fetch_one(
+            # Read the running counters rather than counting ad_logs
+            counts = self.db.fetch_one(
                 """
-                SELECT COUNT(*) as count 
-                FROM ad_logs 
+                SELECT 
+                    SUM(plays) as total,
+                    SUM(CASE WHEN campaign_id = ? THEN plays ELSE 0 END) as campaign
+                FROM ad_play_counters 
                 WHERE playlist_id = ?
                 """,
-                (playlist_id,)
-            )['count']
-            
-            if not total:
-                return 0.0
-            
-            # Get campaign ads played
-            campaign = self.db.fetch_one(
-                """
-                SELECT COUNT(*) as count 
-                FROM ad_logs 
-                WHERE campaign_id = ? AND playlist_id = ?
-                """,
                 (campaign_id, playlist_id)
-            )['count']
+            )
+            
+            total = counts['total'] or 0
+            campaign = counts['campaign'] or 0
+            if planned:
+                total += sum(planned.values())
+                campaign += planned.get(campaign_id, 0)
             
             return (campaign / total) * 100 if total > 0 else 0.0
 
@@ -146,23 +138,24 @@ class AdScheduler:
             return 0.0
 
     @log_function_call(media_logger)
-    def get_next_ad(self, playlist_id: int) -> Optional[Dict]:
-        """Get the next ad to play based on scheduling rules."""
+    def get_next_ad(
+        self,
+        playlist_id: int,
+        now: Optional[datetime] = None,
+        planned: Optional[Dict[int, int]] = None
+    ) -> Optional[Dict]:
+        """Get the next ad to play based on scheduling rules.
+        
+        ``planned`` counts ads per campaign already chosen for upcoming
+        breaks, so picking several ahead spreads them as playing would.
+        """
         try:
             # Get eligible campaigns
-            campaigns = self.db.fetch_all(
-                """
-                SELECT DISTINCT c.id, c.target_percentage, s.priority
-                FROM ad_campaigns c
-                JOIN ad_schedules s ON s.campaign_id = c.id
-                WHERE s.playlist_id = ?
-                AND c.status = 'active'
-                AND (c.start_date IS NULL OR c.start_date <= datetime('now'))
-                AND (c.end_date IS NULL OR c.end_date >= datetime('now'))
-                ORDER BY s.priority DESC
-                """,
-                (playlist_id,)
-            )
+            utc_now = to_utc(now or datetime.now())
+            campaigns = [
+                rule for rule in self.get_rules(playlist_id)
+                if rule.is_running(utc_now)
+            ]
             
             if not campaigns:
                 return None
@@ -170,41 +163,23 @@ class AdScheduler:
             # Select campaign based on priority and target percentage
             selected_campaign = None
             for campaign in campaigns:
+                if not campaign.target_percentage:
+                    selected_campaign = campaign
+                    break
                 actual_percentage = self._get_campaign_percentage(
-                    campaign['id'],
-                    playlist_id
+                    campaign.campaign_id,
+                    playlist_id,
+                    planned
                 )
-                if (not campaign['target_percentage'] or 
-                    actual_percentage < campaign['target_percentage']):
+                if actual_percentage < campaign.target_percentage:
                     selected_campaign = campaign
                     break
             
             if not selected_campaign:
                 return None
             
-            # Get random ad from selected campaign
-            ad = self.db.fetch_one(
-                """
-                SELECT 
-                    a.id as asset_id,
-                    a.type,
-                    a.duration,
-                    a.weight,
-                    m.*
-                FROM ad_assets a
-                JOIN media m ON a.media_id = m.id
-                WHERE a.campaign_id = ?
-                AND a.active = 1
-                ORDER BY RANDOM()
-                LIMIT 1
-                """,
-                (selected_campaign['id'],)
-            )
-            
-            if not ad:
-                return None
-            
-            return dict_from_row(ad)
+            # Draw an asset from the selected campaign by weight
+            return asset_sampler.draw(self.db, selected_campaign.campaign_id)
 
         except Exception as e:
             self.logger.error(f"Error getting next ad: {str(e)}")
@@ -217,41 +192,90 @@ class AdScheduler:
         campaign_id: int,
         asset_id: int,
         duration: int,
-        completed: bool = True
+        completed: bool = True,
+        position: Optional[int] = None
     ) -> bool:
-        """Log an ad play event."""
+        """Log an ad play event.
+        
+        ``position`` is the playlist position the ad aired at, which
+        last_ad_position moves up to. With an impression queue the play is spooled and written in the
+        queue's next batch, so target shares lag by up to one flush
+        interval. Otherwise it is written now, in one transaction.
+        """
         try:
-            self.db.insert('ad_logs', {
-                'campaign_id': campaign_id,
-                'asset_id': asset_id,
-                'playlist_id': playlist_id,
-                'duration': duration,
-                'completed': completed
-            })
-            
-            # Update last ad position
-            state = self.db.fetch_one(
-                """
-                SELECT current_position 
-                FROM playlist_state 
-                WHERE playlist_id = ?
-                """,
-                (playlist_id,)
-            )
-            
-            if state:
-                self.db.update(
-                    'playlist_state',
-                    {'last_ad_position': state['current_position']},
-                    {'playlist_id': playlist_id}
+            if self.impressions is not None:
+                self.impressions.record(
+                    playlist_id, campaign_id, asset_id, duration, completed, position
                 )
+                return True
             
+            event = make_impression(
+                playlist_id, campaign_id, asset_id, duration, completed, position
+            )
+            try:
+                write_impressions(self.db.connection, [event])
+                self.db.commit()
+            except Exception:
+                self.db.connection.rollback()
+                raise
             return True
 
         except Exception as e:
             self.logger.error(f"Error logging ad play: {str(e)}")
             return False
 
+    @log_function_call(media_logger)
+    def reconcile_play_counters(self) -> int:
+        """Rebuild ad_play_counters from ad_logs.
+        
+        Repairs drift from writes that bypassed log_ad_play and from log
+        cleanup. Returns the number of counters that were wrong.
+        """
+        try:
+            drift = self.db.fetch_one(
+                """
+                SELECT COUNT(*) as count FROM (
+                    SELECT playlist_id, campaign_id, COUNT(*) as plays
+                    FROM ad_logs
+                    WHERE playlist_id IS NOT NULL AND campaign_id IS NOT NULL
+                    GROUP BY playlist_id, campaign_id
+                    EXCEPT
+                    SELECT playlist_id, campaign_id, plays FROM ad_play_counters
+                    WHERE plays > 0
+                ) 
+                """
+            )['count']
+            stale = self.db.fetch_one(
+                """
+                SELECT COUNT(*) as count FROM ad_play_counters c
+                WHERE c.plays > 0 AND NOT EXISTS (
+                    SELECT 1 FROM ad_logs l
+                    WHERE l.playlist_id = c.playlist_id
+                    AND l.campaign_id = c.campaign_id
+                )
+                """
+            )['count']
+            
+            if drift or stale:
+                self.db.execute("DELETE FROM ad_play_counters")
+                self.db.execute(
+                    """
+                    INSERT INTO ad_play_counters (playlist_id, campaign_id, plays)
+                    SELECT playlist_id, campaign_id, COUNT(*)
+                    FROM ad_logs
+                    WHERE playlist_id IS NOT NULL AND campaign_id IS NOT NULL
+                    GROUP BY playlist_id, campaign_id
+                    """
+                )
+                self.db.commit()
+            
+            return drift + stale
+
+        except Exception as e:
+            self.db.connection.rollback()
+            self.logger.error(f"Error reconciling ad play counters: {str(e)}")
+            return 0
+
     @log_function_call(media_logger)
     def get_campaign_stats(self, campaign_id: int) -> Dict:
         """Get statistics for a campaign."""
@@ -350,6 +374,11 @@ class AdScheduler:
                     updates,
                     {'id': schedule_id}
                 )
+                schedule = self.db.fetch_one(
+                    "SELECT playlist_id FROM ad_schedules WHERE id = ?",
+                    (schedule_id,)
+                )
+                ad_rule_cache.invalidate(schedule['playlist_id'] if schedule else None)
                 return True
             return False
 
@@ -0,0 +1,89 @@
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+# Duration assumed for media whose duration has not been probed yet
+DEFAULT_DURATION = 180
+
+# Longest timeline a client may request, in seconds
+MAX_HORIZON = 24 * 60 * 60
+
+# Upper bound on projected slots so a playlist of very short items
+# cannot make a timeline request unbounded
+MAX_TIMELINE_ITEMS = 5000
+
+def item_duration(item: Dict) -> Tuple[float, bool]:
+    """Get an item's duration and whether it had to be estimated.
+
+    Items may flag their own duration as estimated, e.g. ad breaks that are
+    not planned yet.
+    """
+    duration = item.get('duration')
+    if duration and duration > 0:
+        return float(duration), bool(item.get('estimated'))
+    return float(DEFAULT_DURATION), True
+
+class Timeline:
+    """Projected playout with O(log n) time-to-item lookup.
+
+    ``offsets[i]`` is the number of seconds from ``started_at`` until item
+    ``i`` starts; the prefix sums are computed once so every lookup is a
+    binary search.
+    """
+
+    def __init__(self, items: List[Dict], started_at: datetime):
+        self.items = items
+        self.started_at = started_at
+        self.offsets: List[float] = []
+        total = 0.0
+        for item in items:
+            self.offsets.append(total)
+            total += item_duration(item)[0]
+        self.length = total
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    @property
+    def ends_at(self) -> datetime:
+        """Get the time the last projected item finishes."""
+        return self.started_at + timedelta(seconds=self.length)
+
+    def index_at(self, at: datetime) -> Optional[int]:
+        """Get the index of the item playing at ``at``, or None if outside."""
+        offset = (at - self.started_at).total_seconds()
+        if offset < 0 or offset >= self.length:
+            return None
+        return bisect_right(self.offsets, offset) - 1
+
+    def locate(self, at: datetime) -> Optional[Dict]:
+        """Get the item playing at ``at`` and how far into it playback is."""
+        index = self.index_at(at)
+        if index is None:
+            return None
+        offset = (at - self.started_at).total_seconds() - self.offsets[index]
+        return {**self.entry(index), 'offset': round(offset, 3)}
+
+    def entry(self, index: int) -> Dict:
+        """Get an item with its absolute start and end times."""
+        item = self.items[index]
+        duration, estimated = item_duration(item)
+        starts_at = self.started_at + timedelta(seconds=self.offsets[index])
+        return {
+            **item,
+            'index': index,
+            'starts_at': starts_at.isoformat(),
+            'ends_at': (starts_at + timedelta(seconds=duration)).isoformat(),
+            'estimated': estimated
+        }
+
+    def window(self, start: datetime, end: datetime) -> List[Dict]:
+        """Get the items that overlap [start, end), in play order."""
+        first = self.index_at(start)
+        if first is None:
+            if start >= self.ends_at:
+                return []
+            first = 0
+        # Items starting exactly at ``end`` are excluded
+        last = bisect_left(self.offsets, (end - self.started_at).total_seconds())
+        return [self.entry(index) for index in range(first, last)]
@@ -0,0 +1,303 @@
+import heapq
+import itertools
+import threading
+from datetime import datetime, timedelta, time
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from ..core.logging import media_logger
+
+# Upper bound on a single sleep so wall-clock jumps (DST, NTP) are noticed
+MAX_WAIT = 60.0
+
+# Seconds between checks of the loader for schedule edits made through
+# other processes
+RELOAD_INTERVAL = 60.0
+
+# A schedule edit: (schedule id, when it was made, the row or None if deleted)
+Change = Tuple[int, datetime, Optional[Dict]]
+
+def parse_days(days) -> Set[int]:
+    """Parse weekly schedule days into a set of day indexes (0 = Sunday).
+
+    Accepts the stored comma-separated form ("0,3,5"), a list of indexes,
+    or the admin form's list of seven booleans.
+    """
+    if not days:
+        return set()
+    if isinstance(days, str):
+        return {int(day) for day in days.split(',') if day.strip() != ''}
+    if all(isinstance(day, bool) for day in days):
+        return {index for index, checked in enumerate(days) if checked}
+    return {int(day) for day in days}
+
+def _parse_time(value: str) -> time:
+    """Parse an HH:MM or HH:MM:SS time string."""
+    return time.fromisoformat(value)
+
+def next_fire_time(schedule: Dict, after: datetime) -> Optional[datetime]:
+    """Get the first moment strictly after ``after`` a schedule should fire.
+
+    Returns None for one-off schedules in the past and for schedules that
+    can never fire (weekly with no days selected).
+    """
+    schedule_type = schedule.get('type')
+
+    if schedule_type == 'once':
+        if not schedule.get('datetime'):
+            return None
+        fire_at = datetime.fromisoformat(str(schedule['datetime']))
+        return fire_at if fire_at > after else None
+
+    if not schedule.get('time'):
+        return None
+    at = _parse_time(str(schedule['time']))
+    candidate = datetime.combine(after.date(), at)
+
+    if schedule_type == 'daily':
+        if candidate <= after:
+            candidate += timedelta(days=1)
+        return candidate
+
+    if schedule_type == 'weekly':
+        days = parse_days(schedule.get('days'))
+        if not days:
+            return None
+        # Check today plus the next seven days so today's slot that already
+        # passed still finds the same weekday next week
+        for offset in range(8):
+            day = candidate + timedelta(days=offset)
+            # datetime.weekday() is 0 = Monday; schedules use 0 = Sunday
+            if (day.weekday() + 1) % 7 in days and day > after:
+                return day
+        return None
+
+    return None
+
+class ScheduleTimer:
+    """Fires playlist schedules at their exact start time.
+
+    Upcoming fire times are kept in a min-heap, so a worker thread only has
+    to sleep until the earliest one instead of polling the database. Edits
+    bump a per-schedule version; heap entries from older versions are
+    skipped when they surface, so reloading one schedule never touches the
+    others.
+
+    ``upsert`` and ``remove`` only change this process's heap. Edits made
+    in other processes reach the worker through ``loader``, which it asks
+    every RELOAD_INTERVAL seconds for the changes after ``watermark``; see
+    apply_changes.
+    """
+
+    def __init__(
+        self,
+        on_fire: Optional[Callable[[Dict], None]] = None,
+        clock: Callable[[], datetime] = datetime.now,
+        loader: Optional[Callable[[int], Tuple[int, List[Change]]]] = None
+    ):
+        self.on_fire = on_fire
+        self.clock = clock
+        self.loader = loader
+        self.watermark = 0
+        self.logger = media_logger
+        self._heap: List = []
+        self._schedules: Dict[int, Dict] = {}
+        self._versions: Dict[int, int] = {}
+        # When this process last took each schedule's definition
+        self._applied: Dict[int, datetime] = {}
+        self._seq = itertools.count()
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = False
+
+    def __len__(self) -> int:
+        return len(self._schedules)
+
+    def _push(self, schedule: Dict, after: datetime) -> None:
+        """Queue the next firing of a schedule. Caller holds the lock."""
+        schedule_id = schedule['id']
+        fire_at = next_fire_time(schedule, after)
+        if fire_at is None:
+            self._schedules.pop(schedule_id, None)
+            return
+        self._schedules[schedule_id] = schedule
+        heapq.heappush(
+            self._heap,
+            (fire_at, next(self._seq), schedule_id, self._versions[schedule_id])
+        )
+
+    def _compact(self) -> None:
+        """Drop stale heap entries once they outnumber live ones."""
+        if len(self._heap) > 2 * len(self._schedules) + 64:
+            self._heap = [
+                entry for entry in self._heap
+                if self._versions.get(entry[2]) == entry[3]
+                and entry[2] in self._schedules
+            ]
+            heapq.heapify(self._heap)
+
+    def load(self, schedules: Iterable[Dict], now: Optional[datetime] = None) -> None:
+        """Replace all schedules, queueing their first firing after ``now``."""
+        now = now or self.clock()
+        with self._condition:
+            self._heap = []
+            self._schedules = {}
+            for schedule in schedules:
+                schedule = dict(schedule)
+                self._versions[schedule['id']] = self._versions.get(schedule['id'], 0) + 1
+                self._applied[schedule['id']] = now
+                self._push(schedule, now)
+            self._condition.notify()
+
+    def upsert(self, schedule: Dict) -> None:
+        """Add or reload a single schedule."""
+        schedule = dict(schedule)
+        with self._condition:
+            now = self.clock()
+            self._versions[schedule['id']] = self._versions.get(schedule['id'], 0) + 1
+            self._applied[schedule['id']] = now
+            self._push(schedule, now)
+            self._compact()
+            self._condition.notify()
+
+    def remove(self, schedule_id: int) -> None:
+        """Stop a schedule from firing."""
+        with self._condition:
+            self._versions[schedule_id] = self._versions.get(schedule_id, 0) + 1
+            self._applied[schedule_id] = self.clock()
+            self._schedules.pop(schedule_id, None)
+            self._compact()
+            self._condition.notify()
+
+    def apply_changes(self, changes: Iterable[Change]) -> int:
+        """Apply schedule edits made through other processes.
+
+        Each edited schedule is queued from when the edit was made, not from
+        now, so a fire time that passed since then is still due and fires on
+        the next pop_due. Edits this process already has (it made them, or
+        loaded the schedule after them) are skipped so they cannot fire twice.
+        Returns the number of schedules changed.
+        """
+        applied = 0
+        with self._condition:
+            for schedule_id, changed_at, schedule in changes:
+                if self._applied.get(schedule_id, datetime.min) >= changed_at:
+                    continue
+                self._versions[schedule_id] = self._versions.get(schedule_id, 0) + 1
+                self._applied[schedule_id] = changed_at
+                if schedule is None:
+                    self._schedules.pop(schedule_id, None)
+                else:
+                    self._push(dict(schedule), changed_at)
+                applied += 1
+            if applied:
+                self._compact()
+                self._condition.notify()
+        return applied
+
+    def _discard_stale(self) -> None:
+        """Pop invalidated entries off the top of the heap. Caller holds the lock."""
+        while self._heap:
+            _, _, schedule_id, version = self._heap[0]
+            if schedule_id in self._schedules and self._versions.get(schedule_id) == version:
+                return
+            heapq.heappop(self._heap)
+
+    def next_fire(self) -> Optional[datetime]:
+        """Get the earliest pending fire time."""
+        with self._condition:
+            self._discard_stale()
+            return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: Optional[datetime] = None) -> List[Dict]:
+        """Remove and return schedules due at ``now``, in fire order.
+
+        Recurring schedules are re-queued for their next occurrence after
+        ``now``, so one that was missed several times (the host slept or
+        the clock jumped) fires once, not once per missed occurrence.
+        """
+        now = now or self.clock()
+        due = []
+        with self._condition:
+            while True:
+                self._discard_stale()
+                if not self._heap or self._heap[0][0] > now:
+                    break
+                fire_at, _, schedule_id, _ = heapq.heappop(self._heap)
+                schedule = self._schedules[schedule_id]
+                due.append(schedule)
+                self._push(schedule, now)
+        return due
+
+    def _fire(self, schedule: Dict) -> None:
+        """Run the activation callback for a schedule."""
+        self.logger.info(
+            f"Schedule {schedule['id']} fired for playlist {schedule['playlist_id']}"
+        )
+        if not self.on_fire:
+            return
+        try:
+            self.on_fire(schedule)
+        except Exception as e:
+            self.logger.error(f"Error activating schedule {schedule['id']}: {str(e)}")
+
+    def _sync(self) -> None:
+        """Apply the loader's changes since the watermark and advance it."""
+        try:
+            watermark, changes = self.loader(self.watermark)
+        except Exception as e:
+            self.logger.error(f"Error loading playlist schedule changes: {str(e)}")
+            return
+        self.apply_changes(changes)
+        self.watermark = watermark
+
+    def _run(self) -> None:
+        """Worker loop: sleep until the next fire time, then fire."""
+        reload_at = self.clock() + timedelta(seconds=RELOAD_INTERVAL)
+        while True:
+            with self._condition:
+                if self._stopped:
+                    return
+                self._discard_stale()
+                now = self.clock()
+                if self._heap:
+                    wait = (self._heap[0][0] - now).total_seconds()
+                else:
+                    wait = MAX_WAIT
+                reload = self.loader is not None and wait > 0 and now >= reload_at
+                if wait > 0 and not reload:
+                    if self.loader is not None:
+                        wait = min(wait, (reload_at - now).total_seconds())
+                    self._condition.wait(min(wait, MAX_WAIT))
+                    continue
+
+            if reload:
+                # Changes due since they were made fire on the next pass
+                self._sync()
+                reload_at = now + timedelta(seconds=RELOAD_INTERVAL)
+                continue
+
+            for schedule in self.pop_due():
+                self._fire(schedule)
+
+    def start(self) -> None:
+        """Start the worker thread."""
+        with self._condition:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stopped = False
+            self._thread = threading.Thread(
+                target=self._run, name='playlist-schedule-timer', daemon=True
+            )
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the worker thread."""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+# Process-wide timer used by the API
+schedule_timer = ScheduleTimer()
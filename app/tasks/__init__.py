@@ -41,6 +41,10 @@ celery.conf.update(
             'task': 'app.tasks.maintenance.cleanup_temp_files',
             'schedule': 3600.0,  # every hour
         },
+        'update-ad-rollups': {
+            'task': 'app.tasks.analytics.update_ad_rollups',
+            'schedule': 300.0,  # every 5 minutes
+        },
         'update-analytics': {
             'task': 'app.tasks.analytics.update_campaign_stats',
             'schedule': 300.0,  # every 5 minutes
@@ -49,6 +53,18 @@ celery.conf.update(
             'task': 'app.tasks.media.scan_media_directory',
             'schedule': 1800.0,  # every 30 minutes
         },
+        'rebalance-playlist-orders': {
+            'task': 'app.tasks.maintenance.rebalance_playlist_orders',
+            'schedule': 3600.0,  # every hour
+        },
+        'reconcile-ad-counters': {
+            'task': 'app.tasks.maintenance.reconcile_ad_counters',
+            'schedule': 86400.0,  # daily
+        },
+        'export-ad-logs': {
+            'task': 'app.tasks.analytics.export_ad_logs',
+            'schedule': 86400.0,  # daily
+        },
         'verify-file-integrity': {
             'task': 'app.tasks.maintenance.verify_file_integrity',
             'schedule': 86400.0,  # daily
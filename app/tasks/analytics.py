@@ -1,12 +1,17 @@
-from celery import shared_task
+from celery import shared_task, chord
+import base64
+import io
 from celery.utils.log import get_task_logger
-import json
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 from typing import Optional, Dict, List
+import tracemalloc
 import pandas as pd
+import pyarrow as pa
 import matplotlib.pyplot as plt
 import seaborn as sns
 from pathlib import Path
+import shutil
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
@@ -15,127 +20,174 @@ from email.mime.application import MIMEApplication
 from ..core.config import get_settings
 from ..core.database import Database
 from ..ads.analytics import AdAnalytics
+from ..ads.export import AdLogExporter, totals_by, hourly_counts
+from ..ads.report_cache import ReportCache
 
 # Initialize components
 settings = get_settings()
 db = Database(settings.database.path)
 ad_analytics = AdAnalytics(db)
+ad_log_exporter = AdLogExporter(db, settings.ads.export_path)
+report_cache = ReportCache(db, settings.cache.report_path, settings.cache.report_open_timeout)
 logger = get_task_logger(__name__)
 
+def cached_totals(
+    key: Optional[str],
+    start_day,
+    end_day,
+    known: Optional[Dict[str, Dict]] = None
+) -> pd.DataFrame:
+    """Get totals_by for a period, from the report cache when it has them."""
+    spec = {
+        'key': key,
+        'known': {column: sorted(ids) for column, ids in (known or {}).items()}
+    }
+    return report_cache.aggregate(
+        'totals', spec, start_day, end_day,
+        lambda: totals_by(db, settings.ads.export_path, key, start_day, end_day, known)
+    )
+
+@contextmanager
+def peak_memory(report: str):
+    """Log the memory used while building a report.
+    
+    tracemalloc sees Python and NumPy allocations only. Arrow buffers come
+    from Arrow's memory pool, whose high-water mark covers the whole
+    process, so it is logged separately next to the report's own peak.
+    """
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.reset_peak()
+    else:
+        tracemalloc.start()
+    try:
+        yield
+    finally:
+        _, peak = tracemalloc.get_traced_memory()
+        if not tracing:
+            tracemalloc.stop()
+        pool = pa.default_memory_pool()
+        logger.info(
+            f"Built {report} report, peak Python/NumPy memory {peak / 1024 / 1024:.1f} MiB; "
+            f"Arrow pool ({pool.backend_name}) peak {pool.max_memory() / 1024 / 1024:.1f} MiB "
+            f"for this process, {pool.bytes_allocated() / 1024 / 1024:.1f} MiB still allocated"
+        )
+
+@shared_task(name='app.tasks.analytics.update_ad_rollups')
+def update_ad_rollups() -> int:
+    """Fold new ad logs into the hourly analytics rollups."""
+    try:
+        rolled = ad_analytics.update_rollups()
+        logger.info(f"Rolled up {rolled} ad logs")
+        return rolled
+
+    except Exception as e:
+        logger.error(f"Error updating ad rollups: {str(e)}")
+        raise
+
 @shared_task(name='app.tasks.analytics.update_campaign_stats')
 def update_campaign_stats() -> Dict[int, Dict]:
-    """Update statistics for all active campaigns."""
+    """Fold new ad logs into the stored campaign statistics.
+    
+    Only logs past the stats watermark are read; campaigns without new
+    plays are left alone and not returned.
+    """
     try:
         logger.info("Updating campaign statistics")
-        results = {}
-        
-        # Get active campaigns
-        campaigns = db.fetch_all(
-            """
-            SELECT id FROM ad_campaigns 
-            WHERE status = 'active'
-            """
-        )
-        
-        for campaign in campaigns:
-            campaign_id = campaign['id']
-            try:
-                # Get campaign metrics
-                metrics = ad_analytics.get_campaign_metrics(campaign_id)
-                
-                # Store metrics in cache
-                cache_key = f"campaign_metrics:{campaign_id}"
-                metrics['timestamp'] = datetime.now().isoformat()
-                
-                # Update campaign stats in database
-                db.update(
-                    'ad_campaigns',
-                    {
-                        'last_metrics': json.dumps(metrics),
-                        'updated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                    },
-                    {'id': campaign_id}
-                )
-                
-                results[campaign_id] = metrics
-                
-            except Exception as e:
-                logger.error(f"Error updating stats for campaign {campaign_id}: {str(e)}")
-                results[campaign_id] = {'error': str(e)}
-        
+        results = ad_analytics.update_campaign_stats()
+        logger.info(f"Updated statistics for {len(results)} campaigns")
         return results
 
     except Exception as e:
         logger.error(f"Error updating campaign stats: {str(e)}")
         raise
 
+@shared_task(name='app.tasks.analytics.export_ad_logs')
+def export_ad_logs() -> Dict[str, int]:
+    """Write closed days of ad logs to columnar files for offline reports."""
+    try:
+        exported = ad_log_exporter.export_closed()
+        logger.info(f"Exported {len(exported)} days of ad logs")
+        return exported
+
+    except Exception as e:
+        logger.error(f"Error exporting ad logs: {str(e)}")
+        raise
+
 @shared_task(name='app.tasks.analytics.generate_daily_reports', bind=True)
 def generate_daily_reports(self, send_email: bool = True) -> Dict[str, str]:
-    """Generate daily analytics reports."""
+    """Generate daily analytics reports.
+    
+    The data for every chart is aggregated here, then each chart is
+    rendered by its own render_report_chart task so they run in parallel
+    across the analytics workers. The rendered PDFs come back in the chord
+    result, so deliver_daily_reports can save and email them from any host
+    once all of them have finished. Returns where each report is written.
+    """
     try:
         logger.info("Generating daily reports")
         today = datetime.now()
         yesterday = today - timedelta(days=1)
         report_date = yesterday.strftime('%Y-%m-%d')
         
-        # Create reports directory
-        reports_dir = Path('reports') / report_date
-        reports_dir.mkdir(parents=True, exist_ok=True)
-        
+        renders = []
         reports = {}
+        for name, build in REPORT_DATA.items():
+            with peak_memory(name):
+                df = build(yesterday)
+            renders.append(render_report_chart.s(name, df.to_dict('records')))
+            reports[name] = str(daily_report_path(report_date, name))
         
-        # Generate campaign performance report
-        campaign_report = generate_campaign_report(yesterday)
-        report_path = reports_dir / 'campaign_performance.pdf'
-        campaign_report.savefig(report_path)
-        plt.close()
-        reports['campaign_performance'] = str(report_path)
-        
-        # Generate asset performance report
-        asset_report = generate_asset_report(yesterday)
-        report_path = reports_dir / 'asset_performance.pdf'
-        asset_report.savefig(report_path)
-        plt.close()
-        reports['asset_performance'] = str(report_path)
-        
-        # Generate hourly distribution report
-        hourly_report = generate_hourly_report(yesterday)
-        report_path = reports_dir / 'hourly_distribution.pdf'
-        hourly_report.savefig(report_path)
-        plt.close()
-        reports['hourly_distribution'] = str(report_path)
-        
-        # Send email if requested
-        if send_email:
-            send_daily_report_email(reports, report_date)
-        
+        chord(renders)(deliver_daily_reports.s(report_date, send_email))
         return reports
 
     except Exception as e:
         logger.error(f"Error generating daily reports: {str(e)}")
         self.retry(exc=e, countdown=300)  # Retry after 5 minutes
 
-def generate_campaign_report(date: datetime) -> plt.Figure:
-    """Generate campaign performance visualization."""
-    # Get campaign data
-    campaigns = db.fetch_all(
-        """
-        SELECT 
-            c.name,
-            COUNT(l.id) as impressions,
-            SUM(CASE WHEN l.completed = 1 THEN 1 ELSE 0 END) as completions
-        FROM ad_campaigns c
-        LEFT JOIN ad_logs l ON c.id = l.campaign_id
-        WHERE DATE(l.timestamp) = DATE(?)
-        GROUP BY c.id, c.name
-        """,
-        (date.strftime('%Y-%m-%d'),)
-    )
-    
-    # Create DataFrame
-    df = pd.DataFrame([dict(c) for c in campaigns])
+def daily_report_path(report_date: str, name: str) -> Path:
+    """Get where a daily report is saved, under the configured report path."""
+    return Path(settings.ads.report_path) / report_date / f'{name}.pdf'
+
+@shared_task(name='app.tasks.analytics.render_report_chart')
+def render_report_chart(name: str, records: List[Dict]) -> Dict[str, str]:
+    """Render one report chart from pre-aggregated rows.
     
-    # Create visualization
+    Returns the PDF base64-encoded rather than a path, since the task
+    that delivers it may run on another host.
+    """
+    figure = REPORT_CHARTS[name](pd.DataFrame.from_records(records))
+    buffer = io.BytesIO()
+    figure.savefig(buffer, format='pdf')
+    plt.close(figure)
+    return {name: base64.b64encode(buffer.getvalue()).decode('ascii')}
+
+@shared_task(name='app.tasks.analytics.deliver_daily_reports')
+def deliver_daily_reports(
+    rendered: List[Dict[str, str]],
+    report_date: str,
+    send_email: bool = True
+) -> Dict[str, str]:
+    """Save the rendered daily reports and email them."""
+    reports = {}
+    for part in rendered:
+        for name, pdf in part.items():
+            path = daily_report_path(report_date, name)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(base64.b64decode(pdf))
+            reports[name] = str(path)
+    if send_email:
+        send_daily_report_email(reports, report_date)
+    return reports
+
+def campaign_report_data(date: datetime, end_date: Optional[datetime] = None) -> pd.DataFrame:
+    """Get impressions and completions per campaign for a day, or days up to end_date."""
+    totals = cached_totals('campaign_id', date.date(), (end_date or date).date())
+    names = pd.read_sql_query('SELECT id, name FROM ad_campaigns', db.connection, index_col='id')
+    return names.join(totals, how='inner').rename(columns={'plays': 'impressions'})
+
+def plot_campaign_report(df: pd.DataFrame) -> plt.Figure:
+    """Plot campaign performance."""
     plt.figure(figsize=(12, 6))
     sns.barplot(data=df, x='name', y='impressions')
     plt.title('Campaign Performance')
@@ -144,29 +196,26 @@ def generate_campaign_report(date: datetime) -> plt.Figure:
     
     return plt.gcf()
 
-def generate_asset_report(date: datetime) -> plt.Figure:
-    """Generate asset performance visualization."""
-    # Get asset data
-    assets = db.fetch_all(
+def generate_campaign_report(date: datetime, end_date: Optional[datetime] = None) -> plt.Figure:
+    """Generate campaign performance visualization for a day, or days up to end_date."""
+    return plot_campaign_report(campaign_report_data(date, end_date))
+
+def asset_report_data(date: datetime, end_date: Optional[datetime] = None) -> pd.DataFrame:
+    """Get plays and completions per asset for a day, or days up to end_date."""
+    totals = cached_totals('asset_id', date.date(), (end_date or date).date())
+    assets = pd.read_sql_query(
         """
-        SELECT 
-            m.title,
-            a.type,
-            COUNT(l.id) as plays,
-            SUM(CASE WHEN l.completed = 1 THEN 1 ELSE 0 END) as completions
+        SELECT a.id, m.title, a.type
         FROM ad_assets a
         JOIN media m ON a.media_id = m.id
-        LEFT JOIN ad_logs l ON a.id = l.asset_id
-        WHERE DATE(l.timestamp) = DATE(?)
-        GROUP BY a.id, m.title, a.type
         """,
-        (date.strftime('%Y-%m-%d'),)
+        db.connection,
+        index_col='id'
     )
-    
-    # Create DataFrame
-    df = pd.DataFrame([dict(a) for a in assets])
-    
-    # Create visualization
+    return assets.join(totals, how='inner')
+
+def plot_asset_report(df: pd.DataFrame) -> plt.Figure:
+    """Plot asset performance."""
     plt.figure(figsize=(12, 6))
     sns.scatterplot(data=df, x='plays', y='completions', hue='type', size='plays')
     plt.title('Asset Performance')
@@ -174,26 +223,26 @@ def generate_asset_report(date: datetime) -> plt.Figure:
     
     return plt.gcf()
 
-def generate_hourly_report(date: datetime) -> plt.Figure:
-    """Generate hourly distribution visualization."""
-    # Get hourly data
-    hourly = db.fetch_all(
-        """
-        SELECT 
-            strftime('%H', timestamp) as hour,
-            COUNT(*) as impressions
-        FROM ad_logs
-        WHERE DATE(timestamp) = DATE(?)
-        GROUP BY hour
-        ORDER BY hour
-        """,
-        (date.strftime('%Y-%m-%d'),)
-    )
+def generate_asset_report(date: datetime, end_date: Optional[datetime] = None) -> plt.Figure:
+    """Generate asset performance visualization for a day, or days up to end_date."""
+    return plot_asset_report(asset_report_data(date, end_date))
+
+def hourly_report_data(date: datetime, end_date: Optional[datetime] = None) -> pd.DataFrame:
+    """Get impressions per hour of the day, for the hours with plays."""
+    start_day, end_day = date.date(), (end_date or date).date()
     
-    # Create DataFrame
-    df = pd.DataFrame([dict(h) for h in hourly])
+    def build() -> pd.DataFrame:
+        counts = hourly_counts(db, settings.ads.export_path, start_day, end_day)
+        hours = counts.nonzero()[0]
+        return pd.DataFrame({
+            'hour': [f'{hour:02d}' for hour in hours],
+            'impressions': counts[hours]
+        })
     
-    # Create visualization
+    return report_cache.aggregate('hourly', {}, start_day, end_day, build)
+
+def plot_hourly_report(df: pd.DataFrame) -> plt.Figure:
+    """Plot the hourly distribution."""
     plt.figure(figsize=(12, 6))
     sns.lineplot(data=df, x='hour', y='impressions')
     plt.title('Hourly Distribution')
@@ -203,6 +252,22 @@ def generate_hourly_report(date: datetime) -> plt.Figure:
     
     return plt.gcf()
 
+def generate_hourly_report(date: datetime, end_date: Optional[datetime] = None) -> plt.Figure:
+    """Generate hourly distribution visualization for a day, or days up to end_date."""
+    return plot_hourly_report(hourly_report_data(date, end_date))
+
+# Daily reports: how each one's data is built and how it is drawn
+REPORT_DATA = {
+    'campaign_performance': campaign_report_data,
+    'asset_performance': asset_report_data,
+    'hourly_distribution': hourly_report_data
+}
+REPORT_CHARTS = {
+    'campaign_performance': plot_campaign_report,
+    'asset_performance': plot_asset_report,
+    'hourly_distribution': plot_hourly_report
+}
+
 def send_daily_report_email(reports: Dict[str, str], report_date: str):
     """Send daily report email with attachments."""
     try:
@@ -263,65 +328,62 @@ def generate_custom_report(
         start = datetime.strptime(start_date, '%Y-%m-%d')
         end = datetime.strptime(end_date, '%Y-%m-%d')
         
-        # Build query based on requested metrics
-        select_clauses = []
+        # Count logs for known campaigns and assets, as the joins used to,
+        # a chunk at a time; exported days are read from Parquet and
+        # totals for closed periods come from the report cache
+        campaigns = {row['id']: row['name'] for row in db.fetch_all('SELECT id, name FROM ad_campaigns')}
+        assets = {
+            row['id']: row['title'] for row in db.fetch_all(
+                'SELECT a.id, m.title FROM ad_assets a JOIN media m ON a.media_id = m.id'
+            )
+        }
+        key = {'campaign': 'campaign_id', 'asset': 'asset_id', 'date': 'date'}.get(group_by)
+        totals = cached_totals(
+            key, start.date(), end.date(),
+            known={'campaign_id': campaigns, 'asset_id': assets}
+        )
+        
+        # Derive the requested metrics
+        df = pd.DataFrame(index=totals.index)
         for metric in metrics:
             if metric == 'impressions':
-                select_clauses.append('COUNT(*) as impressions')
+                df['impressions'] = totals['plays']
             elif metric == 'completions':
-                select_clauses.append(
-                    'SUM(CASE WHEN completed = 1 THEN 1 ELSE 0 END) as completions'
-                )
+                df['completions'] = totals['completions']
             elif metric == 'completion_rate':
-                select_clauses.append(
-                    'AVG(CASE WHEN completed = 1 THEN 1 ELSE 0 END) * 100 as completion_rate'
-                )
+                df['completion_rate'] = totals['completions'] / totals['plays'] * 100
+        if key:
+            labels = {'campaign': campaigns, 'asset': assets}.get(group_by)
+            df.insert(0, group_by, df.index.map(labels) if labels else df.index)
+        df = df.reset_index(drop=True)
         
-        # Add grouping if specified
-        group_clause = ''
-        if group_by:
-            if group_by == 'campaign':
-                select_clauses.insert(0, 'c.name as campaign')
-                group_clause = 'GROUP BY c.id, c.name'
-            elif group_by == 'asset':
-                select_clauses.insert(0, 'm.title as asset')
-                group_clause = 'GROUP BY a.id, m.title'
-            elif group_by == 'date':
-                select_clauses.insert(0, 'DATE(l.timestamp) as date')
-                group_clause = 'GROUP BY date'
+        def render(path: str) -> None:
+            plt.figure(figsize=(12, 6))
+            if group_by == 'date':
+                sns.lineplot(data=df, x='date', y=metrics[0])
+            else:
+                sns.barplot(data=df, x=group_by if group_by else 'metric', y=metrics[0])
+            
+            plt.title(f'Custom Report: {metrics[0].title()}')
+            plt.xticks(rotation=45)
+            plt.tight_layout()
+            
+            plt.savefig(path)
+            plt.close()
         
-        # Build and execute query
-        query = f"""
-            SELECT {', '.join(select_clauses)}
-            FROM ad_logs l
-            JOIN ad_campaigns c ON l.campaign_id = c.id
-            JOIN ad_assets a ON l.asset_id = a.id
-            JOIN media m ON a.media_id = m.id
-            WHERE DATE(l.timestamp) BETWEEN DATE(?) AND DATE(?)
-            {group_clause}
-        """
-        
-        results = db.fetch_all(query, (start_date, end_date))
+        # The chart is keyed by the data it shows, so it is only drawn again
+        # when that changes
+        cached_path = report_cache.file(
+            'custom_report',
+            {'metrics': metrics, 'group_by': group_by, 'data': df.to_dict('records')},
+            start.date(), end.date(),
+            render
+        )
         
         # Generate report file
-        report_path = Path('reports') / 'custom' / f'report_{start_date}_{end_date}.pdf'
+        report_path = Path(settings.ads.report_path) / 'custom' / f'report_{start_date}_{end_date}.pdf'
         report_path.parent.mkdir(parents=True, exist_ok=True)
-        
-        # Create visualization
-        df = pd.DataFrame([dict(r) for r in results])
-        
-        plt.figure(figsize=(12, 6))
-        if group_by == 'date':
-            sns.lineplot(data=df, x='date', y=metrics[0])
-        else:
-            sns.barplot(data=df, x=group_by if group_by else 'metric', y=metrics[0])
-        
-        plt.title(f'Custom Report: {metrics[0].title()}')
-        plt.xticks(rotation=45)
-        plt.tight_layout()
-        
-        plt.savefig(report_path)
-        plt.close()
+        shutil.copyfile(cached_path, report_path)
         
         return str(report_path)
 
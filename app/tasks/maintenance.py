@@ -8,7 +8,10 @@ from typing import Dict, List, Tuple
 
 from ..core.config import get_settings
 from ..core.database import Database
+from ..core.files import hash_files
 from ..media.storage import MediaStorage
+from ..playlist.ordering import MIN_GAP, min_gap, rebalance_playlist
+from ..playlist.scheduler import AdScheduler
 
 # Initialize components
 settings = get_settings()
@@ -74,7 +77,11 @@ def cleanup_temp_files() -> Dict[str, int]:
 
 @shared_task(name='app.tasks.maintenance.verify_file_integrity')
 def verify_file_integrity() -> Dict[str, List[str]]:
-    """Verify integrity of all media files."""
+    """Verify integrity of all media files.
+    
+    Files are hashed in parallel (MEDIA_HASH_WORKERS at once) and compared
+    with their stored checksums.
+    """
     try:
         logger.info("Starting file integrity verification")
         results = {
@@ -83,22 +90,25 @@ def verify_file_integrity() -> Dict[str, List[str]]:
             'missing': []
         }
         
-        # Get all media files
-        media_files = db.fetch_all("SELECT * FROM media")
-        
-        for media in media_files:
-            file_path = media['file_path']
+        # Read the catalog here: the connection belongs to this thread, and
+        # hash_files consumes its items on another one
+        media_files = []
+        for media in db.fetch_all("SELECT file_path, checksum FROM media"):
+            path = os.path.join(storage.base_path, media['file_path'])
             
             # Check if file exists
-            if not os.path.exists(file_path):
-                results['missing'].append(file_path)
+            if not os.path.exists(path):
+                results['missing'].append(media['file_path'])
                 continue
-            
-            # Verify file integrity
-            if storage.verify_file_integrity(file_path):
-                results['verified'].append(file_path)
+            media_files.append({'path': path, 'file_path': media['file_path'], 'expected': media['checksum']})
+        
+        for item, error in hash_files(media_files, settings.media.hash_workers):
+            if error:
+                logger.error(f"Failed to verify {item['file_path']}: {str(error)}")
+            if not error and item['checksum'] == item['expected']:
+                results['verified'].append(item['file_path'])
             else:
-                results['failed'].append(file_path)
+                results['failed'].append(item['file_path'])
         
         logger.info(
             f"Verification complete: {len(results['verified'])} verified, "
@@ -268,6 +278,42 @@ def cleanup_logs() -> Dict[str, int]:
         logger.error(f"Error cleaning up logs: {str(e)}")
         raise
 
+@shared_task(name='app.tasks.maintenance.rebalance_playlist_orders')
+def rebalance_playlist_orders() -> Dict[int, int]:
+    """Renumber playlists whose ordering keys are running out of gaps."""
+    try:
+        logger.info("Checking playlist ordering gaps")
+        results = {}
+        conn = db.connection
+        
+        playlists = db.fetch_all("SELECT DISTINCT playlist_id FROM playlist_items")
+        for playlist in playlists:
+            playlist_id = playlist['playlist_id']
+            gap = min_gap(conn, playlist_id)
+            if gap is not None and gap < MIN_GAP:
+                results[playlist_id] = rebalance_playlist(conn, playlist_id)
+                conn.commit()
+        
+        logger.info(f"Rebalanced {len(results)} playlists")
+        return results
+
+    except Exception as e:
+        logger.error(f"Error rebalancing playlist orders: {str(e)}")
+        raise
+
+@shared_task(name='app.tasks.maintenance.reconcile_ad_counters')
+def reconcile_ad_counters() -> int:
+    """Bring the running ad play counters back in line with ad_logs."""
+    try:
+        logger.info("Reconciling ad play counters")
+        fixed = AdScheduler(db).reconcile_play_counters()
+        logger.info(f"Ad play counter reconciliation complete: {fixed} corrected")
+        return fixed
+
+    except Exception as e:
+        logger.error(f"Error reconciling ad counters: {str(e)}")
+        raise
+
 from ..core.optimization import DatabaseOptimizer
 from ..core.cache import health_check as cache_health_check
 
@@ -30,6 +30,36 @@ CREATE TABLE IF NOT EXISTS playlist_schedules (
     FOREIGN KEY (playlist_id) REFERENCES playlists (id)
 );
 
+-- Latest change to each schedule, so schedule timers in every process can
+-- pick up edits since their watermark (seq). Deleted schedules keep their
+-- row here as a tombstone.
+CREATE TABLE IF NOT EXISTS playlist_schedule_changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    schedule_id INTEGER NOT NULL UNIQUE,
+    changed_at DATETIME NOT NULL  -- Local time, like the schedules themselves
+);
+
+CREATE TRIGGER IF NOT EXISTS playlist_schedules_inserted
+AFTER INSERT ON playlist_schedules
+BEGIN
+    INSERT OR REPLACE INTO playlist_schedule_changes (schedule_id, changed_at)
+    VALUES (NEW.id, strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime'));
+END;
+
+CREATE TRIGGER IF NOT EXISTS playlist_schedules_updated
+AFTER UPDATE ON playlist_schedules
+BEGIN
+    INSERT OR REPLACE INTO playlist_schedule_changes (schedule_id, changed_at)
+    VALUES (NEW.id, strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime'));
+END;
+
+CREATE TRIGGER IF NOT EXISTS playlist_schedules_deleted
+AFTER DELETE ON playlist_schedules
+BEGIN
+    INSERT OR REPLACE INTO playlist_schedule_changes (schedule_id, changed_at)
+    VALUES (OLD.id, strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime'));
+END;
+
 CREATE TABLE IF NOT EXISTS playlist_history (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     playlist_id INTEGER NOT NULL,
@@ -46,6 +76,10 @@ CREATE TABLE IF NOT EXISTS playlist_items (
     FOREIGN KEY (media_id) REFERENCES media (id)
 );
 
+-- order_position keys are sparse (see app.playlist.ordering)
+CREATE INDEX IF NOT EXISTS idx_playlist_items_order
+ON playlist_items (playlist_id, order_position);
+
 CREATE TABLE IF NOT EXISTS subscribers (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     username TEXT NOT NULL UNIQUE,
@@ -119,6 +153,7 @@ CREATE TABLE IF NOT EXISTS ad_schedules (
 
 CREATE TABLE IF NOT EXISTS ad_logs (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
+    event_id TEXT,       -- Impression id, so a replayed spool is not double counted
     campaign_id INTEGER,
     asset_id INTEGER,
     playlist_id INTEGER,
@@ -130,6 +165,113 @@ CREATE TABLE IF NOT EXISTS ad_logs (
     FOREIGN KEY (playlist_id) REFERENCES playlists(id)
 );
 
+-- Running ad play counts, kept in step with ad_logs by log_ad_play so
+-- target share checks never have to count the log (seeded once by init_db)
+CREATE TABLE IF NOT EXISTS ad_play_counters (
+    playlist_id INTEGER NOT NULL,
+    campaign_id INTEGER NOT NULL,
+    plays INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (playlist_id, campaign_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_ad_logs_timestamp ON ad_logs (timestamp);
+
+-- Hourly ad_logs totals for analytics, folded in incrementally by
+-- AdAnalytics.update_rollups up to the ad_logs id in rollup_watermarks.
+-- Missing campaign, asset or playlist ids are stored as 0.
+CREATE TABLE IF NOT EXISTS ad_hourly_rollups (
+    campaign_id INTEGER NOT NULL,
+    asset_id INTEGER NOT NULL,
+    playlist_id INTEGER NOT NULL,
+    hour DATETIME NOT NULL,              -- Start of the hour, 'YYYY-MM-DD HH:00:00'
+    impressions INTEGER NOT NULL DEFAULT 0,
+    completions INTEGER NOT NULL DEFAULT 0,
+    total_duration INTEGER NOT NULL DEFAULT 0,
+    timed_impressions INTEGER NOT NULL DEFAULT 0,   -- Plays with a duration
+    completed_duration INTEGER NOT NULL DEFAULT 0,
+    timed_completions INTEGER NOT NULL DEFAULT 0,   -- Completed plays with a duration
+    PRIMARY KEY (campaign_id, asset_id, playlist_id, hour)
+);
+
+CREATE INDEX IF NOT EXISTS idx_ad_hourly_rollups_hour ON ad_hourly_rollups (hour);
+
+CREATE TABLE IF NOT EXISTS rollup_watermarks (
+    name TEXT PRIMARY KEY,
+    last_id INTEGER NOT NULL DEFAULT 0
+);
+
+INSERT OR IGNORE INTO rollup_watermarks (name, last_id)
+VALUES ('ad_hourly_rollups', 0);
+
+-- HyperLogLog sketch of the playlists each campaign reached in an hour,
+-- kept in step with ad_hourly_rollups. Merged for approximate reach.
+CREATE TABLE IF NOT EXISTS ad_reach_sketches (
+    campaign_id INTEGER NOT NULL,
+    hour DATETIME NOT NULL,              -- Start of the hour, 'YYYY-MM-DD HH:00:00'
+    sketch BLOB NOT NULL,                -- HyperLogLog.to_bytes()
+    PRIMARY KEY (campaign_id, hour)
+);
+
+-- All-time totals per campaign, folded in by AdAnalytics.update_campaign_stats
+CREATE TABLE IF NOT EXISTS ad_campaign_stats (
+    campaign_id INTEGER PRIMARY KEY,
+    impressions INTEGER NOT NULL DEFAULT 0,
+    completions INTEGER NOT NULL DEFAULT 0,
+    total_duration INTEGER NOT NULL DEFAULT 0,
+    completed_duration INTEGER NOT NULL DEFAULT 0,
+    timed_completions INTEGER NOT NULL DEFAULT 0,  -- Completed plays with a duration
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (campaign_id) REFERENCES ad_campaigns(id)
+);
+
+-- Playlists each campaign has played on, for all-time reach
+CREATE TABLE IF NOT EXISTS ad_campaign_reach (
+    campaign_id INTEGER NOT NULL,
+    playlist_id INTEGER NOT NULL,
+    PRIMARY KEY (campaign_id, playlist_id)
+);
+
+INSERT OR IGNORE INTO rollup_watermarks (name, last_id)
+VALUES ('ad_campaign_stats', 0);
+
+-- Days of ad_logs written to columnar files by app.ads.export
+CREATE TABLE IF NOT EXISTS ad_log_exports (
+    day DATE PRIMARY KEY,                -- 'YYYY-MM-DD', UTC
+    path TEXT NOT NULL,
+    rows INTEGER NOT NULL,
+    exported_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Stat of each media file as of its last hash, so scans only read new or
+-- changed files (see app.media.file_index)
+CREATE TABLE IF NOT EXISTS media_file_state (
+    path TEXT PRIMARY KEY,               -- Absolute path on disk, before cleaning
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    checksum TEXT NOT NULL,
+    scanned_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Media scans, and the media each one added (listed page by page instead
+-- of in the scan result)
+CREATE TABLE IF NOT EXISTS media_scans (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    finished_at DATETIME,               -- NULL while running or if the scan failed
+    files_found INTEGER DEFAULT 0,
+    duplicates INTEGER DEFAULT 0,
+    errors INTEGER DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS media_scan_files (
+    scan_id INTEGER NOT NULL,
+    media_id INTEGER NOT NULL,
+    PRIMARY KEY (scan_id, media_id),
+    FOREIGN KEY (scan_id) REFERENCES media_scans(id),
+    FOREIGN KEY (media_id) REFERENCES media(id)
+);
+
 -- Legacy ads table (will be dropped after migration)
 CREATE TABLE IF NOT EXISTS ads (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
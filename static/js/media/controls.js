@@ -4,7 +4,6 @@ export class MediaControls {
     constructor(player, state) {
         this.player = player;
         this.state = state;
-        this.playbackMonitor = null;
 
         // Cache DOM elements
         this.elements = {
@@ -111,25 +110,4 @@ export class MediaControls {
             this.elements.nextUpSong.textContent = 'End of playlist';
         }
     }
-
-    startContinuousPlayback(callback) {
-        console.log('Starting continuous playback monitoring...');
-        if (this.playbackMonitor) {
-            clearInterval(this.playbackMonitor);
-        }
-        
-        this.playbackMonitor = setInterval(() => {
-            const isVideo = this.state.getMediaType() === 'video';
-            if (!this.player.isPaused(isVideo) && !this.state.isMediaTransitioning()) {
-                callback();
-            }
-        }, 10000);
-    }
-
-    stopContinuousPlayback() {
-        if (this.playbackMonitor) {
-            clearInterval(this.playbackMonitor);
-            this.playbackMonitor = null;
-        }
-    }
 }
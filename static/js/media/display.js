@@ -12,6 +12,7 @@ export class MediaDisplay {
         this.controls = new MediaControls(this.player, this.state);
         this.isTransitioning = false;
         this.currentTrack = null;
+        this.prefetchedUrls = new Set();
 
         this.initializeEventListeners();
         this.initialize();
@@ -128,11 +129,14 @@ export class MediaDisplay {
                 console.error('Invalid track data:', track);
                 this.controls.updateTrackInfo('No media available', 'Please check playlist');
                 this.controls.updateNextTrack('End of playlist', '');
+                // Pick the playlist up once something starts it
+                this.state.subscribe((event) => this.handlePlaybackEvent(event));
                 return;
             }
             
             console.log('Initial track loaded:', track);
             await this.loadAndPlay(track);
+            this.state.subscribe((event) => this.handlePlaybackEvent(event));
         } catch (error) {
             console.error('Error during initialization:', error);
             // Wait longer before retrying
@@ -195,6 +199,7 @@ export class MediaDisplay {
             if (nextTrack) {
                 this.controls.updateNextTrack(nextTrack.title, nextTrack.artist);
             }
+            this.prefetchUpcoming();
             
         } catch (error) {
             console.error('Error in loadAndPlay:', error);
@@ -225,6 +230,57 @@ export class MediaDisplay {
         }
     }
 
+    async handlePlaybackEvent(event) {
+        if (event.type === 'state_changed') {
+            this.state.isRepeat = event.state.repeat;
+            this.state.isShuffle = event.state.shuffle;
+            const nextTrack = await this.state.fetchNextTrack();
+            this.controls.updateNextTrack(nextTrack?.title, nextTrack?.artist);
+            this.prefetchUpcoming();
+            return;
+        }
+
+        if (event.type !== 'track_changed' && event.type !== 'ad_break') {
+            return;
+        }
+
+        try {
+            const track = this.state.formatTrackData(event.media);
+            // Skip the echo of a transition this display made itself
+            if (this.isTransitioning || this.currentTrack?.source === track.source) {
+                return;
+            }
+            console.log('Playback changed on the server:', event);
+            await this.visualizer.cleanup();
+            await this.loadAndPlay(track);
+        } catch (error) {
+            console.error('Error applying playback event:', error);
+        }
+    }
+
+    async prefetchUpcoming() {
+        const data = await this.state.fetchLookahead();
+        if (!data) return;
+
+        // Let the browser fetch upcoming files while the current one plays,
+        // from the same URLs loadAndPlay will request
+        for (const item of data.items) {
+            if (!item.file_path) continue;
+            let source;
+            try {
+                source = this.state.formatTrackData(item).source;
+            } catch (error) {
+                continue;
+            }
+            if (this.prefetchedUrls.has(source)) continue;
+            const link = document.createElement('link');
+            link.rel = 'prefetch';
+            link.href = source;
+            document.head.appendChild(link);
+            this.prefetchedUrls.add(source);
+        }
+    }
+
     async updateAndPlay() {
         const track = await this.state.fetchCurrentTrack();
         if (track) {
@@ -6,6 +6,37 @@ export class MediaState {
         this.isShuffle = false;
         this.currentMediaType = null;
         this.isTransitioning = false;
+        this.eventSocket = null;
+        this.eventSource = null;
+        this.lookaheadVersion = null;
+    }
+
+    subscribe(onEvent) {
+        // The server pushes track changes, so there is no need to poll /now-playing
+        if (this.eventSocket || this.eventSource) {
+            return;
+        }
+        const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
+        const socket = new WebSocket(`${protocol}//${window.location.host}/ws/playlist`);
+        let opened = false;
+        this.eventSocket = socket;
+
+        socket.onopen = () => {
+            opened = true;
+        };
+        socket.onmessage = (event) => onEvent(JSON.parse(event.data));
+        socket.onclose = () => {
+            this.eventSocket = null;
+            if (opened) {
+                setTimeout(() => this.subscribe(onEvent), 2000);
+            } else {
+                // WebSockets are unavailable here (e.g. some OBS setups); use SSE instead
+                console.log('Falling back to server-sent events...');
+                // EventSource reconnects on its own
+                this.eventSource = new EventSource('/events/playlist');
+                this.eventSource.onmessage = (event) => onEvent(JSON.parse(event.data));
+            }
+        };
     }
 
     async fetchCurrentTrack() {
@@ -61,6 +92,25 @@ export class MediaState {
         }
     }
 
+    async fetchLookahead(count = 3) {
+        // Resolves to null when the queue is unchanged since the last call
+        try {
+            const response = await fetch(`/api/lookahead?count=${count}`);
+            if (!response.ok) {
+                return null;
+            }
+            const data = await response.json();
+            if (data.version === this.lookaheadVersion) {
+                return null;
+            }
+            this.lookaheadVersion = data.version;
+            return data;
+        } catch (error) {
+            console.error('Error fetching lookahead:', error);
+            return null;
+        }
+    }
+
     async startPlayback(playlistId = null) {
         try {
             if (playlistId) {
@@ -7,7 +7,10 @@ class Player {
         this.isRepeat = true;
         this.isShuffle = false;
         this.isTransitioning = false;
-        this.playbackMonitor = null;
+        this.eventSocket = null;
+        this.eventSource = null;
+        this.lookaheadVersion = null;
+        this.prefetchedUrls = new Set();
         this.visualizer = null;
 
         this.audio.preload = 'auto';
@@ -173,15 +176,70 @@ class Player {
 
     startContinuousPlayback() {
         console.log('Starting continuous playback monitoring...');
-        if (this.playbackMonitor) {
-            clearInterval(this.playbackMonitor);
+        // The server pushes track changes, so there is no need to poll /now-playing
+        if (this.eventSocket || this.eventSource) {
+            return;
         }
+        this.subscribeToPlaybackEvents();
+    }
 
-        this.playbackMonitor = setInterval(() => {
-            if (!this.audio.paused && !this.isTransitioning) {
-                this.updateNowPlaying();
+    subscribeToPlaybackEvents() {
+        const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
+        const socket = new WebSocket(`${protocol}//${window.location.host}/ws/playlist`);
+        let opened = false;
+        this.eventSocket = socket;
+
+        socket.onopen = () => {
+            opened = true;
+        };
+        socket.onmessage = (event) => this.handlePlaybackEvent(JSON.parse(event.data));
+        socket.onclose = () => {
+            this.eventSocket = null;
+            if (opened) {
+                setTimeout(() => this.subscribeToPlaybackEvents(), 2000);
+            } else {
+                // WebSockets are unavailable here (e.g. some OBS setups); use SSE instead
+                this.subscribeWithEventSource();
             }
-        }, 10000);
+        };
+    }
+
+    subscribeWithEventSource() {
+        console.log('Falling back to server-sent events...');
+        // EventSource reconnects on its own
+        this.eventSource = new EventSource('/events/playlist');
+        this.eventSource.onmessage = (event) => this.handlePlaybackEvent(JSON.parse(event.data));
+    }
+
+    async handlePlaybackEvent(event) {
+        if (event.type === 'state_changed') {
+            this.isRepeat = event.state.repeat;
+            this.isShuffle = event.state.shuffle;
+            this.updateNextTrack();
+            return;
+        }
+
+        if (event.type !== 'track_changed' && event.type !== 'ad_break') {
+            return;
+        }
+
+        // Skip the echo of a transition this player made itself
+        const newSrc = `/media/${encodeURIComponent(event.media.file_path.split('/').pop())}`;
+        if (this.isTransitioning || this.audio.src === window.location.origin + newSrc) {
+            return;
+        }
+
+        try {
+            console.log('Playback changed on the server:', event);
+            ui.updateSongTitle(event.media.artist, event.media.title);
+            this.audio.src = newSrc;
+            await this.audio.load();
+            await this.initializeVisualizer();
+            await this.play();
+            this.updateNextTrack();
+        } catch (error) {
+            console.error('Error applying playback event:', error);
+        }
     }
 
     async updateNextTrack() {
@@ -197,6 +255,32 @@ class Player {
             console.error('Error fetching next track:', error);
             ui.updateNextTrack(null, null);
         }
+        this.prefetchUpcoming();
+    }
+
+    async prefetchUpcoming() {
+        try {
+            const response = await fetch('/api/lookahead?count=3');
+            if (!response.ok) return;
+            const data = await response.json();
+            if (data.version === this.lookaheadVersion) return;
+            this.lookaheadVersion = data.version;
+
+            // Let the browser fetch upcoming files while the current one plays,
+            // from the same URLs updateNowPlaying will request
+            for (const item of data.items) {
+                if (!item.file_path) continue;
+                const src = `/media/${encodeURIComponent(item.file_path.split('/').pop())}`;
+                if (this.prefetchedUrls.has(src)) continue;
+                const link = document.createElement('link');
+                link.rel = 'prefetch';
+                link.href = src;
+                document.head.appendChild(link);
+                this.prefetchedUrls.add(src);
+            }
+        } catch (error) {
+            console.error('Error prefetching upcoming media:', error);
+        }
     }
 
     async updateNowPlaying() {
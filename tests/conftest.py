@@ -0,0 +1,40 @@
+"""Shared test fixtures."""
+import os
+import sqlite3
+import pytest
+from app.core.database import Database
+
+SCHEMA_PATH = os.path.join(os.path.dirname(__file__), '..', 'schema.sql')
+
+def load_schema(conn):
+    """Create the application tables on a sqlite3 connection."""
+    with open(SCHEMA_PATH) as f:
+        conn.executescript(f.read())
+
+@pytest.fixture
+def schema_db():
+    """Create an in-memory Database with the application schema."""
+    db = Database(':memory:')
+    load_schema(db.connection)
+    yield db
+    db.close()
+
+@pytest.fixture
+def schema_conn():
+    """Create an in-memory sqlite3 connection with the application schema."""
+    conn = sqlite3.connect(':memory:')
+    load_schema(conn)
+    yield conn
+    conn.close()
+
+@pytest.fixture
+def schema_file(tmp_path):
+    """Create a database file with the application schema and return its path.
+
+    The schema seeds campaign 1 (legacy ads).
+    """
+    path = str(tmp_path / 'database.db')
+    conn = sqlite3.connect(path)
+    load_schema(conn)
+    conn.close()
+    return path
@@ -0,0 +1,185 @@
+"""Unit tests for ad analytics over hourly rollups."""
+from datetime import datetime
+import pytest
+from app.ads.analytics import AdAnalytics
+
+# (asset, playlist, timestamp, duration, completed)
+LOGS = [
+    (1, 1, '2024-01-01 10:05:00', 30, 1),
+    (1, 1, '2024-01-01 10:40:00', 12, 0),
+    (2, 2, '2024-01-01 11:10:00', 30, 1),
+    (2, 1, '2024-01-01 11:50:00', None, 1),
+    (1, 2, '2024-01-01 12:20:00', 30, 1),
+]
+
+@pytest.fixture
+def analytics(schema_db):
+    """Create analytics over a campaign with two assets on two playlists."""
+    db = schema_db
+    db.execute("INSERT INTO ad_campaigns (id, name) VALUES (5, 'Spring')")
+    for playlist_id in (1, 2):
+        db.execute("INSERT INTO playlists (id, name) VALUES (?, ?)", (playlist_id, f'P{playlist_id}'))
+    for asset_id in (1, 2):
+        db.execute(
+            "INSERT INTO media (id, file_path, type, title, artist) VALUES (?, ?, 'audio', ?, 'Sponsor')",
+            (100 + asset_id, f'/ads/{asset_id}.mp3', f'Spot {asset_id}')
+        )
+        db.execute(
+            "INSERT INTO ad_assets (id, campaign_id, media_id, type) VALUES (?, 5, ?, 'audio')",
+            (asset_id, 100 + asset_id)
+        )
+    db.commit()
+    yield AdAnalytics(db)
+
+def add_logs(analytics, logs):
+    """Write ad logs for campaign 5."""
+    analytics.db.connection.executemany(
+        """
+        INSERT INTO ad_logs (campaign_id, asset_id, playlist_id, timestamp, duration, completed)
+        VALUES (5, ?, ?, ?, ?, ?)
+        """,
+        logs
+    )
+    analytics.db.commit()
+
+def test_metrics_match_before_and_after_rollup(analytics):
+    """Test results are the same from raw logs, rollups or a mix of both."""
+    add_logs(analytics, LOGS[:3])
+    raw = analytics.get_campaign_metrics(5)
+    assert raw['impressions'] == 3
+    assert raw['completions'] == 2
+    assert raw['total_duration'] == 72
+    assert raw['reach'] == 2
+    assert raw['avg_view_time'] == 30
+
+    assert analytics.update_rollups() == 3
+    assert analytics.update_rollups() == 0
+    assert analytics.get_campaign_metrics(5) == raw
+
+    # New logs are read raw until the next rollup
+    add_logs(analytics, LOGS[3:])
+    mixed = analytics.get_campaign_metrics(5)
+    assert mixed['impressions'] == 5
+    assert mixed['avg_view_time'] == 30
+    analytics.update_rollups()
+    assert analytics.get_campaign_metrics(5) == mixed
+
+def test_breakdowns_from_rollups(analytics):
+    """Test asset, playlist and time breakdowns read rolled up hours."""
+    add_logs(analytics, LOGS)
+    analytics.update_rollups()
+    # Rolled up hours no longer depend on the raw log
+    analytics.db.execute('DELETE FROM ad_logs')
+    analytics.db.commit()
+
+    assets = {asset['id']: asset for asset in analytics.get_asset_performance(5)}
+    assert assets[1]['impressions'] == 3
+    assert assets[1]['reach'] == 2
+    assert assets[2]['completion_rate'] == 100
+
+    playlists = {row['playlist_id']: row for row in analytics.get_playlist_performance(5)}
+    assert playlists[1]['impressions'] == 3
+    assert playlists[1]['playlist_name'] == 'P1'
+
+    hours = analytics.get_time_distribution(5, 'hour')
+    assert [(row['period'], row['impressions']) for row in hours] == [
+        ('10', 2), ('11', 2), ('12', 1)
+    ]
+    assert analytics.get_comparative_metrics([5], 'avg_duration') == {5: 25.5}
+
+def test_date_range_uses_raw_logs_for_partial_hours(analytics):
+    """Test ranges that start or end mid-hour count only logs inside them."""
+    add_logs(analytics, LOGS)
+    analytics.update_rollups()
+
+    start = datetime(2024, 1, 1, 10, 30)
+    end = datetime(2024, 1, 1, 12, 0)
+    assert analytics.get_campaign_metrics(5, start, end)['impressions'] == 3
+    assert analytics.get_campaign_metrics(5, start)['impressions'] == 4
+    assert analytics.get_campaign_metrics(5, end_date=end)['impressions'] == 4
+
+    # Both ends inside two neighbouring hours
+    inside = analytics.get_campaign_metrics(
+        5, datetime(2024, 1, 1, 10, 30), datetime(2024, 1, 1, 11, 20)
+    )
+    assert inside['impressions'] == 2
+
+def test_report_matches_individual_metrics(analytics):
+    """Test the single-pass report agrees with each metric method."""
+    add_logs(analytics, LOGS)
+    analytics.update_rollups()
+    add_logs(analytics, [(2, 2, '2024-01-02 09:15:00', 30, 0)])
+
+    for start, end in [(None, None), (datetime(2024, 1, 1, 10, 30), datetime(2024, 1, 2, 12, 0))]:
+        report = analytics.generate_report(5, start, end)
+        assert report['overview'] == analytics.get_campaign_metrics(5, start, end)
+        assert report['assets'] == analytics.get_asset_performance(5, start, end)
+        assert report['hourly_distribution'] == analytics.get_time_distribution(5, 'hour', start, end)
+        assert report['daily_distribution'] == analytics.get_time_distribution(5, 'day', start, end)
+        assert report['playlist_performance'] == analytics.get_playlist_performance(5, start, end)
+
+def test_campaign_stats_are_incremental(analytics):
+    """Test stats fold in only new logs and skip idle campaigns."""
+    add_logs(analytics, LOGS[:3])
+    stats = analytics.update_campaign_stats()
+    assert list(stats) == [5]
+    assert stats[5]['impressions'] == 3
+    assert stats[5]['reach'] == 2
+    assert analytics.update_campaign_stats() == {}
+
+    add_logs(analytics, LOGS[3:])
+    stats = analytics.update_campaign_stats()[5]
+    overall = analytics.get_campaign_metrics(5)
+    for key in ('impressions', 'completions', 'completion_rate', 'total_duration', 'avg_view_time', 'reach'):
+        assert stats[key] == overall[key]
+
+def test_reach_from_sketches(analytics):
+    """Test approximate reach merges hourly sketches with unrolled logs."""
+    add_logs(analytics, LOGS)
+    analytics.update_rollups()
+    analytics.db.execute('DELETE FROM ad_hourly_rollups')
+    analytics.db.commit()
+    # Only the sketches remain for rolled up hours
+    assert analytics.get_reach([5], exact=False) == 2
+    assert analytics.get_reach([5], exact=True) == 0
+
+    add_logs(analytics, [(1, 3, '2024-01-03 09:15:00', 30, 1)])
+    assert analytics.get_reach([5]) == 3
+    start = datetime(2024, 1, 1, 10, 30)
+    assert analytics.get_reach([5], start, datetime(2024, 1, 1, 12, 0), exact=False) == 2
+    assert analytics.get_reach([5], datetime(2024, 1, 1, 11, 0), datetime(2024, 1, 1, 12, 0), exact=False) == 2
+    assert analytics.get_reach([5], start, datetime(2024, 1, 1, 10, 50), exact=False) == 1
+
+def test_campaign_summaries_in_one_batch(analytics):
+    """Test batched summaries agree with per-campaign metrics and asset counts."""
+    add_logs(analytics, LOGS)
+    analytics.update_rollups()
+    add_logs(analytics, [(2, 2, '2024-01-02 09:15:00', 30, 0)])
+
+    summaries = analytics.get_campaign_summaries([5, 1])
+    assert summaries[1]['impressions'] == 0
+    assert summaries[5]['asset_count'] == 2
+    metrics = analytics.get_campaign_metrics(5)
+    for key in ('impressions', 'completions', 'completion_rate', 'total_duration', 'avg_view_time'):
+        assert summaries[5][key] == metrics[key]
+
+    day = analytics.get_campaign_summaries(start_date=datetime(2024, 1, 2))
+    assert day[5]['impressions'] == 1
+    assert day[5]['asset_count'] == 2
+
+def test_hourly_distribution_is_downsampled(analytics):
+    """Test long hourly series are cut to the requested points."""
+    add_logs(analytics, [
+        (1, 1, f'2024-01-{1 + hour // 24:02d} {hour % 24:02d}:10:00', 30, 1)
+        for hour in range(96) for _ in range(10 if hour == 50 else 1)
+    ])
+    analytics.update_rollups()
+
+    hourly = analytics.get_time_distribution(5, 'hourly')
+    assert len(hourly) == 96
+    assert hourly[0]['period'] == '2024-01-01 00:00:00'
+
+    points = analytics.get_time_distribution(5, 'hourly', points=12)
+    assert len(points) == 12
+    assert points[0] == hourly[0] and points[-1] == hourly[-1]
+    assert hourly[50] in points
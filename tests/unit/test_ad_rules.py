@@ -0,0 +1,71 @@
+"""Unit tests for compiled ad scheduling rules."""
+from datetime import datetime
+from app.playlist.ad_rules import AdRule, AdRuleCache, compile_rules, day_mask
+
+# 2024-01-01 was a Monday (isoweekday 1)
+MONDAY_NOON = datetime(2024, 1, 1, 12, 0)
+
+def make_row(**overrides):
+    """Build an ad_schedules row joined with its campaign."""
+    row = {
+        'id': 1,
+        'campaign_id': 1,
+        'priority': 1,
+        'frequency': 3,
+        'start_time': None,
+        'end_time': None,
+        'days_of_week': None,
+        'target_percentage': None,
+        'start_date': None,
+        'end_date': None
+    }
+    row.update(overrides)
+    return row
+
+def test_day_mask():
+    """Test weekday bitmasks use 1 = Monday ... 7 = Sunday."""
+    assert day_mask(None) == 0
+    assert day_mask('1,5') == (1 << 1) | (1 << 5)
+
+def test_rules_sorted_by_priority():
+    """Test compiled rules are evaluated highest priority first."""
+    rules = compile_rules([make_row(id=1, priority=1), make_row(id=2, priority=5)])
+    assert [rule.schedule_id for rule in rules] == [2, 1]
+
+def test_rule_time_window_and_days():
+    """Test time-of-day, overnight and weekday restrictions."""
+    daytime = AdRule.from_row(make_row(start_time='09:00:00', end_time='17:00:00'))
+    assert daytime.matches(3, MONDAY_NOON, MONDAY_NOON)
+    assert not daytime.matches(3, MONDAY_NOON.replace(hour=20), MONDAY_NOON)
+
+    overnight = AdRule.from_row(make_row(start_time='22:00:00', end_time='02:00:00'))
+    assert overnight.matches(3, MONDAY_NOON.replace(hour=23), MONDAY_NOON)
+    assert not overnight.matches(3, MONDAY_NOON, MONDAY_NOON)
+
+    weekend = AdRule.from_row(make_row(days_of_week='6,7'))
+    assert not weekend.matches(3, MONDAY_NOON, MONDAY_NOON)
+    assert weekend.matches(3, datetime(2024, 1, 7, 12, 0), MONDAY_NOON)
+
+def test_rule_frequency_and_campaign_dates():
+    """Test the ad interval and campaign date range."""
+    rule = AdRule.from_row(make_row(
+        start_date='2024-01-01 00:00:00',
+        end_date='2024-01-31 23:59:59'
+    ))
+    assert not rule.matches(2, MONDAY_NOON, MONDAY_NOON)
+    assert rule.matches(3, MONDAY_NOON, MONDAY_NOON)
+    assert not rule.matches(3, MONDAY_NOON, datetime(2024, 2, 1))
+
+def test_cache_invalidation():
+    """Test rules stay cached until invalidated or too old."""
+    cache = AdRuleCache()
+    cache.put(1, ())
+    cache.put(2, ())
+    assert cache.get(1) == ()
+    cache.invalidate(1)
+    assert cache.get(1) is None
+    assert cache.get(2) == ()
+    cache.invalidate()
+    assert cache.get(2) is None
+
+    assert AdRuleCache(max_age=-1).get(1) is None
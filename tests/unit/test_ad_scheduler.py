@@ -0,0 +1,73 @@
+"""Unit tests for AdScheduler decisions and play counters."""
+import pytest
+from app.playlist.ad_rules import ad_rule_cache
+from app.playlist.scheduler import AdScheduler
+
+@pytest.fixture
+def scheduler(schema_db):
+    """Create an AdScheduler on an in-memory database with one campaign."""
+    db = schema_db
+    campaign_id = db.insert('ad_campaigns', {'name': 'Test', 'status': 'active'})
+    db.insert('ad_schedules', {
+        'campaign_id': campaign_id,
+        'playlist_id': 1,
+        'frequency': 3,
+        'priority': 1
+    })
+    ad_rule_cache.invalidate()
+    scheduler = AdScheduler(db)
+    scheduler.campaign_id = campaign_id
+    yield scheduler
+    ad_rule_cache.invalidate()
+
+def counter(scheduler, playlist_id, campaign_id):
+    """Read one play counter."""
+    row = scheduler.db.fetch_one(
+        'SELECT plays FROM ad_play_counters WHERE playlist_id = ? AND campaign_id = ?',
+        (playlist_id, campaign_id)
+    )
+    return row['plays'] if row else 0
+
+def test_should_play_ad_uses_compiled_rules(scheduler):
+    """Test decisions come from the cache until the schedule is edited."""
+    assert scheduler.should_play_ad(1, current_position=3, last_ad_position=0)
+    assert not scheduler.should_play_ad(1, current_position=2, last_ad_position=0)
+    assert ad_rule_cache.get(1) is not None
+
+    # Direct writes are not seen until the rules are invalidated
+    scheduler.db.execute('UPDATE ad_schedules SET frequency = 10')
+    assert scheduler.should_play_ad(1, current_position=3, last_ad_position=0)
+
+    schedule_id = scheduler.db.fetch_one('SELECT id FROM ad_schedules')['id']
+    assert scheduler.update_schedule(schedule_id, frequency=10)
+    assert not scheduler.should_play_ad(1, current_position=3, last_ad_position=0)
+
+def test_log_ad_play_updates_counters(scheduler):
+    """Test that logging a play keeps the share counters current."""
+    other_campaign = scheduler.db.insert('ad_campaigns', {'name': 'Other', 'status': 'active'})
+    for _ in range(3):
+        scheduler.log_ad_play(1, scheduler.campaign_id, 1, 30)
+    scheduler.log_ad_play(1, other_campaign, 2, 30)
+
+    assert counter(scheduler, 1, scheduler.campaign_id) == 3
+    assert counter(scheduler, 1, other_campaign) == 1
+    assert scheduler._get_campaign_percentage(scheduler.campaign_id, 1) == 75.0
+    assert scheduler._get_campaign_percentage(other_campaign, 1) == 25.0
+    assert scheduler._get_campaign_percentage(scheduler.campaign_id, 2) == 0.0
+
+def test_reconcile_play_counters(scheduler):
+    """Test that counters are rebuilt from ad_logs when they drift."""
+    scheduler.log_ad_play(1, scheduler.campaign_id, 1, 30)
+    assert scheduler.reconcile_play_counters() == 0
+
+    # Writes that bypass log_ad_play, and a stray counter
+    scheduler.db.execute(
+        'INSERT INTO ad_logs (campaign_id, asset_id, playlist_id, duration, completed) VALUES (?, 1, 1, 30, 1)',
+        (scheduler.campaign_id,)
+    )
+    scheduler.db.execute('INSERT INTO ad_play_counters VALUES (5, 5, 9)')
+    scheduler.db.commit()
+
+    assert scheduler.reconcile_play_counters() == 2
+    assert counter(scheduler, 1, scheduler.campaign_id) == 2
+    assert counter(scheduler, 5, 5) == 0
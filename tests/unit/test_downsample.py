@@ -0,0 +1,20 @@
+"""Unit tests for chart downsampling."""
+from app.ads.downsample import downsample, lttb
+
+def test_lttb_keeps_ends_and_peaks():
+    """Test LTTB keeps the first and last points and a lone spike."""
+    y = [1.0] * 1000
+    y[437] = 50.0
+    y[800] = -20.0
+    picked = lttb(y, 20)
+    assert len(picked) == 20
+    assert picked[0] == 0 and picked[-1] == 999
+    assert picked == sorted(set(picked))
+    assert 437 in picked and 800 in picked
+
+def test_short_series_are_unchanged():
+    """Test series within the point count come back whole."""
+    rows = [{'period': str(i), 'impressions': i} for i in range(10)]
+    assert downsample(rows, 10) == rows
+    assert downsample(rows, 2) == rows
+    assert [row['period'] for row in downsample(rows, 5)][::4] == ['0', '9']
@@ -0,0 +1,64 @@
+"""Unit tests for pushed playback events."""
+import json
+import queue
+import pytest
+from app.api import websocket
+
+@pytest.fixture(autouse=True)
+def clean_channel():
+    """Reset playlist subscribers and retained events around each test."""
+    websocket.sse_subscribers['playlist'].clear()
+    websocket.retained_events['playlist'].clear()
+    yield
+    websocket.sse_subscribers['playlist'].clear()
+    websocket.retained_events['playlist'].clear()
+
+class FakeSocket:
+    """WebSocket stand-in that records sent messages."""
+
+    def __init__(self, fail=False):
+        self.sent = []
+        self.fail = fail
+
+    def send(self, message):
+        if self.fail:
+            raise ConnectionError('closed')
+        self.sent.append(json.loads(message))
+
+def test_events_reach_websocket_and_sse_subscribers():
+    """Test that one broadcast reaches both transports."""
+    ws = FakeSocket()
+    subscriber = queue.Queue()
+    websocket.active_connections['playlist'].add(ws)
+    websocket.sse_subscribers['playlist'].add(subscriber)
+    try:
+        websocket.notify_track_changed({'id': 1, 'title': 'Song'}, {'position': 0})
+    finally:
+        websocket.active_connections['playlist'].discard(ws)
+
+    assert ws.sent[0]['type'] == 'track_changed'
+    assert ws.sent[0]['media']['id'] == 1
+    assert json.loads(subscriber.get_nowait())['type'] == 'track_changed'
+
+def test_latest_now_playing_is_retained():
+    """Test that new subscribers can be sent the current snapshot."""
+    websocket.notify_track_changed({'id': 1}, {})
+    websocket.notify_ad_break({'id': 9}, {})
+    websocket.notify_playback_state({'repeat': False})
+
+    retained = websocket.retained_events['playlist']
+    assert json.loads(retained['now_playing'])['type'] == 'ad_break'
+    assert json.loads(retained['state'])['state'] == {'repeat': False}
+
+def test_slow_and_dead_subscribers_are_dropped():
+    """Test that a full SSE queue or a closed socket is unsubscribed."""
+    dead = FakeSocket(fail=True)
+    slow = queue.Queue(maxsize=1)
+    websocket.active_connections['playlist'].add(dead)
+    websocket.sse_subscribers['playlist'].add(slow)
+
+    websocket.notify_playback_state({'shuffle': True})
+    websocket.notify_playback_state({'shuffle': False})
+
+    assert dead not in websocket.active_connections['playlist']
+    assert slow not in websocket.sse_subscribers['playlist']
@@ -0,0 +1,42 @@
+"""Unit tests for HyperLogLog sketches."""
+import pytest
+from app.ads.hll import HyperLogLog
+
+def test_estimate_is_close():
+    """Test small counts are exact and large counts within a few percent."""
+    assert HyperLogLog().count() == 0
+    assert HyperLogLog.of([1, 2, 3, 2, 1]).count() == 3
+    estimate = HyperLogLog.of(range(50000)).count()
+    assert abs(estimate - 50000) / 50000 < 0.05
+
+def test_merge_counts_the_union():
+    """Test merged sketches count overlapping values once."""
+    first = HyperLogLog.of(range(0, 6000))
+    second = HyperLogLog.of(range(4000, 10000))
+    first.merge(second)
+    assert first.registers == HyperLogLog.of(range(10000)).registers
+
+    with pytest.raises(ValueError):
+        first.merge(HyperLogLog(precision=10))
+
+def test_round_trip():
+    """Test sketches survive serialization and stay small when sparse."""
+    sketch = HyperLogLog.of(['a', 'b', 'c'])
+    data = sketch.to_bytes()
+    assert len(data) < 100
+    assert HyperLogLog.from_bytes(data).registers == sketch.registers
+
+def test_merge_bytes_matches_merge():
+    """Test folding serialized sketches gives the same registers as merging them."""
+    parts = [HyperLogLog.of(range(start, start + 3000)) for start in range(0, 12000, 2000)]
+    merged = HyperLogLog()
+    for part in parts:
+        merged.merge(part)
+
+    folded = HyperLogLog()
+    folded.merge_bytes(part.to_bytes() for part in parts)
+    assert folded.registers == merged.registers
+    assert folded.count() == merged.count()
+
+    with pytest.raises(ValueError):
+        folded.merge_bytes([HyperLogLog(precision=10).to_bytes()])
@@ -0,0 +1,146 @@
+"""Unit tests for buffered ad impression logging."""
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+from datetime import datetime, timedelta
+from unittest.mock import patch
+import pytest
+from app.ads.impressions import ImpressionQueue, make_impression, write_impressions
+from app.api import playlist as playlist_module
+from app.core.database import Database
+from app.playlist.scheduler import AdScheduler
+
+@pytest.fixture
+def db_path(schema_file):
+    """Create a database file with one playlist that is due an ad.
+
+    The schema seeds campaign 1 (legacy ads).
+    """
+    path = schema_file
+    conn = sqlite3.connect(path)
+    conn.execute("INSERT INTO playlists (id, name) VALUES (1, 'Main')")
+    conn.execute(
+        "INSERT INTO playlist_state (playlist_id, current_position, last_ad_position) VALUES (1, 7, 0)"
+    )
+    conn.commit()
+    conn.close()
+    return path
+
+def read(db_path, sql):
+    """Run a query against the database file."""
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute(sql).fetchall()
+    finally:
+        conn.close()
+
+def test_write_impressions_updates_counters_and_position(db_path):
+    """Test one batch writes logs, counters and last_ad_position together."""
+    conn = sqlite3.connect(db_path)
+    events = [make_impression(1, 1, 1, 30) for _ in range(3)]
+    assert write_impressions(conn, events) == 3
+    conn.commit()
+    # Replaying the same events is a no-op
+    assert write_impressions(conn, events) == 0
+    conn.commit()
+    conn.close()
+
+    assert read(db_path, 'SELECT COUNT(*) FROM ad_logs') == [(3,)]
+    assert read(db_path, 'SELECT plays FROM ad_play_counters') == [(3,)]
+    assert read(db_path, 'SELECT last_ad_position FROM playlist_state') == [(7,)]
+
+def test_write_impressions_moves_position_to_where_ads_aired(db_path):
+    """Test last_ad_position comes from the events, not the position at flush."""
+    conn = sqlite3.connect(db_path)
+    events = [make_impression(1, 1, 1, 30, position=position) for position in (3, 5, 4)]
+    write_impressions(conn, events)
+    conn.commit()
+    assert read(db_path, 'SELECT last_ad_position FROM playlist_state') == [(5,)]
+
+    # A batch flushed late never moves it back
+    write_impressions(conn, [make_impression(1, 1, 1, 30, position=2)])
+    conn.commit()
+    conn.close()
+    assert read(db_path, 'SELECT last_ad_position FROM playlist_state') == [(5,)]
+
+def test_queue_buffers_until_flush(db_path, tmp_path):
+    """Test recorded impressions are spooled and written on flush."""
+    spool = str(tmp_path / 'impressions.spool')
+    queue = ImpressionQueue(db_path, spool, batch_size=10)
+    for _ in range(4):
+        queue.record(1, 1, 1, 30)
+
+    assert len(queue) == 4
+    assert read(db_path, 'SELECT COUNT(*) FROM ad_logs') == [(0,)]
+    assert queue.flush() == 4
+    assert len(queue) == 0
+    assert read(db_path, 'SELECT plays FROM ad_play_counters') == [(4,)]
+    assert not [name for name in os.listdir(tmp_path) if name.startswith('impressions.spool')]
+    queue.stop()
+
+def test_queue_flushes_on_batch_size(db_path, tmp_path):
+    """Test the writer thread flushes as soon as a batch is full."""
+    queue = ImpressionQueue(db_path, str(tmp_path / 'impressions.spool'),
+                            batch_size=2, flush_interval=60)
+    queue.start()
+    queue.record(1, 1, 1, 30)
+    queue.record(1, 1, 1, 30)
+    for _ in range(100):
+        if read(db_path, 'SELECT COUNT(*) FROM ad_logs') == [(2,)]:
+            break
+        queue._thread.join(0.05)
+    queue.stop()
+    assert read(db_path, 'SELECT COUNT(*) FROM ad_logs') == [(2,)]
+
+def test_queue_recovers_spool_after_crash(db_path, tmp_path):
+    """Test impressions spooled before a crash are written on restart."""
+    spool = str(tmp_path / 'impressions.spool')
+    crashed = ImpressionQueue(db_path, spool)
+    for _ in range(3):
+        crashed.record(1, 1, 1, 30)
+    crashed._spool.close()  # Process dies without flushing
+
+    queue = ImpressionQueue(db_path, spool)
+    assert queue.recover() == 3
+    assert queue.flush() == 3
+    assert read(db_path, 'SELECT plays FROM ad_play_counters') == [(3,)]
+
+    # A second recovery finds nothing left to replay
+    assert ImpressionQueue(db_path, spool).recover() == 0
+
+def test_queue_recovers_only_orphaned_spools(db_path, tmp_path):
+    """Test recovery leaves the spools of running processes alone."""
+    spool = str(tmp_path / 'impressions.spool')
+    exited = subprocess.run([sys.executable, '-c', 'import os; print(os.getpid())'],
+                            capture_output=True, text=True).stdout.strip()
+    for pid in (exited, os.getppid()):
+        with open(f"{spool}.{pid}", 'w') as f:
+            f.write(json.dumps(make_impression(1, 1, 1, 30)) + '\n')
+
+    queue = ImpressionQueue(db_path, spool)
+    assert queue.recover() == 1
+    assert queue.flush() == 1
+    assert sorted(os.listdir(tmp_path)) == ['database.db', f'impressions.spool.{os.getppid()}']
+
+def test_engine_logs_ad_plays_through_queue(db_path, tmp_path):
+    """Test the playback engine queues an impression when an ad goes off air."""
+    queue = ImpressionQueue(db_path, str(tmp_path / 'impressions.spool'))
+    ad = {'campaign_id': 1, 'asset_id': 1, 'duration': 30}
+    with patch.multiple(
+        playlist_module,
+        current_playlist=1,
+        current_ad=ad,
+        last_ad_position=6,
+        track_started_at=datetime.now() - timedelta(seconds=10),
+        _ad_scheduler=AdScheduler(Database(db_path), impressions=queue)
+    ):
+        playlist_module.log_ad_play()
+        assert playlist_module.current_ad is None
+        playlist_module.log_ad_play()  # Nothing on air any more
+
+    assert len(queue) == 1
+    queue.flush()
+    assert read(db_path, 'SELECT duration, completed FROM ad_logs') == [(10, 0)]
+    assert read(db_path, 'SELECT last_ad_position FROM playlist_state') == [(6,)]
@@ -0,0 +1,38 @@
+"""Unit tests for maintenance tasks."""
+import hashlib
+from unittest.mock import patch
+import pytest
+
+from app.core.database import Database
+from app.tasks import maintenance
+
+@pytest.fixture
+def db(schema_file):
+    """Create a file database opened on the test's thread."""
+    db = Database(schema_file)
+    yield db
+    db.close()
+
+def test_verify_file_integrity_hashes_on_workers(db, tmp_path):
+    """Test the integrity check reads the catalog on its own thread and hashes in parallel."""
+    files = {}
+    for i in range(6):
+        path = tmp_path / f'{i}.mp3'
+        path.write_bytes(bytes([i]) * 1000)
+        files[str(path)] = hashlib.sha256(path.read_bytes()).hexdigest()
+    corrupt = str(tmp_path / '0.mp3')
+    files[corrupt] = 'stale'
+    files[str(tmp_path / 'gone.mp3')] = 'abc'
+    db.connection.executemany(
+        "INSERT INTO media (file_path, type, title, artist, checksum) VALUES (?, 'audio', 't', 'a', ?)",
+        files.items()
+    )
+    db.commit()
+
+    with patch.object(maintenance, 'db', db), \
+         patch.object(maintenance.storage, 'base_path', str(tmp_path)):
+        results = maintenance.verify_file_integrity()
+
+    assert results['failed'] == [corrupt]
+    assert results['missing'] == [str(tmp_path / 'gone.mp3')]
+    assert sorted(results['verified']) == sorted(set(files) - {corrupt, str(tmp_path / 'gone.mp3')})
@@ -0,0 +1,116 @@
+"""Unit tests for sparse playlist ordering keys."""
+import sqlite3
+import pytest
+from app.playlist.ordering import (
+    ORDER_GAP,
+    key_between,
+    keys_between,
+    move_item,
+    insert_items,
+    rebalance_playlist,
+    min_gap
+)
+
+@pytest.fixture
+def conn():
+    """Create an in-memory playlist_items table."""
+    connection = sqlite3.connect(':memory:')
+    connection.execute('''
+        CREATE TABLE playlist_items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            playlist_id INTEGER NOT NULL,
+            media_id INTEGER NOT NULL,
+            order_position INTEGER NOT NULL
+        )
+    ''')
+    yield connection
+    connection.close()
+
+def ordered_ids(conn, playlist_id=1):
+    """Get item ids in playback order."""
+    rows = conn.execute(
+        'SELECT id FROM playlist_items WHERE playlist_id = ? ORDER BY order_position',
+        [playlist_id]
+    ).fetchall()
+    return [row[0] for row in rows]
+
+def test_key_between():
+    """Test key selection between neighbours."""
+    assert key_between(None, None) == 0
+    assert key_between(None, 0) == -ORDER_GAP
+    assert key_between(0, None) == ORDER_GAP
+    assert key_between(0, 1024) == 512
+    assert key_between(4, 5) is None
+
+def test_keys_between():
+    """Test bulk key selection between neighbours."""
+    assert keys_between(0, 100, 3) == [25, 50, 75]
+    assert keys_between(0, 3, 3) is None
+    assert keys_between(None, None, 2) == [0, ORDER_GAP]
+
+def test_move_item_touches_one_row(conn):
+    """Test that a move only rewrites the moved item."""
+    insert_items(conn, 1, list(range(100, 110)), append=True)
+    ids = ordered_ids(conn)
+
+    before = dict(conn.execute('SELECT id, order_position FROM playlist_items').fetchall())
+    result = move_item(conn, 1, ids[8], ids[1])
+    after = dict(conn.execute('SELECT id, order_position FROM playlist_items').fetchall())
+
+    assert not result['rebalanced']
+    assert [i for i in before if before[i] != after[i]] == [ids[8]]
+    assert ordered_ids(conn) == ids[:2] + [ids[8]] + ids[2:8] + ids[9:]
+
+def test_move_item_to_top(conn):
+    """Test moving an item to the start of the playlist."""
+    insert_items(conn, 1, [1, 2, 3], append=True)
+    ids = ordered_ids(conn)
+    move_item(conn, 1, ids[2], None)
+    assert ordered_ids(conn) == [ids[2], ids[0], ids[1]]
+
+def test_move_item_rebalances_when_gap_exhausted(conn):
+    """Test renumbering once repeated moves use up a gap."""
+    conn.executemany(
+        'INSERT INTO playlist_items (playlist_id, media_id, order_position) VALUES (1, ?, ?)',
+        [(1, 0), (2, 1), (3, 2)]  # Legacy dense keys
+    )
+    ids = ordered_ids(conn)
+    result = move_item(conn, 1, ids[2], ids[0])
+    assert result['rebalanced']
+    assert ordered_ids(conn) == [ids[0], ids[2], ids[1]]
+    assert min_gap(conn, 1) >= ORDER_GAP // 2
+
+def test_insert_items_in_middle(conn):
+    """Test inserting a batch between two items."""
+    insert_items(conn, 1, [1, 2], append=True)
+    first, second = ordered_ids(conn)
+    result = insert_items(conn, 1, [7, 8, 9], after_id=first)
+    new_ids = [item['id'] for item in result['items']]
+    assert result['shifted'] == 0
+    assert ordered_ids(conn) == [first] + new_ids + [second]
+
+def test_insert_items_shifts_tail_when_gap_too_small(conn):
+    """Test making room for a batch larger than the gap."""
+    conn.executemany(
+        'INSERT INTO playlist_items (playlist_id, media_id, order_position) VALUES (1, ?, ?)',
+        [(1, 0), (2, 1), (3, 2)]
+    )
+    ids = ordered_ids(conn)
+    result = insert_items(conn, 1, [7, 8], after_id=ids[0])
+    new_ids = [item['id'] for item in result['items']]
+    assert result['shifted'] == 2
+    assert ordered_ids(conn) == [ids[0]] + new_ids + ids[1:]
+
+def test_rebalance_playlist(conn):
+    """Test renumbering keeps order and only touches one playlist."""
+    conn.executemany(
+        'INSERT INTO playlist_items (playlist_id, media_id, order_position) VALUES (?, ?, ?)',
+        [(1, 1, 5), (1, 2, 5), (1, 3, 6), (2, 4, 0)]
+    )
+    ids = ordered_ids(conn)
+    assert rebalance_playlist(conn, 1) == 3
+    assert ordered_ids(conn) == ids
+    keys = [row[0] for row in conn.execute(
+        'SELECT order_position FROM playlist_items WHERE playlist_id = 1 ORDER BY order_position'
+    )]
+    assert keys == [0, ORDER_GAP, 2 * ORDER_GAP]
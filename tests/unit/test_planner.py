@@ -0,0 +1,134 @@
+"""Unit tests for the ad break planner."""
+import sqlite3
+import time
+from unittest.mock import patch
+import pytest
+from app.ads.planner import AdBreakPlanner, PLAN_MAX_AGE, build_pod, cache_generation
+from app.ads.sampler import asset_sampler
+from app.api import playlist as playlist_module
+from app.playlist.ad_rules import ad_rule_cache
+
+def make_draw(ads):
+    """Build a draw function that cycles through the given ads."""
+    state = {'index': 0}
+    def draw():
+        ad = ads[state['index'] % len(ads)]
+        state['index'] += 1
+        return ad
+    return draw
+
+def test_build_pod_limits():
+    """Test pods respect the ad count and total duration limits."""
+    ads = [{'asset_id': i, 'duration': 30} for i in range(5)]
+    assert len(build_pod(make_draw(ads), 3, 300)) == 3
+    assert len(build_pod(make_draw(ads), 5, 70)) == 2
+
+    # A single long spot still makes a break
+    assert len(build_pod(make_draw([{'asset_id': 1, 'duration': 120}]), 3, 60)) == 1
+
+def test_build_pod_skips_repeats():
+    """Test the same asset is not played twice in one break."""
+    pod = build_pod(make_draw([{'asset_id': 1, 'duration': 15}]), 3, 90)
+    assert [ad['asset_id'] for ad in pod] == [1]
+    assert build_pod(lambda: None, 3, 90) == []
+
+@pytest.fixture
+def planner(schema_file):
+    """Create a planner over a database with one running ad campaign."""
+    path = schema_file
+    conn = sqlite3.connect(path)
+    conn.execute("INSERT INTO playlists (id, name) VALUES (1, 'Main')")
+    for index in range(3):
+        cursor = conn.execute(
+            "INSERT INTO media (file_path, type, title, artist, duration) VALUES (?, 'audio', ?, 'Sponsor', 20)",
+            (f'/ads/spot{index}.mp3', f'Spot {index}')
+        )
+        conn.execute(
+            "INSERT INTO ad_assets (campaign_id, media_id, type, weight) VALUES (1, ?, 'audio', 1)",
+            (cursor.lastrowid,)
+        )
+    conn.commit()
+    conn.close()
+    asset_sampler.invalidate()
+    return AdBreakPlanner(path, breaks=2, max_ads=2, max_duration=60)
+
+def test_planner_keeps_breaks_ready(planner):
+    """Test watched playlists are planned ahead and served in order."""
+    planner.watch(1)
+    assert planner.refill() == 2
+    assert planner.planned(1) == 2
+
+    pod = planner.take(1)
+    assert len(pod) == 2
+    assert planner.planned(1) == 1
+    assert planner.refill() == 1
+
+def test_planner_replans_after_edits(planner):
+    """Test planned breaks are dropped once campaigns or assets change."""
+    planner.watch(1)
+    planner.refill()
+    assert planner.refill() == 0  # Nothing changed, nothing re-planned
+
+    asset_sampler.invalidate(1)
+    assert planner.planned(1) == 0
+    assert planner.refill() == 2
+
+def test_planner_plans_on_miss(planner):
+    """Test a break is planned on demand when none is ready."""
+    assert planner.planned(1) == 0
+    assert len(planner.take(1)) == 2
+
+def test_planner_spreads_breaks_across_campaign_targets(planner):
+    """Test breaks planned ahead count toward campaign targets before they play."""
+    conn = sqlite3.connect(planner.db_path)
+    for campaign_id in (10, 11):
+        conn.execute(
+            "INSERT INTO ad_campaigns (id, name, target_percentage) VALUES (?, ?, 50)",
+            (campaign_id, f'Campaign {campaign_id}')
+        )
+        cursor = conn.execute(
+            "INSERT INTO media (file_path, type, title, artist, duration) VALUES (?, 'audio', 'Spot', 'Sponsor', 20)",
+            (f'/ads/{campaign_id}.mp3',)
+        )
+        conn.execute(
+            "INSERT INTO ad_assets (campaign_id, media_id, type) VALUES (?, ?, 'audio')",
+            (campaign_id, cursor.lastrowid)
+        )
+        conn.execute(
+            "INSERT INTO ad_schedules (campaign_id, playlist_id, frequency, priority) VALUES (?, 1, 3, 1)",
+            (campaign_id,)
+        )
+    conn.commit()
+    conn.close()
+    ad_rule_cache.invalidate()
+    asset_sampler.invalidate()
+
+    planner.max_ads = 1
+    planner.watch(1)
+    assert planner.refill() == 2
+    pods = [planner.take(1), planner.take(1)]
+    assert sorted(pod[0]['campaign_id'] for pod in pods) == [10, 11]
+
+    # Ads the engine already holds count too
+    assert planner.take(1, pending=pods[0])[0]['campaign_id'] == pods[1][0]['campaign_id']
+
+def test_engine_drops_pinned_breaks_after_edits():
+    """Test breaks pinned by /lookahead are forgotten once ads are edited."""
+    plan = (cache_generation(), time.monotonic(), [{'id': 1}])
+    with patch.multiple(playlist_module, pending_ads=[plan]):
+        playlist_module.drop_stale_ads()
+        assert playlist_module.pending_ads == [plan]
+
+        asset_sampler.invalidate(1)
+        playlist_module.drop_stale_ads()
+        assert playlist_module.pending_ads == []
+
+def test_engine_drops_old_pinned_breaks():
+    """Test breaks pinned by /lookahead expire like the planner's own."""
+    planned_at = time.monotonic() - PLAN_MAX_AGE - 1
+    with patch.multiple(
+        playlist_module,
+        pending_ads=[(cache_generation(), planned_at, [{'id': 1}])]
+    ):
+        playlist_module.drop_stale_ads()
+        assert playlist_module.pending_ads == []
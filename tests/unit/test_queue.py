@@ -0,0 +1,71 @@
+"""Unit tests for playback lookahead projection."""
+from app.playlist.queue import project_positions, queue_version, describe_media, media_url
+
+def test_project_positions_inserts_ad_breaks():
+    """Test that ad breaks appear where next_track would insert them."""
+    slots = project_positions(
+        current_position=1,
+        last_ad_position=0,
+        total_tracks=10,
+        is_repeat=True,
+        is_shuffle=False,
+        shuffle_queue=[],
+        count=6
+    )
+    assert slots == [
+        {'slot': 'track', 'position': 2},
+        {'slot': 'track', 'position': 3},
+        {'slot': 'ad'},
+        {'slot': 'track', 'position': 4},
+        {'slot': 'track', 'position': 5},
+        {'slot': 'track', 'position': 6}
+    ]
+
+def test_project_positions_without_ads():
+    """Test projection when no ads can be resolved."""
+    slots = project_positions(0, 0, 3, True, False, [], 4, ads_available=False)
+    assert [s['position'] for s in slots] == [1, 2, 0, 1]
+
+def test_project_positions_stops_at_end_without_repeat():
+    """Test that projection stops at the end of a non-repeating playlist."""
+    slots = project_positions(1, 1, 3, False, False, [], 5)
+    assert slots == [{'slot': 'track', 'position': 2}]
+
+def test_project_positions_stops_when_shuffle_queue_exhausted():
+    """Test that projection only follows the known shuffle order."""
+    queue = [4, 0]
+    slots = project_positions(2, 2, 5, True, True, queue, 5, ads_available=False)
+    assert slots == [
+        {'slot': 'track', 'position': 4},
+        {'slot': 'track', 'position': 0}
+    ]
+    assert queue == [4, 0]  # Engine state is not mutated
+
+def test_queue_version_changes_with_state():
+    """Test that the version token tracks queue changes."""
+    state = {'current_position': 1, 'last_ad_position': 0,
+             'is_repeat': True, 'is_shuffle': False, 'shuffle_queue': []}
+    version = queue_version(1, state, [1, 2, 3], [])
+    assert version == queue_version(1, dict(state), [1, 2, 3], [])
+    assert version != queue_version(1, {**state, 'current_position': 2}, [1, 2, 3], [])
+    assert version != queue_version(1, state, [1, 3, 2], [])
+    assert version != queue_version(1, state, [1, 2, 3], [9])
+
+def test_describe_media_adds_preload_hints(tmp_path):
+    """Test that media rows get url, size and duration hints."""
+    media_file = tmp_path / 'My Song.mp3'
+    media_file.write_bytes(b'x' * 128)
+
+    item = describe_media({'id': 1, 'file_path': str(media_file), 'duration': 200})
+    assert item['url'] == '/media/My%20Song.mp3'
+    assert item['size'] == 128
+    assert item['duration'] == 200
+
+    missing = describe_media({'id': 2, 'file_path': '/nope/gone.mp3', 'duration': None})
+    assert missing['size'] is None
+
+def test_media_url_matches_display_client():
+    """Test that media urls are built like the display client's getMediaSource."""
+    assert media_url('/srv/media/audio/Song (Live).mp3') == '/media/audio%2FSong%20(Live).mp3'
+    assert media_url("/music/Don't Stop!.mp3") == "/media/Don't%20Stop!.mp3"
+    assert media_url('/srv/media/spot.mp4') == '/media/spot.mp4'
@@ -0,0 +1,75 @@
+"""Unit tests for the closed-period report cache."""
+import os
+from datetime import date
+from unittest.mock import patch
+import pandas as pd
+import pytest
+
+pytest.importorskip('pyarrow')
+
+from app.ads.export import AdLogExporter
+from app.ads.report_cache import ReportCache
+
+SCHEMA_PATH = os.path.join(os.path.dirname(__file__), '..', '..', 'schema.sql')
+TODAY = date(2024, 1, 3)
+
+@pytest.fixture
+def store():
+    """Back the Redis client with a dict, recording timeouts."""
+    values, timeouts = {}, {}
+    with patch('app.core.cache.redis_client') as mock:
+        mock.get.side_effect = values.get
+        mock.set.side_effect = lambda key, value: values.__setitem__(key, value)
+        mock.setex.side_effect = lambda key, timeout, value: (
+            values.__setitem__(key, value), timeouts.__setitem__(key, timeout)
+        )
+        yield values, timeouts
+
+@pytest.fixture
+def cache(schema_db, tmp_path):
+    """Create a report cache over logs for two days, the first exported."""
+    db = schema_db
+    db.connection.executemany(
+        "INSERT INTO ad_logs (campaign_id, asset_id, playlist_id, timestamp, completed) VALUES (1, 1, 1, ?, 1)",
+        [('2024-01-01 10:00:00',), ('2024-01-03 09:00:00',)]
+    )
+    db.commit()
+    AdLogExporter(db, str(tmp_path / 'ad_logs')).export_closed(today=TODAY)
+    yield ReportCache(db, str(tmp_path / 'reports'), open_timeout=60)
+
+def test_closed_periods_are_kept(cache, store):
+    """Test closed periods are cached without expiry and open ones briefly."""
+    values, timeouts = store
+    calls = []
+    def build():
+        calls.append(1)
+        return pd.DataFrame({'plays': [3]}, index=pd.Index([7], name='campaign_id'))
+
+    day = date(2024, 1, 1)
+    first = cache.aggregate('totals', {'key': 'campaign_id'}, day, day, build, today=TODAY)
+    again = cache.aggregate('totals', {'key': 'campaign_id'}, day, day, build, today=TODAY)
+    assert len(calls) == 1
+    assert again.equals(first)
+    assert not timeouts
+
+    cache.aggregate('totals', {'key': 'campaign_id'}, day, TODAY, build, today=TODAY)
+    assert list(timeouts.values()) == [60]
+
+    # A late log makes the closed day open again until it is re-exported
+    cache.db.execute("INSERT INTO ad_logs (campaign_id, timestamp) VALUES (1, '2024-01-01 11:00:00')")
+    assert cache.key('totals', {}, day, day, today=TODAY)[1] is False
+
+def test_files_keyed_by_content(cache, store):
+    """Test rendered files are reused for the same spec and period."""
+    rendered = []
+    def render(path):
+        rendered.append(path)
+        with open(path, 'w') as f:
+            f.write('chart')
+
+    day = date(2024, 1, 1)
+    path = cache.file('custom_report', {'data': [1]}, day, day, render, today=TODAY)
+    assert cache.file('custom_report', {'data': [1]}, day, day, render, today=TODAY) == path
+    assert cache.file('custom_report', {'data': [2]}, day, day, render, today=TODAY) != path
+    assert len(rendered) == 2
+    assert open(path).read() == 'chart'
@@ -0,0 +1,36 @@
+"""Unit tests for the daily report task chord."""
+import pandas as pd
+import pytest
+from unittest.mock import patch
+
+pytest.importorskip('pyarrow')
+
+from app.tasks import celery
+from app.tasks import analytics
+
+@pytest.fixture
+def eager():
+    """Run tasks, chords included, in this process."""
+    celery.conf.task_always_eager = True
+    yield
+    celery.conf.task_always_eager = False
+
+def test_daily_reports_chord_delivers_rendered_pdfs(eager, tmp_path):
+    """Test charts rendered by the chord are saved and emailed by the callback."""
+    data = {
+        'campaign_performance': lambda date: pd.DataFrame({'name': ['Spring'], 'impressions': [3]}),
+        'hourly_distribution': lambda date: pd.DataFrame({'hour': ['10', '11'], 'impressions': [2, 1]})
+    }
+    with patch.dict(analytics.REPORT_DATA, data, clear=True), \
+         patch.object(analytics.settings.ads, 'report_path', str(tmp_path)), \
+         patch.object(analytics, 'send_daily_report_email') as send:
+        reports = analytics.generate_daily_reports.apply(args=(True,)).get()
+
+    assert set(reports) == set(data)
+    send.assert_called_once()
+    emailed, report_date = send.call_args.args
+    assert emailed == reports
+    for path in reports.values():
+        assert path.startswith(str(tmp_path / report_date))
+        with open(path, 'rb') as f:
+            assert f.read(5) == b'%PDF-'
@@ -0,0 +1,71 @@
+"""Unit tests for weighted ad asset sampling."""
+import random
+from collections import Counter
+import pytest
+from app.ads.sampler import AliasTable, AssetSampler
+
+def test_alias_table_matches_weights():
+    """Test draws follow the weight distribution."""
+    weights = [1, 2, 7]
+    table = AliasTable(weights)
+    rng = random.Random(42)
+    counts = Counter(table.draw(rng) for _ in range(50000))
+    for index, weight in enumerate(weights):
+        assert abs(counts[index] / 50000 - weight / 10) < 0.01
+
+def test_alias_table_edge_cases():
+    """Test single entries, zero weights and empty input."""
+    assert AliasTable([5]).draw() == 0
+    rng = random.Random(1)
+    table = AliasTable([0, 3])
+    assert {table.draw(rng) for _ in range(1000)} == {1}
+    with pytest.raises(ValueError):
+        AliasTable([])
+    with pytest.raises(ValueError):
+        AliasTable([0, 0])
+
+@pytest.fixture
+def db(schema_db):
+    """Create an in-memory database with two weighted assets."""
+    database = schema_db
+    campaign_id = database.insert('ad_campaigns', {'name': 'Test', 'status': 'active'})
+    for index, weight in enumerate([1, 3]):
+        media_id = database.insert('media', {
+            'file_path': f'/ads/spot{index}.mp3',
+            'type': 'audio',
+            'title': f'Spot {index}',
+            'artist': 'Sponsor',
+            'duration': 30
+        })
+        database.insert('ad_assets', {
+            'campaign_id': campaign_id,
+            'media_id': media_id,
+            'type': 'audio',
+            'weight': weight
+        })
+    database.campaign_id = campaign_id
+    yield database
+
+def test_asset_sampler_draws_joined_rows(db):
+    """Test draws return asset rows with media joined, by weight."""
+    sampler = AssetSampler()
+    rng = random.Random(7)
+    draws = [sampler.draw(db, db.campaign_id, rng) for _ in range(4000)]
+    assert {'asset_id', 'campaign_id', 'weight', 'file_path', 'title'} <= set(draws[0])
+    share = sum(1 for ad in draws if ad['title'] == 'Spot 1') / len(draws)
+    assert abs(share - 0.75) < 0.03
+
+    # The all-campaigns pool sees the same assets
+    assert sampler.draw(db, None, rng)['campaign_id'] == db.campaign_id
+
+def test_asset_sampler_cache_and_invalidation(db):
+    """Test tables are reused until the campaign's assets change."""
+    sampler = AssetSampler()
+    assert sampler.draw(db, db.campaign_id) is not None
+
+    db.execute('UPDATE ad_assets SET active = 0')
+    assert sampler.draw(db, db.campaign_id) is not None  # Still cached
+
+    sampler.invalidate(db.campaign_id)
+    assert sampler.draw(db, db.campaign_id) is None
+    assert sampler.draw(db, None) is None
@@ -0,0 +1,110 @@
+"""Unit tests for incremental, parallel media scanning."""
+import hashlib
+import os
+from unittest.mock import patch
+import pytest
+
+from app.core.files import calculate_file_checksum, hash_files
+from app.media.file_index import FileIndex
+from app.media.scanner import ScanCatalog, scan_directory
+
+@pytest.fixture
+def conn(schema_conn):
+    """Create an empty catalog."""
+    return schema_conn
+
+def scan(conn, media_dir, batch_size=500):
+    """Scan a directory like scan_media, returning the files hashed and the catalog."""
+    errors = []
+    scan_id = conn.execute("INSERT INTO media_scans DEFAULT VALUES").lastrowid
+    catalog = ScanCatalog(conn, scan_id, errors, FileIndex(conn), batch_size)
+    with patch('app.core.files.calculate_file_checksum', wraps=calculate_file_checksum) as hashed:
+        scan_directory(str(media_dir), catalog, errors)
+    catalog.flush()
+    catalog.index.flush([str(media_dir)])
+    conn.commit()
+    assert errors == []
+    return sorted(os.path.basename(call.args[0]) for call in hashed.call_args_list), catalog
+
+def test_rescan_only_hashes_new_or_changed_files(conn, tmp_path):
+    """Test unchanged files are not read again and gone files leave the index."""
+    (tmp_path / 'a.mp3').write_bytes(b'a' * 100)
+    (tmp_path / 'b.mp3').write_bytes(b'b' * 100)
+    (tmp_path / 'notes.txt').write_text('skip')
+    assert scan(conn, tmp_path)[0] == ['a.mp3', 'b.mp3']
+    assert conn.execute("SELECT COUNT(*) FROM media").fetchone()[0] == 2
+
+    assert scan(conn, tmp_path)[0] == []
+
+    (tmp_path / 'b.mp3').write_bytes(b'B' * 101)
+    (tmp_path / 'c.mp3').write_bytes(b'c' * 100)
+    (tmp_path / 'a.mp3').unlink()
+    assert scan(conn, tmp_path)[0] == ['b.mp3', 'c.mp3']
+
+    paths = [row[0] for row in conn.execute("SELECT path FROM media_file_state ORDER BY path")]
+    assert [os.path.basename(path) for path in paths] == ['b.mp3', 'c.mp3']
+    checksum = conn.execute(
+        "SELECT checksum FROM media_file_state WHERE path = ?", (str(tmp_path / 'b.mp3'),)
+    ).fetchone()[0]
+    assert checksum == calculate_file_checksum(str(tmp_path / 'b.mp3'))
+
+def test_hash_files_matches_serial_hashing(tmp_path):
+    """Test the pipeline hashes every file, passes known checksums through and reports errors."""
+    contents = {f'{i}.mp3': os.urandom(i * 1000) for i in range(40)}
+    for name, data in contents.items():
+        (tmp_path / name).write_bytes(data)
+
+    items = [{'path': str(tmp_path / name)} for name in contents]
+    items.append({'path': str(tmp_path / 'known.mp3'), 'checksum': 'abc'})
+    items.append({'path': str(tmp_path / 'missing.mp3')})
+
+    results = list(hash_files(iter(items), workers=3))
+    assert len(results) == len(items)
+    for item, error in results:
+        name = os.path.basename(item['path'])
+        if name == 'missing.mp3':
+            assert isinstance(error, FileNotFoundError)
+        elif name == 'known.mp3':
+            assert error is None and item['checksum'] == 'abc'
+        else:
+            assert error is None
+            assert item['checksum'] == hashlib.sha256(contents[name]).hexdigest()
+
+def test_hash_files_raises_producer_errors(tmp_path):
+    """Test a failing item source surfaces after the items before it."""
+    (tmp_path / 'a.mp3').write_bytes(b'a')
+
+    def items():
+        yield {'path': str(tmp_path / 'a.mp3')}
+        raise RuntimeError('walk failed')
+
+    pipeline = hash_files(items(), workers=2)
+    item, error = next(pipeline)
+    assert error is None and item['checksum']
+    with pytest.raises(RuntimeError, match='walk failed'):
+        next(pipeline)
+
+def test_new_media_are_deduped_and_written_in_batches(conn, tmp_path):
+    """Test duplicates are found in memory and each scan lists only what it added."""
+    for i in range(5):
+        (tmp_path / f'{i}.mp3').write_bytes(bytes([i]) * 100)
+    (tmp_path / 'copy.mp3').write_bytes(bytes([0]) * 100)
+
+    _, catalog = scan(conn, tmp_path, batch_size=2)
+    assert (catalog.files_found, catalog.duplicates) == (5, 1)
+    assert conn.execute("SELECT COUNT(*) FROM media").fetchone()[0] == 5
+    assert conn.execute(
+        "SELECT COUNT(*) FROM media_scan_files WHERE scan_id = ?", (catalog.scan_id,)
+    ).fetchone()[0] == 5
+
+    (tmp_path / 'new.mp3').write_bytes(b'n' * 100)
+    _, catalog = scan(conn, tmp_path)
+    assert (catalog.files_found, catalog.duplicates) == (1, 6)
+    added = conn.execute(
+        """
+        SELECT m.title FROM media_scan_files f JOIN media m ON f.media_id = m.id
+        WHERE f.scan_id = ?
+        """,
+        (catalog.scan_id,)
+    ).fetchall()
+    assert added == [('new',)]
@@ -0,0 +1,116 @@
+"""Unit tests for the projected playout timeline."""
+import sqlite3
+from datetime import datetime, timedelta
+from unittest.mock import patch
+import pytest
+from app.api import playlist as playlist_module
+from app.playlist.queue import AD_INTERVAL
+from app.playlist.timeline import Timeline, DEFAULT_DURATION
+
+START = datetime(2024, 1, 1, 14, 0)
+
+@pytest.fixture
+def timeline():
+    """Create a timeline of two tracks around an ad break."""
+    return Timeline([
+        {'id': 1, 'slot': 'track', 'duration': 120},
+        {'id': 9, 'slot': 'ad', 'duration': 30},
+        {'id': 2, 'slot': 'track', 'duration': 200}
+    ], START)
+
+def test_prefix_offsets(timeline):
+    """Test cumulative start offsets and total length."""
+    assert timeline.offsets == [0, 120, 150]
+    assert timeline.length == 350
+    assert timeline.ends_at == START + timedelta(seconds=350)
+
+def test_locate(timeline):
+    """Test time-to-item lookup including item boundaries."""
+    assert timeline.locate(START)['id'] == 1
+    assert timeline.locate(START + timedelta(seconds=119))['id'] == 1
+
+    ad = timeline.locate(START + timedelta(seconds=120))
+    assert ad['id'] == 9
+    assert ad['offset'] == 0
+
+    track = timeline.locate(START + timedelta(seconds=160.5))
+    assert track['id'] == 2
+    assert track['offset'] == 10.5
+    assert track['starts_at'] == '2024-01-01T14:02:30'
+
+    assert timeline.locate(START - timedelta(seconds=1)) is None
+    assert timeline.locate(START + timedelta(seconds=350)) is None
+
+def test_window(timeline):
+    """Test listing the items that overlap a time range."""
+    ids = [item['id'] for item in timeline.window(START + timedelta(seconds=60), START + timedelta(seconds=150))]
+    assert ids == [1, 9]
+    ids = [item['id'] for item in timeline.window(START - timedelta(hours=1), START + timedelta(hours=1))]
+    assert ids == [1, 9, 2]
+    assert timeline.window(START + timedelta(hours=1), START + timedelta(hours=2)) == []
+
+def test_missing_duration_is_estimated():
+    """Test that unprobed media falls back to the default duration."""
+    timeline = Timeline([{'id': 1, 'duration': None}, {'id': 2, 'duration': 10}], START)
+    assert timeline.offsets == [0, DEFAULT_DURATION]
+    assert timeline.entry(0)['estimated'] is True
+    assert timeline.entry(1)['estimated'] is False
+
+@pytest.fixture
+def playlist_conn(schema_conn):
+    """Create a playlist of three ten minute tracks."""
+    schema_conn.row_factory = sqlite3.Row
+    schema_conn.execute("INSERT INTO playlists (id, name) VALUES (1, 'Main')")
+    for index in range(3):
+        cursor = schema_conn.execute(
+            "INSERT INTO media (file_path, type, title, artist, duration) VALUES (?, 'audio', ?, 'Artist', 600)",
+            (f'/music/{index}.mp3', f'Track {index}')
+        )
+        schema_conn.execute(
+            "INSERT INTO playlist_items (playlist_id, media_id, order_position) VALUES (1, ?, ?)",
+            (cursor.lastrowid, index)
+        )
+    return schema_conn
+
+def test_get_timeline_covers_horizon_from_now(playlist_conn):
+    """Test that a track started in the past does not eat into the horizon."""
+    now = datetime.now()
+    with patch.multiple(
+        playlist_module,
+        current_playlist=1,
+        current_position=0,
+        last_ad_position=0,
+        track_started_at=now - timedelta(seconds=1500),
+        current_ad=None,
+        pending_ads=[],
+        current_pod=[],
+        _timeline_cache={}
+    ), patch.object(playlist_module, 'get_db', return_value=playlist_conn), \
+            patch.object(playlist_module.ad_planner, 'ready', return_value=False):
+        timeline, _ = playlist_module.get_timeline(600)
+
+    # The first track ends 900s ago; the horizon must still be covered ahead
+    assert timeline.ends_at >= now + timedelta(seconds=600)
+    assert timeline.locate(now + timedelta(seconds=599)) is not None
+
+def test_get_timeline_estimates_breaks_without_pinning(playlist_conn):
+    """Test that the timeline estimates ad breaks instead of planning them."""
+    with patch.multiple(
+        playlist_module,
+        current_playlist=1,
+        current_position=0,
+        last_ad_position=-AD_INTERVAL,  # A break is due next
+        track_started_at=datetime.now(),
+        current_ad=None,
+        pending_ads=[],
+        current_pod=[],
+        _timeline_cache={}
+    ), patch.object(playlist_module, 'get_db', return_value=playlist_conn), \
+            patch.object(playlist_module.ad_planner, 'ready', return_value=True), \
+            patch.object(playlist_module.ad_planner, 'take_plan') as take_plan:
+        timeline, _ = playlist_module.get_timeline(24 * 3600)
+        assert playlist_module.pending_ads == []
+
+    take_plan.assert_not_called()
+    breaks = [item for item in timeline.items if item['slot'] == 'ad']
+    assert breaks and all(item['estimated'] for item in breaks)
@@ -0,0 +1,176 @@
+"""Unit tests for the playlist schedule timer."""
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from app.api.playlist import load_schedule_changes
+from app.playlist.timer import ScheduleTimer, next_fire_time, parse_days
+
+# 2024-01-01 was a Monday
+MONDAY = datetime(2024, 1, 1, 12, 0)
+
+def test_parse_days():
+    """Test the stored, list and admin-form day formats."""
+    assert parse_days('0,3,5') == {0, 3, 5}
+    assert parse_days([1, 2]) == {1, 2}
+    assert parse_days([True, False, False, False, False, False, True]) == {0, 6}
+    assert parse_days(None) == set()
+
+def test_next_fire_time_once():
+    """Test one-off schedules only fire in the future."""
+    schedule = {'type': 'once', 'datetime': '2024-01-01T18:30'}
+    assert next_fire_time(schedule, MONDAY) == datetime(2024, 1, 1, 18, 30)
+    assert next_fire_time(schedule, datetime(2024, 1, 2)) is None
+
+def test_next_fire_time_daily():
+    """Test daily schedules roll over to tomorrow once passed."""
+    assert next_fire_time({'type': 'daily', 'time': '13:00'}, MONDAY) == datetime(2024, 1, 1, 13, 0)
+    assert next_fire_time({'type': 'daily', 'time': '12:00'}, MONDAY) == datetime(2024, 1, 2, 12, 0)
+
+def test_next_fire_time_weekly_uses_sunday_index():
+    """Test weekly days are numbered from Sunday."""
+    sunday = {'type': 'weekly', 'time': '09:00', 'days': '0'}
+    assert next_fire_time(sunday, MONDAY) == datetime(2024, 1, 7, 9, 0)
+
+    monday = {'type': 'weekly', 'time': '09:00', 'days': '1'}
+    assert next_fire_time(monday, MONDAY) == datetime(2024, 1, 8, 9, 0)
+
+    later_today = {'type': 'weekly', 'time': '15:00', 'days': '1,4'}
+    assert next_fire_time(later_today, MONDAY) == datetime(2024, 1, 1, 15, 0)
+
+    assert next_fire_time({'type': 'weekly', 'time': '09:00', 'days': ''}, MONDAY) is None
+
+def test_pop_due_fires_in_order_and_requeues():
+    """Test due schedules come out in time order and recurring ones repeat."""
+    timer = ScheduleTimer(clock=lambda: MONDAY)
+    timer.load([
+        {'id': 1, 'playlist_id': 10, 'type': 'daily', 'time': '14:00'},
+        {'id': 2, 'playlist_id': 20, 'type': 'once', 'datetime': '2024-01-01T13:00'}
+    ])
+    assert timer.next_fire() == datetime(2024, 1, 1, 13, 0)
+    assert timer.pop_due(datetime(2024, 1, 1, 12, 59)) == []
+
+    due = timer.pop_due(datetime(2024, 1, 1, 14, 0))
+    assert [s['id'] for s in due] == [2, 1]
+    assert len(timer) == 1
+    assert timer.next_fire() == datetime(2024, 1, 2, 14, 0)
+
+def test_pop_due_fires_missed_occurrences_once():
+    """Test a schedule missed for days fires once and then resumes from now."""
+    timer = ScheduleTimer(clock=lambda: MONDAY)
+    timer.load([{'id': 1, 'playlist_id': 10, 'type': 'daily', 'time': '14:00'}])
+
+    # The host slept from Monday morning until Thursday afternoon
+    due = timer.pop_due(datetime(2024, 1, 4, 15, 0))
+    assert [s['id'] for s in due] == [1]
+    assert timer.next_fire() == datetime(2024, 1, 5, 14, 0)
+
+def test_upsert_and_remove_only_touch_one_schedule():
+    """Test edits invalidate the old fire time without a full reload."""
+    timer = ScheduleTimer(clock=lambda: MONDAY)
+    timer.load([
+        {'id': 1, 'playlist_id': 10, 'type': 'daily', 'time': '13:00'},
+        {'id': 2, 'playlist_id': 20, 'type': 'daily', 'time': '15:00'}
+    ])
+
+    timer.upsert({'id': 1, 'playlist_id': 10, 'type': 'daily', 'time': '16:00'})
+    assert timer.next_fire() == datetime(2024, 1, 1, 15, 0)
+
+    timer.remove(2)
+    assert timer.next_fire() == datetime(2024, 1, 1, 16, 0)
+    due = timer.pop_due(datetime(2024, 1, 1, 16, 0))
+    assert [(s['id'], s['time']) for s in due] == [(1, '16:00')]
+
+def test_worker_fires_without_polling():
+    """Test the worker thread wakes up for a schedule added while it sleeps."""
+    fired = []
+    done = threading.Event()
+
+    def on_fire(schedule):
+        fired.append(schedule['id'])
+        done.set()
+
+    timer = ScheduleTimer(on_fire=on_fire)
+    timer.start()
+    try:
+        fire_at = datetime.now() + timedelta(milliseconds=200)
+        timer.upsert({'id': 7, 'playlist_id': 1, 'type': 'once', 'datetime': fire_at.isoformat()})
+        assert done.wait(5)
+        assert fired == [7]
+    finally:
+        timer.stop()
+
+def test_worker_reloads_edits_from_other_processes():
+    """Test schedules added outside this process are picked up on reload."""
+    fired = []
+    done = threading.Event()
+    changes = []
+    watermarks = []
+
+    def on_fire(schedule):
+        fired.append(schedule['id'])
+        done.set()
+
+    def loader(watermark):
+        watermarks.append(watermark)
+        return len(changes), changes[watermark:]
+
+    timer = ScheduleTimer(on_fire=on_fire, loader=loader)
+    with patch('app.playlist.timer.RELOAD_INTERVAL', 0.1):
+        timer.start()
+        try:
+            fire_at = datetime.now() + timedelta(milliseconds=300)
+            schedule = {'id': 8, 'playlist_id': 1, 'type': 'once', 'datetime': fire_at.isoformat()}
+            changes.append((8, datetime.now(), schedule))
+            assert done.wait(5)
+            assert fired == [8]
+        finally:
+            timer.stop()
+    # Only changes past the watermark are asked for
+    assert watermarks[0] == 0 and watermarks[-1] == 1
+
+def test_changes_fire_when_due_since_they_were_made():
+    """Test an edit picked up after its fire time passed still fires today."""
+    now = datetime(2024, 1, 1, 14, 0)
+    timer = ScheduleTimer(clock=lambda: now)
+    timer.load([])
+
+    # Another process moved the schedule to 13:59 at 13:58; this one only
+    # learns about it at 14:00
+    schedule = {'id': 1, 'playlist_id': 10, 'type': 'daily', 'time': '13:59'}
+    assert timer.apply_changes([(1, datetime(2024, 1, 1, 13, 58), schedule)]) == 1
+    assert [s['id'] for s in timer.pop_due(now)] == [1]
+    assert timer.next_fire() == datetime(2024, 1, 2, 13, 59)
+
+def test_changes_already_applied_are_skipped():
+    """Test this process's own edits do not fire again when read back."""
+    now = datetime(2024, 1, 1, 14, 0)
+    timer = ScheduleTimer(clock=lambda: now)
+    timer.upsert({'id': 1, 'playlist_id': 10, 'type': 'daily', 'time': '13:59'})
+
+    schedule = {'id': 1, 'playlist_id': 10, 'type': 'daily', 'time': '13:59'}
+    assert timer.apply_changes([(1, datetime(2024, 1, 1, 13, 58), schedule)]) == 0
+    assert timer.pop_due(now) == []
+
+    # A later deletion elsewhere still applies
+    assert timer.apply_changes([(1, datetime(2024, 1, 1, 14, 0, 1), None)]) == 1
+    assert len(timer) == 0
+
+def test_load_schedule_changes_since_watermark(schema_conn):
+    """Test schedule edits and deletions are read back past the watermark only."""
+    schema_conn.row_factory = sqlite3.Row
+    schema_conn.execute("INSERT INTO playlists (id, name) VALUES (1, 'Main')")
+    for time in ('09:00', '10:00'):
+        schema_conn.execute(
+            "INSERT INTO playlist_schedules (playlist_id, type, time) VALUES (1, 'daily', ?)",
+            (time,)
+        )
+    watermark, changes = load_schedule_changes(schema_conn, 0)
+    assert [(change[0], change[2]['time']) for change in changes] == [(1, '09:00'), (2, '10:00')]
+    assert load_schedule_changes(schema_conn, watermark) == (watermark, [])
+
+    schema_conn.execute("UPDATE playlist_schedules SET time = '11:00' WHERE id = 2")
+    schema_conn.execute("DELETE FROM playlist_schedules WHERE id = 1")
+    watermark, changes = load_schedule_changes(schema_conn, watermark)
+    assert [(change[0], change[2] and change[2]['time']) for change in changes] == [(2, '11:00'), (1, None)]
+    assert all(isinstance(change[1], datetime) for change in changes)